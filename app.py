@@ -1,11 +1,17 @@
 import streamlit as st, time, os
 import pandas as pd
+from chart_data import ChartData, get_log_hash
 from config_import import Config, ConfigKeys
 from model import Model
-from typing import Any, Dict, cast
+from profiling import ProfileReport, profile_simulation
+from typing import Any, Dict, Optional, cast
 from utils import Log
 
 
+@st.cache_data(ttl=3600)
+def load_config(refresh: bool = False) -> Config:
+    return Config.initialize(refresh=refresh)
+
 def modify_config():
     with st.form("edit_config"):
         st.header("Config Modification")
@@ -42,34 +48,27 @@ def player_type_select():
         index=0
     )
     # Set 'simulate' to string "TRUE"/"FALSE" as expected by the model
-    simulate_col = ConfigKeys.PLAYER_BEHAVIOR_SIMULATE.value
-    player_behavior_df[simulate_col] = player_behavior_df["player_type"].apply(
-        lambda x: "TRUE" if x == selected_player_type else "FALSE"
-    )
+    st.session_state.config.select_player_type(selected_player_type)
 
     st.write("Selected Player Type:", selected_player_type)
     st.write("Session per Day: ", player_behavior_df[player_behavior_df["player_type"] == selected_player_type][ConfigKeys.PLAYER_BEHAVIOR_SESSIONS_PER_DAY.value].values[0])
     st.write("Session Duration: ", player_behavior_df[player_behavior_df["player_type"] == selected_player_type][ConfigKeys.PLAYER_BEHAVIOR_SESSION_TIME.value].values[0])
 
-def print_charts_day_completion(log: pd.DataFrame):
+@st.cache_data(max_entries=4)
+def get_chart_data(log_hash: str, _log_df: pd.DataFrame) -> ChartData:
+    # Keyed by the log hash alone, hashing the whole log on every rerun would cost as much as the charts
+    return ChartData.from_log(_log_df)
 
-    day_log = log[log["action"] == Log.Action.DAY_COMPLETED.value]
+def print_charts_day_completion(day_progress: Optional[pd.DataFrame]):
 
-    #day_log = day_log[day_log["chapter"] == 1]
+    if day_progress is None:
+        return
 
-    day_log["chapter_day"] = (
-        day_log["chapter"].astype(int).astype(str).str.zfill(2) + "_" +
-        day_log["day"].astype(int).astype(str).str.zfill(2)
-        )
-    #day_log.set_index("chapter_day", inplace=True)
-    day_log = day_log.sort_values(by=["chapter", "day"])
-    #day_log.set_index("chapter_day", inplace=True)
-    
     st.subheader("Player Stats Progression per Chapter Run")
     st.line_chart(
         x="chapter_day",
-        y=["player_hp", "player_max_hp", "player_atk", "player_def"],
-        data=day_log,
+        y=[column for column in day_progress.columns if column != "chapter_day"],
+        data=day_progress,
         use_container_width=True,
         x_label="Chapter Day",
         y_label="Session Stats",
@@ -77,82 +76,50 @@ def print_charts_day_completion(log: pd.DataFrame):
 
     return
 
-def print_charts_chapter_day_progression(main_log: pd.DataFrame):
+def print_charts_chapter_day_progression(chapter_victories: Optional[pd.DataFrame]):
 
-    log = main_log[main_log["action"] == Log.Action.CHAPTER_VICTORY.value]  
+    if chapter_victories is None:
+        return
 
-    # Create a DataFrame with minimum timer_day per chapter (first victory day)
-    victory_log = log.groupby('chapter')['timer_day'].min().reset_index()
-    
-    chapter_tries = log.groupby('chapter')['chapter_run_try'].max().reset_index()
-    victory_log = victory_log.merge(chapter_tries, on='chapter', how='left')
-        
     st.subheader("Day Victory per Chapter")
     st.line_chart(
-        victory_log.set_index('chapter')[['timer_day', 'chapter_run_try']],
+        chapter_victories,
         use_container_width=True,
         x_label="Chapter",
         y_label="Days to Complete"
     )
 
-    # "timer_day": self.timer.get_day(),
-    #         "timer_day_session": self.timer.get_day_session(),
-    #         "timer_session_time": self.timer.get_session_time(),
-    #         "action": self.Action.CHAPTER_VICTORY.value,
-    #         "message": f"Chapter {chapter_num} completed with victory",
-    #         "chapter": chapter_num
-
     return
 
-def print_charts_combat_turns(main_log: pd.DataFrame):
-
-    log = main_log[main_log["action"].isin([Log.Action.PLAYER_ATTACK.value, Log.Action.ENEMY_ATTACK.value])]
+def print_charts_combat_turns(combat_rounds: Optional[pd.DataFrame]):
 
-    log = log[log["chapter"] == 1]
-    log["chapter_try_day_round"] = (
-        log["chapter"].astype(int).astype(str).str.zfill(2) + "_" +
-        log["chapter_run_try"].astype(int).astype(str).str.zfill(2) + "_" +
-        log["day"].astype(int).astype(str).str.zfill(2) + "_" +
-        log["combat_round"].astype(int).astype(str).str.zfill(2)
-        )
-    
-    log = log.sort_values(by="chapter_try_day_round")
+    if combat_rounds is None:
+        return
 
     st.line_chart(
         x="chapter_try_day_round",
-        y=["player_hp", "enemy_hp"],
-        data=log,
+        y=[column for column in combat_rounds.columns if column != "chapter_try_day_round"],
+        data=combat_rounds,
         use_container_width=True,
         x_label="Round",
         y_label="HP",
     )
 
-    #     def log_player_attack(self,damage: int, enemy_type: str, enemy_hp: int):
-    #     log_entry = {
-    #         "day": self.timer.get_day(),
-    #         "day_session": self.timer.get_day_session(),
-    #         "session_time": self.timer.get_session_time(),
-    #         "action": self.Action.PLAYER_ATTACK.value,
-    #         "message": f"Player attacked {enemy_type} for {damage} damage",
-    #         "damage": damage,
-    #         "enemy_type": enemy_type,
-    #         "enemy_hp": enemy_hp
-    #     }
-    #     self.logs.append(log_entry)
-
-    # def log_enemy_attack(self, damage: int, enemy_type: str, player_hp: int, enemy_hp: int):
-    #     log_entry = {
-    #         "day": self.timer.get_day(),
-    #         "day_session": self.timer.get_day_session(),
-    #         "session_time": self.timer.get_session_time(),
-    #         "action": self.Action.ENEMY_ATTACK.value,
-    #         "message": f"{enemy_type} attacked player for {damage} damage",
-    #         "enemy_damage": damage,
-    #         "player_hp": player_hp,
-    #         "enemy_hp": enemy_hp,
-    #         "enemy_type": enemy_type
-    #     }
+    return
+
+def print_profile_report(report: ProfileReport):
 
+    st.subheader("Simulation Profile")
+    st.write(f"Wall time: {report.wall_time * 1000:.1f} ms")
+
+    profile_df = report.to_dataframe()
+    st.bar_chart(
+        profile_df.set_index("phase")["self_ms"],
+        use_container_width=True,
+        x_label="Phase",
+        y_label="Self time (ms)"
+    )
+    st.dataframe(profile_df, hide_index=True)
 
     return
 
@@ -164,16 +131,41 @@ with st.sidebar:
         st.session_state.clear()
         st.rerun()
 
+    if st.button("Refresh Config from Sheets"):
+        st.cache_data.clear()
+        st.session_state.config = load_config(refresh=True)
+
     st.sidebar.toggle("Show/Hide Config", key="modify_config")
 
+    verbosity = st.selectbox(
+        "Log verbosity",
+        list(Log.Verbosity),
+        index=list(Log.Verbosity).index(Log.Verbosity.COMBAT),
+        format_func=lambda level: level.value,
+        key="log_verbosity_select"
+    )
+
+    st.toggle("Profile simulation", key="profile_simulation")
+    # Only drawn from when the config has combat randomness columns, the same seed replays the same run
+    seed = int(st.number_input("Combat seed", min_value=0, value=0, step=1, key="combat_seed"))
+
     if st.button("Run Simulation"):
-        st.session_state.model = Model.initialize(st.session_state.config)
-        st.session_state.log = st.session_state.model.simulate()
+        if st.session_state.get("model") is not None:
+            # Replays only from the first chapter the config edits since the last run can change
+            st.session_state.model = Model.resume(st.session_state.model, st.session_state.config, verbosity=verbosity, seed=seed)
+        else:
+            st.session_state.model = Model.initialize(st.session_state.config, verbosity=verbosity, seed=seed)
+        if st.session_state.profile_simulation:
+            st.session_state.log, st.session_state.profile_report = profile_simulation(st.session_state.model)
+        else:
+            st.session_state.log = st.session_state.model.simulate()
+            st.session_state.profile_report = None
         st.session_state.log_df = st.session_state.log.get_logs_as_dataframe()
+        st.session_state.log_hash = get_log_hash(st.session_state.log_df)
 
 
 if 'config' not in st.session_state:
-    st.session_state.config = Config.initialize()
+    st.session_state.config = load_config()
 
 # Initialise storage for logs (only first run)
 if 'log_df' not in st.session_state:
@@ -197,7 +189,9 @@ if st.session_state.log_df is not None:
     #     y_label="Chapter Level"
     # )
 
-    action_options = log_df["action"].unique().tolist()
+    chart_data = get_chart_data(st.session_state.log_hash, log_df)
+
+    action_options = chart_data.action_options
     selected_actions = st.multiselect(
         "Select Actions",
         action_options,
@@ -209,6 +203,9 @@ if st.session_state.log_df is not None:
     st.dataframe(filtered_df, hide_index=True, height=700)
 
 
-    print_charts_day_completion(log_df)
-    print_charts_combat_turns(log_df)
-    print_charts_chapter_day_progression(log_df)
\ No newline at end of file
+    print_charts_day_completion(chart_data.day_progress)
+    print_charts_combat_turns(chart_data.combat_rounds)
+    print_charts_chapter_day_progression(chart_data.chapter_victories)
+
+    if st.session_state.get("profile_report") is not None:
+        print_profile_report(st.session_state.profile_report)
\ No newline at end of file
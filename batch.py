@@ -0,0 +1,232 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable
+import pandas as pd
+from config_import import Config, ConfigCell, ConfigSheets
+from model import Model, CombatRandomness
+from result_writers import open_log_sink
+from utils import Log
+
+
+SUMMARY_COLUMNS = ["run_id", "player_type", "seed", "chapter", "clear_day", "days_to_clear", "run_tries", "gold"]
+
+
+# One simulation of the batch: which player type to simulate, with which seed and which config cells overridden
+@dataclass
+class BatchRun:
+    run_id: int
+    player_type: Optional[str] = None
+    seed: Optional[int] = None
+    overrides: Dict[str, Any] = field(default_factory=dict)
+
+    @staticmethod
+    def make_runs(seeds: Iterable[Optional[int]] = (None,), player_types: Iterable[Optional[str]] = (None,)) -> List['BatchRun']:
+        runs: List[BatchRun] = []
+        for player_type in player_types:
+            for seed in seeds:
+                runs.append(BatchRun(run_id=len(runs), player_type=player_type, seed=seed))
+        return runs
+
+
+@dataclass
+class BatchResult:
+    # One row per run and cleared chapter
+    runs_df: pd.DataFrame
+
+    def get_chapter_stats(self) -> pd.DataFrame:
+        if self.runs_df.empty:
+            return self.runs_df
+
+        grouped = self.runs_df.groupby(["player_type", "chapter"])
+        stats = grouped[["clear_day", "days_to_clear", "run_tries", "gold"]].agg(["mean", "std", "min", "max"])
+        stats.columns = [f"{column}_{stat}" for column, stat in stats.columns]
+        stats["runs"] = grouped["run_id"].nunique()
+
+        return stats.reset_index()
+
+
+# Work shared between the runs of one process
+@dataclass
+class RunCache:
+    # One config variant per player type, so its compiled chapter plans are shared between runs
+    variants: Dict[Optional[str], Config] = field(default_factory=dict)
+    # Summary models stopped on their first arrival to a chapter, keyed by (player type, seed, chapter)
+    prefixes: Dict[Tuple[Optional[str], Optional[int], int], Model] = field(default_factory=dict)
+
+
+def get_player_type_config(config: Config, player_type: Optional[str], cache: Optional[RunCache] = None) -> Config:
+    if player_type is None:
+        return config
+
+    if cache is None:
+        cache = RunCache()
+    if player_type not in cache.variants:
+        cache.variants[player_type] = config.with_player_type(player_type)
+    return cache.variants[player_type]
+
+
+def get_run_config(config: Config, run: BatchRun, cache: Optional[RunCache] = None) -> Config:
+    config = get_player_type_config(config, run.player_type, cache)
+    if run.overrides:
+        config = config.with_overrides(run.overrides)
+    return config
+
+
+def get_first_overridden_chapter(overrides: Dict[str, Any]) -> int:
+    # Runs are identical to the base config until they first reach this chapter
+    first_chapter: Optional[int] = None
+    for path in overrides:
+        cell = ConfigCell.parse(path)
+        if cell.sheet != ConfigSheets.CHAPTERS_SHEET_NAME.value or cell.row_key == "*":
+            return 1
+        chapter = int(cell.row_key.partition("/")[0])
+        first_chapter = chapter if first_chapter is None else min(first_chapter, chapter)
+    return first_chapter if first_chapter is not None else 1
+
+
+def initialize_summary_model(config: Config, seed: Optional[int] = None) -> Model:
+    # The chapter summary only reads round and chapter victory rows, so lost grinding runs can be fast-forwarded
+    return Model.initialize(config, sample_rates=Log.only(Log.Action.ROUND_COMPLETED, Log.Action.CHAPTER_VICTORY), fast_forward=True,
+                            seed=seed)
+
+
+def start_summary_model(config: Config, run: BatchRun, cache: Optional[RunCache] = None) -> Model:
+    run_config = get_run_config(config, run, cache)
+    first_chapter = get_first_overridden_chapter(run.overrides)
+    if cache is None or first_chapter <= 1:
+        return initialize_summary_model(run_config, run.seed)
+
+    # Overrides of later chapters only: resume a copy of the base run from the first overridden chapter.
+    # Without combat randomness the seed is never drawn from, so runs of every seed share the prefix.
+    player_config = get_player_type_config(config, run.player_type, cache)
+    prefix_seed = run.seed if CombatRandomness.get(player_config).is_stochastic() else None
+    key = (run.player_type, prefix_seed, first_chapter)
+    if key not in cache.prefixes:
+        prefix = initialize_summary_model(player_config, prefix_seed)
+        prefix.simulate(until_chapter=first_chapter)
+        cache.prefixes[key] = prefix
+
+    prefix = cache.prefixes[key]
+    return copy.deepcopy(prefix, memo={id(prefix.config): run_config, id(prefix.config_sheets): run_config.get_sheets()})
+
+
+def simulate_run(config: Config, run: BatchRun, cache: Optional[RunCache] = None) -> List[Dict[str, Any]]:
+    model = start_summary_model(config, run, cache)
+    log_df = model.simulate().get_logs_as_dataframe(with_messages=False)
+
+    return summarize_chapters(log_df, run, model.player_behavior.player_type)
+
+
+def simulate_run_events(config: Config, run: BatchRun, cache: Optional[RunCache] = None,
+                        verbosity: Log.Verbosity = Log.Verbosity.DAY) -> pd.DataFrame:
+    config = get_run_config(config, run, cache)
+
+    model = Model.initialize(config, verbosity=verbosity, seed=run.seed)
+    log_df = model.simulate().get_logs_as_dataframe()
+    log_df.insert(0, "run_id", run.run_id)
+    log_df.insert(1, "player_type", model.player_behavior.player_type)
+    log_df.insert(2, "seed", run.seed)
+
+    return log_df
+
+
+def get_run_events_path(directory: str, run: BatchRun) -> str:
+    return os.path.join(directory, f"run_{run.run_id:06d}.jsonl")
+
+
+def write_run_events(config: Config, run: BatchRun, cache: Optional[RunCache] = None, directory: str = ".",
+                     verbosity: Log.Verbosity = Log.Verbosity.DAY, buffer_rows: int = 10_000) -> str:
+    # simulate_run_events through the log sink: the run only holds buffer_rows rows at a time, returns the player type
+    config = get_run_config(config, run, cache)
+
+    sink = open_log_sink(get_run_events_path(directory, run), "jsonl", with_messages=True)
+    model = Model.initialize(config, verbosity=verbosity, seed=run.seed, log_sink=sink, log_buffer_rows=buffer_rows)
+    try:
+        model.simulate()
+    finally:
+        model.log.close()
+
+    return model.player_behavior.player_type
+
+
+def run_task(config: Config, run: BatchRun, cache: RunCache, events: bool, verbosity: Log.Verbosity) -> pd.DataFrame:
+    if events:
+        return simulate_run_events(config, run, cache, verbosity)
+    return pd.DataFrame(simulate_run(config, run, cache), columns=SUMMARY_COLUMNS)
+
+
+def summarize_chapters(log_df: pd.DataFrame, run: BatchRun, player_type: str) -> List[Dict[str, Any]]:
+    victories = log_df[log_df["action"] == Log.Action.CHAPTER_VICTORY.value]
+    rounds = log_df[(log_df["action"] == Log.Action.ROUND_COMPLETED.value) & (log_df["victory"] == True)]
+    gold_by_chapter = dict(zip(rounds["chapter_level"].astype(int), rounds["gold"]))
+
+    rows: List[Dict[str, Any]] = []
+    previous_clear_day = 1
+    for chapter, clear_day, run_tries in zip(victories["chapter"].astype(int), victories["timer_day"], victories["chapter_run_try"]):
+        rows.append({
+            "run_id": run.run_id,
+            "player_type": player_type,
+            "seed": run.seed,
+            "chapter": chapter,
+            "clear_day": int(clear_day),
+            "days_to_clear": int(clear_day) - previous_clear_day,
+            "run_tries": int(run_tries),
+            "gold": gold_by_chapter.get(chapter),
+        })
+        previous_clear_day = int(clear_day)
+
+    return rows
+
+
+# Config shared by every task of a worker process, pickled once by the pool initializer
+_worker_config: Optional[Config] = None
+_worker_cache = RunCache()
+
+def _init_worker(config: Config):
+    global _worker_config, _worker_cache
+    _worker_config = config
+    _worker_cache = RunCache()
+
+def _run_in_worker(task: Callable[[Config, BatchRun, RunCache], Any], run: BatchRun) -> Any:
+    return task(_worker_config, run, _worker_cache)
+
+
+def map_runs(config: Config, runs: List[BatchRun], workers: Optional[int], task: Callable[[Config, BatchRun, RunCache], Any]) -> Iterator[Any]:
+    # task(config, run, cache) of every run, in run order, in worker processes when there are several
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(runs) <= 1:
+        cache = RunCache()
+        for run in runs:
+            yield task(config, run, cache)
+        return
+
+    # Group small runs so thousands of tasks don't pay one round-trip each
+    chunksize = max(1, len(runs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as executor:
+        yield from executor.map(partial(_run_in_worker, task), runs, chunksize=chunksize)
+
+
+def iter_batch(config: Config, runs: List[BatchRun], workers: Optional[int] = None,
+               events: bool = False, verbosity: Log.Verbosity = Log.Verbosity.DAY) -> Iterator[pd.DataFrame]:
+    # Yields one DataFrame per run, in run order, as soon as it is available:
+    # per-chapter summary rows by default, or the run's full event log when events is set
+    return map_runs(config, runs, workers, partial(run_task, events=events, verbosity=verbosity))
+
+
+def iter_batch_events(config: Config, runs: List[BatchRun], directory: str, workers: Optional[int] = None,
+                      verbosity: Log.Verbosity = Log.Verbosity.DAY, buffer_rows: int = 10_000) -> Iterator[Tuple[BatchRun, str, str]]:
+    # iter_batch(events=True) with every event log streamed to a JSONL file of directory instead of returned whole,
+    # yields (run, player type, path) in run order, read the rows back with result_writers.iter_result_chunks
+    task = partial(write_run_events, directory=directory, verbosity=verbosity, buffer_rows=buffer_rows)
+    for run, player_type in zip(runs, map_runs(config, runs, workers, task)):
+        yield run, player_type, get_run_events_path(directory, run)
+
+
+def run_batch(config: Config, runs: List[BatchRun], workers: Optional[int] = None) -> BatchResult:
+    frames = [frame for frame in iter_batch(config, runs, workers) if not frame.empty]
+    runs_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=SUMMARY_COLUMNS)
+    return BatchResult(runs_df=runs_df)
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable
+import pandas as pd
+from model import Model, Chapter, ChapterPlan, RunContext, Day, Player_Character, BATTLE_EVENT_CODE
+from profiling import ProfileReport, profile_simulation
+from synthetic_config import SyntheticConfigSpec, SYNTHETIC_PRESETS
+from utils import Log
+
+# Times the simulation engine on synthetic configs and checks the timings against stored baselines, e.g.
+#   python benchmark.py --save-baseline                       # record the baselines of this machine
+#   python benchmark.py                                       # exits with 1 when a metric regressed
+#   python benchmark.py --case large --verbosity combat --repeats 3
+#   python benchmark.py --case medium --profile               # where the time of one run goes, per phase
+#   python benchmark.py --case medium --profile --allocations # and the memory blocks each phase allocates
+
+
+DEFAULT_BASELINE_PATH = "benchmark_baseline.json"
+
+# Calls per timed sample of the micro-benchmarks, so small configs aren't timed on a handful of microseconds
+MIN_SAMPLE_CALLS = 2000
+
+# Metrics compared against the baseline and whether a lower value is the better one
+COMPARED_METRICS = {
+    "model_initialize_ms": True,
+    "model_simulate_ms": True,
+    "chapter_initialize_us": True,
+    "simulate_battle_us": True,
+    "logs_dataframe_ms": True,
+    "days_per_sec": False,
+    "rounds_per_sec": False,
+    "peak_memory_mb": True,
+}
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    spec: SyntheticConfigSpec
+    verbosity: Log.Verbosity = Log.Verbosity.DAY
+
+
+@dataclass
+class BenchmarkResult:
+    case: str
+    metrics: Dict[str, float]
+
+
+def time_call(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def count_days_played(config_spec: SyntheticConfigSpec) -> int:
+    # Every simulated day logs one DAY_COMPLETED row, whatever verbosity the timed runs use
+    model = Model.initialize(config_spec.build(), sample_rates=Log.only(Log.Action.DAY_COMPLETED))
+    model.simulate()
+    return model.log.table.size
+
+
+def measure_model(case: BenchmarkCase, repeats: int) -> Dict[str, float]:
+    initialize_times: List[float] = []
+    simulate_times: List[float] = []
+    dataframe_times: List[float] = []
+
+    for _ in range(repeats):
+        # A fresh Config every repeat, so compiled plans and cached outcomes are rebuilt like in a real first run
+        config = case.spec.build()
+        start = time.perf_counter()
+        model = Model.initialize(config, verbosity=case.verbosity)
+        initialize_times.append(time.perf_counter() - start)
+        simulate_times.append(time_call(model.simulate))
+        dataframe_times.append(time_call(model.log.get_logs_as_dataframe))
+
+    # Best of the repeats, the least noisy estimate on a shared machine
+    return {
+        "model_initialize_ms": min(initialize_times) * 1e3,
+        "model_simulate_ms": min(simulate_times) * 1e3,
+        "logs_dataframe_ms": min(dataframe_times) * 1e3,
+        "rounds": model.rounds_done,
+        "log_rows": model.log.table.size,
+    }
+
+
+def measure_chapter_initialize(case: BenchmarkCase, repeats: int) -> float:
+    # Mean time to build one chapter run from its compiled plan
+    config = case.spec.build()
+    model = Model.initialize(config, verbosity=case.verbosity)
+    context = RunContext.initialize(model.log, model.player_behavior, model.action_table)
+    plans = list(ChapterPlan.get_plans(config).values())
+    plans = plans * -(-MIN_SAMPLE_CALLS // len(plans))
+
+    def build_all():
+        for plan in plans:
+            Chapter.initialize(plan, model.meta_progression, context)
+
+    return min(time_call(build_all) for _ in range(repeats)) / len(plans)
+
+
+def measure_simulate_battle(case: BenchmarkCase, repeats: int) -> float:
+    # Mean time of one battle of the chapters, fought with the starting stats
+    config = case.spec.build()
+    model = Model.initialize(config, verbosity=case.verbosity)
+    context = RunContext.initialize(model.log, model.player_behavior, model.action_table)
+    battle_plans = [
+        day_plan
+        for plan in ChapterPlan.get_plans(config).values()
+        for day_plan in plan.days
+        if day_plan.event_code == BATTLE_EVENT_CODE
+    ]
+    battle_plans = battle_plans * -(-MIN_SAMPLE_CALLS // max(1, len(battle_plans)))
+    meta_progression = model.meta_progression
+
+    best = None
+    for _ in range(repeats):
+        # Fresh days and characters every repeat, battles change their HP
+        fights = [
+            (Day.initialize(day_plan), Player_Character.initialize(
+                meta_progression.stat_atk.get_value(),
+                meta_progression.stat_def.get_value(),
+                meta_progression.stat_max_hp.get_value()))
+            for day_plan in battle_plans
+        ]
+
+        def fight_all():
+            for day, player_character in fights:
+                day.simulate_battle(context, 1, player_character, day.event_enemy)
+
+        elapsed = time_call(fight_all)
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best / max(1, len(battle_plans))
+
+
+def measure_peak_memory(case: BenchmarkCase) -> float:
+    # Traced separately, tracemalloc slows down every allocation of the timed runs
+    config = case.spec.build()
+    tracemalloc.start()
+    try:
+        model = Model.initialize(config, verbosity=case.verbosity)
+        model.simulate()
+        model.log.get_logs_as_dataframe()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def run_case(case: BenchmarkCase, repeats: int = 5) -> BenchmarkResult:
+    metrics = measure_model(case, repeats)
+    metrics["days_played"] = count_days_played(case.spec)
+    metrics["days_per_sec"] = metrics["days_played"] / (metrics["model_simulate_ms"] / 1e3)
+    metrics["rounds_per_sec"] = metrics["rounds"] / (metrics["model_simulate_ms"] / 1e3)
+    metrics["chapter_initialize_us"] = measure_chapter_initialize(case, repeats) * 1e6
+    metrics["simulate_battle_us"] = measure_simulate_battle(case, repeats) * 1e6
+    metrics["peak_memory_mb"] = measure_peak_memory(case)
+
+    return BenchmarkResult(case=case.name, metrics=metrics)
+
+
+def profile_case(case: BenchmarkCase, count_allocations: bool = False) -> ProfileReport:
+    model = Model.initialize(case.spec.build(), verbosity=case.verbosity)
+    _, report = profile_simulation(model, count_allocations=count_allocations)
+    return report
+
+
+def get_cases(names: Optional[List[str]] = None, verbosity: Log.Verbosity = Log.Verbosity.DAY) -> List[BenchmarkCase]:
+    names = names or list(SYNTHETIC_PRESETS)
+    return [BenchmarkCase(name=name, spec=SYNTHETIC_PRESETS[name], verbosity=verbosity) for name in names]
+
+
+def results_to_dataframe(results: List[BenchmarkResult]) -> pd.DataFrame:
+    return pd.DataFrame([{"case": result.case, **result.metrics} for result in results]).set_index("case")
+
+
+def get_baseline_key(case: str, verbosity: Log.Verbosity) -> str:
+    return f"{case}/{verbosity.value}"
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)["cases"]
+
+
+def save_baseline(path: str, results: List[BenchmarkResult], verbosity: Log.Verbosity):
+    # Merged into the stored cases, so baselines of other cases or verbosities are kept
+    cases = load_baseline(path)
+    for result in results:
+        cases[get_baseline_key(result.case, verbosity)] = result.metrics
+
+    with open(path, "w") as baseline_file:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cases": cases,
+        }, baseline_file, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results: List[BenchmarkResult], baseline: Dict[str, Dict[str, float]],
+                        verbosity: Log.Verbosity, tolerance: float = 0.25) -> pd.DataFrame:
+    # One row per compared metric, regressed when it got worse by more than the tolerance
+    rows: List[Dict[str, Any]] = []
+    for result in results:
+        baseline_metrics = baseline.get(get_baseline_key(result.case, verbosity))
+        if baseline_metrics is None:
+            continue
+        for metric, lower_is_better in COMPARED_METRICS.items():
+            if metric not in baseline_metrics or not baseline_metrics[metric]:
+                continue
+            change = result.metrics[metric] / baseline_metrics[metric] - 1
+            worse = change if lower_is_better else -change
+            rows.append({
+                "case": result.case,
+                "metric": metric,
+                "baseline": baseline_metrics[metric],
+                "current": result.metrics[metric],
+                "change_pct": change * 100,
+                "regressed": worse > tolerance,
+            })
+
+    return pd.DataFrame(rows, columns=["case", "metric", "baseline", "current", "change_pct", "regressed"])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the Capybara Go simulation engine on synthetic configs.")
+    parser.add_argument("--case", action="append", dest="cases", choices=list(SYNTHETIC_PRESETS), help="synthetic config to run, repeatable (default: all)")
+    parser.add_argument("--repeats", type=int, default=5, help="timed repeats per measurement, the best one is kept")
+    parser.add_argument("--verbosity", choices=[level.value for level in Log.Verbosity], default=Log.Verbosity.DAY.value, help="log verbosity of the simulated runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline file to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative slowdown accepted before a metric counts as a regression")
+    parser.add_argument("--json", default=None, dest="json_path", help="also write the results to this JSON file")
+    parser.add_argument("--profile", action="store_true", help="print the per-phase profile of one run of every case instead of timing them")
+    parser.add_argument("--allocations", action="store_true", help="with --profile, also count the memory blocks allocated per phase")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    verbosity = Log.Verbosity(args.verbosity)
+
+    if args.profile:
+        for case in get_cases(args.cases, verbosity):
+            with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.3f}".format):
+                print(f"{case.name}:")
+                print(profile_case(case, args.allocations).to_dataframe().to_string(index=False))
+        return 0
+
+    results = [run_case(case, args.repeats) for case in get_cases(args.cases, verbosity)]
+
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.2f}".format):
+        print(results_to_dataframe(results))
+
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump({result.case: result.metrics for result in results}, json_file, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, verbosity)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    comparison = compare_to_baseline(results, load_baseline(args.baseline), verbosity, args.tolerance)
+    if comparison.empty:
+        print(f"No baseline for these cases in {args.baseline}, run with --save-baseline to record one")
+        return 0
+
+    with pd.option_context("display.width", 200, "display.float_format", "{:.2f}".format):
+        print(comparison.to_string(index=False))
+
+    regressions = comparison[comparison["regressed"]]
+    if not regressions.empty:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from utils import Log
+
+# Aggregates behind the app charts, derived once per simulated log instead of on every Streamlit rerun, e.g.
+#   log_hash = get_log_hash(log_df)
+#   chart_data = ChartData.from_log(log_df)
+#   chart_data.day_progress   # ready to plot, "chapter_day" is an ordered category such as "01_03"
+#
+# Rows are sorted and deduplicated on integers packing the numbered columns in decimal fields, only the
+# distinct keys get a label. The charts plot those labels as evenly spaced ordered categories.
+
+# Fewest digits of every packed field, the width the zero-padded string keys used
+MIN_KEY_DIGITS = 2
+
+DAY_PROGRESS_COLUMNS = ["player_hp", "player_max_hp", "player_atk", "player_def"]
+COMBAT_ROUND_COLUMNS = ["player_hp", "enemy_hp"]
+
+
+@dataclass(frozen=True)
+class ChartData:
+    action_options: List[str]
+    day_progress: Optional[pd.DataFrame]
+    combat_rounds: Optional[pd.DataFrame]
+    chapter_victories: Optional[pd.DataFrame]
+
+    @staticmethod
+    def from_log(log_df: pd.DataFrame) -> 'ChartData':
+        return ChartData(
+            action_options=log_df["action"].unique().tolist(),
+            day_progress=get_day_progress(log_df),
+            combat_rounds=get_combat_rounds(log_df),
+            chapter_victories=get_chapter_victories(log_df)
+        )
+
+
+def get_log_hash(log_df: pd.DataFrame) -> str:
+    # Content hash of the whole log, equal logs share their chart data whatever run produced them
+    row_hashes = pd.util.hash_pandas_object(log_df, index=False).to_numpy()
+    columns = ",".join(str(column) for column in log_df.columns)
+    return hashlib.sha256(columns.encode("utf-8") + row_hashes.tobytes()).hexdigest()
+
+
+def get_packed_key(log_df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    key = np.zeros(len(log_df), dtype=np.int64)
+    for column in columns:
+        values = log_df[column].to_numpy(dtype=np.int64)
+        digits = max(MIN_KEY_DIGITS, len(str(int(values.max())))) if len(values) else MIN_KEY_DIGITS
+        key = key * 10**digits + values
+    return key
+
+
+def get_key_labels(log_df: pd.DataFrame, columns: List[str], key: np.ndarray) -> pd.Categorical:
+    # One category per distinct key, in key order, labelled with the zero-padded column values
+    _, first_rows, codes = np.unique(key, return_index=True, return_inverse=True)
+    values = log_df[columns].to_numpy(dtype=np.int64)[first_rows]
+    labels = ["_".join(str(value).zfill(MIN_KEY_DIGITS) for value in row) for row in values]
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+
+def get_action_rows(log_df: pd.DataFrame, actions: List[Log.Action]) -> pd.DataFrame:
+    return log_df[log_df["action"].isin([action.value for action in actions])]
+
+
+def get_day_progress(log_df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    day_log = get_action_rows(log_df, [Log.Action.DAY_COMPLETED])
+    if day_log.empty:
+        return None
+
+    key = get_packed_key(day_log, ["chapter", "day"])
+    day_log = day_log.assign(chapter_day=get_key_labels(day_log, ["chapter", "day"], key)).iloc[np.argsort(key, kind="stable")]
+    return day_log[["chapter_day"] + [column for column in DAY_PROGRESS_COLUMNS if column in day_log.columns]]
+
+
+def get_combat_rounds(log_df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    log = get_action_rows(log_df, [Log.Action.PLAYER_ATTACK, Log.Action.ENEMY_ATTACK])
+    log = log[log["chapter"] == 1]
+    if log.empty:
+        return None
+
+    key_columns = ["chapter", "chapter_run_try", "day", "combat_round"]
+    key = get_packed_key(log, key_columns)
+    log = log.assign(chapter_try_day_round=get_key_labels(log, key_columns, key)).iloc[np.argsort(key, kind="stable")]
+    return log[["chapter_try_day_round"] + [column for column in COMBAT_ROUND_COLUMNS if column in log.columns]]
+
+
+def get_chapter_victories(log_df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    log = get_action_rows(log_df, [Log.Action.CHAPTER_VICTORY])
+    if log.empty:
+        return None
+
+    # First victory day and tries per chapter
+    by_chapter = log.groupby("chapter")
+    return pd.DataFrame({
+        "timer_day": by_chapter["timer_day"].min(),
+        "chapter_run_try": by_chapter["chapter_run_try"].max(),
+    })
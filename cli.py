@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import List, Optional, Dict, Any
+from batch import BatchRun, iter_batch, iter_batch_events, SUMMARY_COLUMNS
+from config_import import Config
+from result_writers import RESULT_WRITERS, ResultWriter, iter_result_chunks, open_result_writer
+from utils import Log, LOG_COLUMNS, LOG_STRING_COLUMNS
+
+# Headless batch simulation, e.g.
+#   python cli.py --snapshot .config_snapshot --player-type casual --player-type hardcore --runs 50 --workers 8 -o results.jsonl
+#   python cli.py --set ENEMIES.boss.enemy_atk=30 --events --verbosity combat -o boss_trace.parquet
+
+
+def parse_overrides(assignments: List[str]) -> Dict[str, Any]:
+    overrides: Dict[str, Any] = {}
+    for assignment in assignments:
+        path, separator, raw_value = assignment.partition("=")
+        if not separator:
+            raise ValueError(f"Override '{assignment}' must look like SHEET.row.column=value")
+        # Numbers and JSON literals keep their type, anything else is a string
+        try:
+            overrides[path] = json.loads(raw_value)
+        except json.JSONDecodeError:
+            overrides[path] = raw_value
+    return overrides
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run Capybara Go simulations headless and stream the results to a file.")
+    parser.add_argument("-o", "--output", required=True, help="output file, .jsonl, .csv, .parquet, .arrow or .sqlite")
+    parser.add_argument("--format", choices=sorted(RESULT_WRITERS), help="output format, taken from the file extension by default")
+    parser.add_argument("--snapshot", default=None, help="config snapshot directory")
+    parser.add_argument("--refresh", action="store_true", help="fetch the sheets and update the snapshot before running")
+    parser.add_argument("--player-type", action="append", dest="player_types", help="player type to simulate, repeatable (default: the one flagged in the config)")
+    parser.add_argument("--seeds", nargs="+", type=int, help="seeds to run for every player type")
+    parser.add_argument("--runs", type=int, default=1, help="runs per player type when --seeds is not given, seeded 0..runs-1")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--set", action="append", default=[], dest="overrides", metavar="SHEET.row.column=value", help="override a config cell, repeatable")
+    parser.add_argument("--events", action="store_true", help="write every run's event log instead of per-chapter summaries")
+    parser.add_argument("--buffer-rows", type=int, default=10_000, help="event rows a run holds in memory with --events before writing them out")
+    parser.add_argument("--verbosity", choices=[level.value for level in Log.Verbosity], default=Log.Verbosity.DAY.value, help="event log verbosity with --events")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.refresh:
+        config = Config.initialize(refresh=True, snapshot_dir=args.snapshot)
+    else:
+        config = Config.from_snapshot(args.snapshot)
+
+    overrides = parse_overrides(args.overrides)
+    if overrides:
+        config = config.with_overrides(overrides)
+
+    seeds = args.seeds if args.seeds else list(range(args.runs))
+    runs = BatchRun.make_runs(seeds=seeds, player_types=args.player_types or [None])
+
+    if args.events:
+        columns = ["run_id", "player_type", "seed"] + LOG_COLUMNS
+        string_columns = ["player_type"] + LOG_STRING_COLUMNS
+    else:
+        columns = SUMMARY_COLUMNS
+        string_columns = ["player_type"]
+
+    writer = open_result_writer(args.output, columns, string_columns, args.format)
+    try:
+        if args.events:
+            write_events(config, runs, writer, args)
+        else:
+            for finished, frame in enumerate(iter_batch(config, runs, args.workers), start=1):
+                writer.write(frame)
+                print(f"run {finished}/{len(runs)} done, {writer.rows_written} rows written", file=sys.stderr)
+    finally:
+        writer.close()
+
+    return 0
+
+
+def write_events(config: Config, runs: List[BatchRun], writer: ResultWriter, args: argparse.Namespace):
+    # Every run streams its events through a log sink to a JSONL file next to the output, which is then
+    # copied over chunk by chunk, so neither the runs nor this process hold a whole event log
+    with tempfile.TemporaryDirectory(prefix=".events_", dir=os.path.dirname(os.path.abspath(args.output))) as directory:
+        runs_events = iter_batch_events(config, runs, directory, args.workers, Log.Verbosity(args.verbosity), args.buffer_rows)
+        for finished, (run, player_type, path) in enumerate(runs_events, start=1):
+            for chunk in iter_result_chunks(path, "jsonl", chunk_rows=args.buffer_rows):
+                chunk.insert(0, "run_id", run.run_id)
+                chunk.insert(1, "player_type", player_type)
+                chunk.insert(2, "seed", run.seed)
+                writer.write(chunk)
+            os.remove(path)
+            print(f"run {finished}/{len(runs)} done, {writer.rows_written} rows written", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
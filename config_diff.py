@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
+import pandas as pd
+from config_import import ConfigKeys, ConfigSheets
+
+# Day.EventType.BATTLE, the model isn't imported so the diff stays usable on its own
+BATTLE_EVENT = "battle"
+
+# What changed between two versions of the config sheets and the first chapter whose runs it can change, e.g.
+#   diff = ConfigDiff.between(model.config_sheets, config.get_sheets())
+#   diff.first_chapter   # None when the edit doesn't change any simulated run
+#
+# Runs only read the stats, timers and selected player behavior from the start, while a chapter or
+# enemy edit leaves every chapter played before it untouched.
+
+
+@dataclass(frozen=True)
+class ConfigDiff:
+    first_chapter: Optional[int]
+    changed_stats: Tuple[str, ...]
+    changed_enemies: Tuple[str, ...]
+    changed_chapters: Tuple[int, ...]
+    changed_player_types: Tuple[str, ...]
+    changed_timers: Tuple[str, ...]
+
+    @staticmethod
+    def between(old_sheets: Dict[str, pd.DataFrame], new_sheets: Dict[str, pd.DataFrame]) -> 'ConfigDiff':
+        changed_stats = get_changed_rows(old_sheets, new_sheets, ConfigSheets.PLAYER_SHEET_NAME, ConfigKeys.STAT_NAME)
+        changed_enemies = get_changed_rows(old_sheets, new_sheets, ConfigSheets.ENEMIES_SHEET_NAME, ConfigKeys.ENEMY_TYPE)
+        changed_player_types = get_changed_rows(old_sheets, new_sheets, ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME, ConfigKeys.PLAYER_BEHAVIOR_PLAYER_TYPE)
+        changed_timers = get_changed_rows(old_sheets, new_sheets, ConfigSheets.TIMERS_SHEET_NAME, ConfigKeys.TIMERS_ACTION_TYPE)
+
+        old_chapters = get_chapter_rows(old_sheets[ConfigSheets.CHAPTERS_SHEET_NAME.value])
+        new_chapters = get_chapter_rows(new_sheets[ConfigSheets.CHAPTERS_SHEET_NAME.value])
+        changed_chapters = sorted(
+            chapter for chapter in old_chapters.keys() | new_chapters.keys()
+            if old_chapters.get(chapter) != new_chapters.get(chapter)
+        )
+
+        affected: List[int] = list(changed_chapters)
+        if changed_stats or changed_timers:
+            affected.append(1)
+        if is_selected_behavior_changed(old_sheets, new_sheets):
+            affected.append(1)
+        # An enemy edit only matters from the first chapter that fights it, before or after the edit
+        for chapters in (old_chapters, new_chapters):
+            affected.extend(
+                chapter for chapter, rows in chapters.items()
+                if any(is_battle_against(row, changed_enemies) for row in rows)
+            )
+
+        return ConfigDiff(
+            first_chapter=min(affected) if affected else None,
+            changed_stats=tuple(changed_stats),
+            changed_enemies=tuple(changed_enemies),
+            changed_chapters=tuple(changed_chapters),
+            changed_player_types=tuple(changed_player_types),
+            changed_timers=tuple(changed_timers)
+        )
+
+    def is_empty(self) -> bool:
+        return not (self.changed_stats or self.changed_enemies or self.changed_chapters
+                    or self.changed_player_types or self.changed_timers)
+
+
+def normalize_cell(value: Any) -> Any:
+    # Edited sheets may come back as floats or numpy scalars, 5 and 5.0 are the same config value
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) or hasattr(value, "dtype"):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    return str(value)
+
+
+def normalize_row(row: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(sorted((str(column), normalize_cell(value)) for column, value in row.items()))
+
+
+def get_keyed_rows(sheet_df: pd.DataFrame, key: ConfigKeys) -> Dict[str, List[Tuple]]:
+    rows: Dict[str, List[Tuple]] = {}
+    for row in sheet_df.to_dict(orient="records"):
+        rows.setdefault(str(row.get(key.value)), []).append(normalize_row(row))
+    return rows
+
+
+def get_changed_rows(old_sheets: Dict[str, pd.DataFrame], new_sheets: Dict[str, pd.DataFrame],
+                     sheet: ConfigSheets, key: ConfigKeys) -> List[str]:
+    old_df, new_df = old_sheets[sheet.value], new_sheets[sheet.value]
+    if old_df is new_df:
+        return []
+    old_rows, new_rows = get_keyed_rows(old_df, key), get_keyed_rows(new_df, key)
+    return sorted(row_key for row_key in old_rows.keys() | new_rows.keys() if old_rows.get(row_key) != new_rows.get(row_key))
+
+
+def get_chapter_rows(chapters_df: pd.DataFrame) -> Dict[int, List[Dict[str, Any]]]:
+    chapters: Dict[int, List[Dict[str, Any]]] = {}
+    for row in chapters_df.to_dict(orient="records"):
+        chapters.setdefault(int(row[ConfigKeys.CHAPTER_NUM.value]), []).append(
+            {str(column): normalize_cell(value) for column, value in row.items()}
+        )
+    return chapters
+
+
+def is_battle_against(chapter_row: Dict[str, Any], enemy_types: List[str]) -> bool:
+    return (chapter_row.get(ConfigKeys.CHAPTER_DAILY_EVENT.value) == BATTLE_EVENT
+            and str(chapter_row.get(ConfigKeys.CHAPTER_DAILY_EVENT_PARAM.value)) in enemy_types)
+
+
+def get_selected_behavior(sheets: Dict[str, pd.DataFrame]) -> Optional[Tuple]:
+    for row in sheets[ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME.value].to_dict(orient="records"):
+        if row[ConfigKeys.PLAYER_BEHAVIOR_SIMULATE.value] == "TRUE":
+            return normalize_row(row)
+    return None
+
+
+def is_selected_behavior_changed(old_sheets: Dict[str, pd.DataFrame], new_sheets: Dict[str, pd.DataFrame]) -> bool:
+    # Other player types are never simulated, only the flagged one changes the runs
+    return get_selected_behavior(old_sheets) != get_selected_behavior(new_sheets)
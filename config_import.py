@@ -1,11 +1,15 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import pandas as pd
-import streamlit as st
 import json
-from typing import Optional
+import os
+from typing import Optional, Dict, Any, Callable, List, TYPE_CHECKING
 from enum import Enum
 from dataclasses import dataclass, field
+from config_snapshot import ConfigSnapshotStore, DEFAULT_SNAPSHOT_TTL
+
+# gspread, google-auth and streamlit are only imported when the sheets are actually fetched,
+# so the simulator can be imported by batch workers and CLI jobs without them
+if TYPE_CHECKING:
+    import gspread
 
 class ConfigSheets(Enum):
     SPREADSHEET_NAME = "capybara_sim_data"
@@ -29,6 +33,13 @@ class ConfigKeys(Enum):
     ENEMY_ATK = "enemy_atk"
     ENEMY_DEF = "enemy_def"
     ENEMY_MAX_HP = "enemy_max_hp"
+    # Optional combat randomness columns, of the atk row for the player (see model.AttackRandomness)
+    STAT_DAMAGE_VARIANCE = "stat_damage_variance"
+    STAT_CRIT_CHANCE = "stat_crit_chance"
+    STAT_MISS_CHANCE = "stat_miss_chance"
+    ENEMY_DAMAGE_VARIANCE = "enemy_damage_variance"
+    ENEMY_CRIT_CHANCE = "enemy_crit_chance"
+    ENEMY_MISS_CHANCE = "enemy_miss_chance"
     CHAPTER_NUM = "chapter_num"
     CHAPTER_DAY_NUM = "day_num"
     CHAPTER_DAILY_EVENT = "daily_event"
@@ -50,13 +61,141 @@ class ConfigTimerActions(Enum):
     BATTLE_PLAYER_TURN = "battle_player_turn"
     META_PROGRESSION = "meta_progression"
 
+# Worksheets that make up a Config, in the order they are fetched
+CONFIG_WORKSHEETS = [
+    ConfigSheets.PLAYER_SHEET_NAME,
+    ConfigSheets.ENEMIES_SHEET_NAME,
+    ConfigSheets.CHAPTERS_SHEET_NAME,
+    ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME,
+    ConfigSheets.TIMERS_SHEET_NAME,
+]
+
 
 #@st.cache_data(ttl=300)  # cache for 5 minutes
-def import_worksheet(spreadsheet_name: str, worksheet_name: str) -> pd.DataFrame:
-    client = connect_to_API()
+def import_worksheet(spreadsheet_name: str, worksheet_name: str, client: Optional['gspread.Client'] = None) -> pd.DataFrame:
+    client = client or connect_to_API()
     sheet = client.open(spreadsheet_name)
     return pd.DataFrame(sheet.worksheet(worksheet_name).get_all_records())
 
+def import_worksheets(spreadsheet, worksheet_names: List[str]) -> Dict[str, pd.DataFrame]:
+    # Every worksheet in a single values:batchGet request on an already opened spreadsheet
+    response = spreadsheet.values_batch_get([f"'{name}'" for name in worksheet_names])
+    value_ranges = response.get("valueRanges", [])
+
+    sheets: Dict[str, pd.DataFrame] = {}
+    for worksheet_name, value_range in zip(worksheet_names, value_ranges):
+        sheets[worksheet_name] = values_to_dataframe(value_range.get("values", []))
+
+    missing = [name for name in worksheet_names if name not in sheets]
+    if missing:
+        raise ValueError(f"Worksheets missing from batch response: {missing}")
+
+    return sheets
+
+def values_to_dataframe(values: List[List[Any]]) -> pd.DataFrame:
+    # Same records get_all_records builds: header row as keys, blanks as "", numbers parsed
+    if not values:
+        return pd.DataFrame()
+
+    header = [str(column) for column in values[0]]
+    records = []
+    for row in values[1:]:
+        padded = list(row[:len(header)]) + [""] * (len(header) - len(row))
+        records.append(dict(zip(header, [numericise_cell(value) for value in padded])))
+
+    return pd.DataFrame(records, columns=header)
+
+def numericise_cell(value: Any) -> Any:
+    # gspread.utils.numericise with the get_all_records defaults, so the loader runs without gspread:
+    # ints, then floats, while strings with underscores and anything else stay as they are
+    if not isinstance(value, str) or "_" in value:
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def index_rows(config_df: pd.DataFrame, key: ConfigKeys) -> Dict[str, Dict[str, Any]]:
+    # Row dicts keyed by the given column, the first row wins like the old mask lookups
+    table: Dict[str, Dict[str, Any]] = {}
+    for row in config_df.to_dict(orient="records"):
+        table.setdefault(str(row[key.value]), row)
+    return table
+
+# Column that identifies a row of each worksheet when addressing a single config cell
+SHEET_ROW_KEYS = {
+    ConfigSheets.PLAYER_SHEET_NAME.value: ConfigKeys.STAT_NAME,
+    ConfigSheets.ENEMIES_SHEET_NAME.value: ConfigKeys.ENEMY_TYPE,
+    ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME.value: ConfigKeys.PLAYER_BEHAVIOR_PLAYER_TYPE,
+    ConfigSheets.TIMERS_SHEET_NAME.value: ConfigKeys.TIMERS_ACTION_TYPE,
+}
+
+# A config cell addressed as SHEET.row.column, e.g. ENEMIES.boss.enemy_atk or PLAYER.atk.stat_meta_cost_exp.
+# CHAPTERS rows are "<chapter>" for every day of a chapter or "<chapter>/<day>" for one day, "*" matches every row.
+@dataclass(frozen=True)
+class ConfigCell:
+    sheet: str
+    row_key: str
+    column: str
+
+    @staticmethod
+    def parse(path: str) -> 'ConfigCell':
+        parts = path.split(".")
+        if len(parts) != 3:
+            raise ValueError(f"Config cell '{path}' must look like SHEET.row.column")
+        sheet, row_key, column = parts
+        if sheet != ConfigSheets.CHAPTERS_SHEET_NAME.value and sheet not in SHEET_ROW_KEYS:
+            raise ValueError(f"Unknown config sheet '{sheet}' in '{path}'")
+        return ConfigCell(sheet=sheet, row_key=row_key, column=column)
+
+    def get_path(self) -> str:
+        return f"{self.sheet}.{self.row_key}.{self.column}"
+
+    def get_row_mask(self, sheet_df: pd.DataFrame) -> pd.Series:
+        if self.row_key == "*":
+            return pd.Series(True, index=sheet_df.index)
+
+        if self.sheet == ConfigSheets.CHAPTERS_SHEET_NAME.value:
+            chapter, _, day = self.row_key.partition("/")
+            mask = sheet_df[ConfigKeys.CHAPTER_NUM.value].astype(int) == int(chapter)
+            if day:
+                mask &= sheet_df[ConfigKeys.CHAPTER_DAY_NUM.value].astype(int) == int(day)
+            return mask
+
+        return sheet_df[SHEET_ROW_KEYS[self.sheet].value].astype(str) == self.row_key
+
+# Dict-keyed views of the config sheets for O(1) lookups while building a Model
+@dataclass(frozen=True)
+class ConfigIndex:
+    stats: Dict[str, Dict[str, Any]]
+    enemies: Dict[str, Dict[str, Any]]
+    player_behaviors: Dict[str, Dict[str, Any]]
+    action_time_costs: Dict[str, float]
+    selected_player_type: Optional[str]
+
+    @staticmethod
+    def initialize(config: 'Config') -> 'ConfigIndex':
+        player_behaviors = index_rows(config.get_player_behavior_config(), ConfigKeys.PLAYER_BEHAVIOR_PLAYER_TYPE)
+        selected_player_type = next(
+            (player_type for player_type, row in player_behaviors.items() if row[ConfigKeys.PLAYER_BEHAVIOR_SIMULATE.value] == "TRUE"),
+            None
+        )
+
+        return ConfigIndex(
+            stats=index_rows(config.get_player_config(), ConfigKeys.STAT_NAME),
+            enemies=index_rows(config.get_enemies_config(), ConfigKeys.ENEMY_TYPE),
+            player_behaviors=player_behaviors,
+            action_time_costs={
+                str(row[ConfigKeys.TIMERS_ACTION_TYPE.value]): float(row[ConfigKeys.TIMERS_ACTION_TIME_COST.value])
+                for row in config.get_timers_config().to_dict(orient="records")
+            },
+            selected_player_type=selected_player_type
+        )
+
 @dataclass
 class Config:
 
@@ -66,31 +205,53 @@ class Config:
     _player_behavior_config_df: pd.DataFrame
     _action_time_costs_df: pd.DataFrame
 
+    # Structures derived from the DataFrames (chapter plans, lookup tables...), dropped whenever the config changes
+    _compiled: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+
+    @staticmethod
+    def initialize(refresh: bool = False, offline: bool = False, snapshot_dir: Optional[str] = None,
+                   snapshot_ttl: Optional[float] = DEFAULT_SNAPSHOT_TTL) -> 'Config':
+        # Serve the local snapshot while it is fresh, otherwise refetch the sheets and store a new one
+        from config_providers import SheetsConfigProvider, SnapshotCachedConfigProvider
+
+        return SnapshotCachedConfigProvider(
+            source=SheetsConfigProvider(),
+            store=ConfigSnapshotStore.initialize(snapshot_dir, snapshot_ttl),
+            refresh=refresh,
+            offline=offline
+        ).load()
+
+    @staticmethod
+    def from_snapshot(snapshot_dir: Optional[str] = None) -> 'Config':
+        from config_providers import FileConfigProvider
+
+        return FileConfigProvider.initialize(snapshot_dir).load()
 
     @staticmethod
-    @st.cache_data(ttl=3600)
-    def initialize() -> 'Config':
-        # Connect to Google Sheets
-        client = connect_to_API()
-
-        # Get the spreadsheet and turn into DataFrames
-        sheet = client.open(ConfigSheets.SPREADSHEET_NAME.value)
-  
-        player_config_df = import_worksheet( ConfigSheets.SPREADSHEET_NAME.value, ConfigSheets.PLAYER_SHEET_NAME.value)
-        enemies_config_df = import_worksheet(ConfigSheets.SPREADSHEET_NAME.value, ConfigSheets.ENEMIES_SHEET_NAME.value)
-        chapters_config_df = import_worksheet(ConfigSheets.SPREADSHEET_NAME.value, ConfigSheets.CHAPTERS_SHEET_NAME.value )
-        player_behavior_config_df = import_worksheet(ConfigSheets.SPREADSHEET_NAME.value, ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME.value)
-        action_timers_df = import_worksheet(ConfigSheets.SPREADSHEET_NAME.value, ConfigSheets.TIMERS_SHEET_NAME.value)
-
-        config = Config(
-            _player_config_df=player_config_df,
-            _enemies_config_df=enemies_config_df,
-            _chapters_config_df=chapters_config_df,
-            _player_behavior_config_df=player_behavior_config_df,
-            _action_time_costs_df=action_timers_df
+    def fetch_from_sheets(client: Optional['gspread.Client'] = None) -> 'Config':
+        from config_providers import SheetsConfigProvider
+
+        return SheetsConfigProvider(client=client).load()
+
+    @staticmethod
+    def from_sheets(sheets: Dict[str, pd.DataFrame]) -> 'Config':
+        return Config(
+            _player_config_df=sheets[ConfigSheets.PLAYER_SHEET_NAME.value],
+            _enemies_config_df=sheets[ConfigSheets.ENEMIES_SHEET_NAME.value],
+            _chapters_config_df=sheets[ConfigSheets.CHAPTERS_SHEET_NAME.value],
+            _player_behavior_config_df=sheets[ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME.value],
+            _action_time_costs_df=sheets[ConfigSheets.TIMERS_SHEET_NAME.value]
         )
 
-        return config
+    def get_sheets(self) -> Dict[str, pd.DataFrame]:
+        return {
+            ConfigSheets.PLAYER_SHEET_NAME.value: self._player_config_df,
+            ConfigSheets.ENEMIES_SHEET_NAME.value: self._enemies_config_df,
+            ConfigSheets.CHAPTERS_SHEET_NAME.value: self._chapters_config_df,
+            ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME.value: self._player_behavior_config_df,
+            ConfigSheets.TIMERS_SHEET_NAME.value: self._action_time_costs_df,
+        }
     
         
     def get_total_chapters(self) -> int:
@@ -114,20 +275,93 @@ class Config:
     def get_timers_config(self) -> pd.DataFrame:
         return self._action_time_costs_df
 
+    def get_compiled(self, key: str, builder: Callable[['Config'], Any]) -> Any:
+        if key not in self._compiled:
+            self._compiled[key] = builder(self)
+        return self._compiled[key]
+
+    def get_index(self) -> ConfigIndex:
+        return self.get_compiled("index", ConfigIndex.initialize)
+
+    def select_player_type(self, player_type: str):
+        # Flag only the given player type for simulation, keeping compiled data when nothing changes
+        if self.get_index().selected_player_type == player_type:
+            return
+
+        player_behavior_df = self._player_behavior_config_df
+        player_behavior_df[ConfigKeys.PLAYER_BEHAVIOR_SIMULATE.value] = player_behavior_df[ConfigKeys.PLAYER_BEHAVIOR_PLAYER_TYPE.value].apply(
+            lambda x: "TRUE" if x == player_type else "FALSE"
+        )
+        self._compiled.pop("index", None)
+
+    def with_player_type(self, player_type: str) -> 'Config':
+        # Same config with only the given player type flagged for simulation
+        player_behavior_df = self._player_behavior_config_df.copy()
+        player_behavior_df[ConfigKeys.PLAYER_BEHAVIOR_SIMULATE.value] = player_behavior_df[ConfigKeys.PLAYER_BEHAVIOR_PLAYER_TYPE.value].apply(
+            lambda x: "TRUE" if x == player_type else "FALSE"
+        )
+
+        return Config(
+            _player_config_df=self._player_config_df,
+            _enemies_config_df=self._enemies_config_df,
+            _chapters_config_df=self._chapters_config_df,
+            _player_behavior_config_df=player_behavior_df,
+            _action_time_costs_df=self._action_time_costs_df,
+            # Only the index reads the player behavior sheet, everything else compiled so far still applies
+            _compiled={key: value for key, value in self._compiled.items() if key != "index"}
+        )
+
+    def with_overrides(self, overrides: Dict[str, Any]) -> 'Config':
+        # Copy of the config with the given cells replaced, untouched sheets are shared
+        sheets = self.get_sheets()
+        edited: Dict[str, pd.DataFrame] = {}
+
+        for path, value in overrides.items():
+            cell = ConfigCell.parse(path)
+            sheet_df = edited.setdefault(cell.sheet, sheets[cell.sheet].copy())
+            if cell.column not in sheet_df.columns:
+                raise KeyError(f"Unknown column '{cell.column}' in config cell '{path}'")
+            mask = cell.get_row_mask(sheet_df)
+            if not mask.any():
+                raise KeyError(f"No rows match config cell '{path}'")
+            try:
+                sheet_df.loc[mask, cell.column] = value
+            except TypeError:
+                # The value doesn't fit the column dtype (float into an int column...), keep cells as loose as the sheet
+                sheet_df[cell.column] = sheet_df[cell.column].astype(object)
+                sheet_df.loc[mask, cell.column] = value
+
+        return Config.from_sheets({**sheets, **edited})
+
     def reasign_config(self, new_player_config, new_enemies_config, new_chapters_config, new_player_behavior_config, new_action_time_costs_df):
         self._player_config_df = new_player_config
         self._enemies_config_df = new_enemies_config
         self._chapters_config_df = new_chapters_config
         self._player_behavior_config_df = new_player_behavior_config
         self._action_time_costs_df = new_action_time_costs_df
+        self._compiled = {}
 
 
-def connect_to_API() -> gspread.Client:
+def connect_to_API(service_account_info: Optional[Dict[str, Any]] = None) -> 'gspread.Client':
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     scopes = [
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive"
     ]
-    service_account_info = st.secrets["gcp"]
+    if service_account_info is None:
+        service_account_info = load_service_account_info()
     creds = Credentials.from_service_account_info(service_account_info, scopes=scopes)
     client = gspread.authorize(creds)
-    return client
\ No newline at end of file
+    return client
+
+def load_service_account_info() -> Dict[str, Any]:
+    # A service account JSON file for headless jobs, the Streamlit secrets inside the app
+    credentials_path = os.environ.get("CAPYBARA_GCP_CREDENTIALS")
+    if credentials_path:
+        with open(credentials_path, "r", encoding="utf-8") as credentials_file:
+            return json.load(credentials_file)
+
+    import streamlit as st
+    return dict(st.secrets["gcp"])
@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+import pandas as pd
+from config_import import Config, ConfigSheets, CONFIG_WORKSHEETS, connect_to_API, import_worksheets
+from config_snapshot import ConfigSnapshotStore
+
+
+# Source of the config worksheets, keyed by worksheet name
+class ConfigProvider(ABC):
+
+    @abstractmethod
+    def load_sheets(self) -> Dict[str, pd.DataFrame]:
+        pass
+
+    def load(self) -> Config:
+        return Config.from_sheets(self.load_sheets())
+
+
+@dataclass
+class InMemoryConfigProvider(ConfigProvider):
+    sheets: Dict[str, pd.DataFrame]
+
+    @staticmethod
+    def from_config(config: Config) -> 'InMemoryConfigProvider':
+        return InMemoryConfigProvider(sheets=config.get_sheets())
+
+    def load_sheets(self) -> Dict[str, pd.DataFrame]:
+        # Copies, so a Config built from it can be edited without touching the provider
+        return {sheet_name: sheet_df.copy() for sheet_name, sheet_df in self.sheets.items()}
+
+
+@dataclass
+class FileConfigProvider(ConfigProvider):
+    store: ConfigSnapshotStore
+
+    @staticmethod
+    def initialize(directory: Optional[str] = None) -> 'FileConfigProvider':
+        return FileConfigProvider(store=ConfigSnapshotStore.initialize(directory, ttl_seconds=None))
+
+    def load_sheets(self) -> Dict[str, pd.DataFrame]:
+        return self.store.load()
+
+
+@dataclass
+class SheetsConfigProvider(ConfigProvider):
+    client: Optional[Any] = None
+    service_account_info: Optional[Dict[str, Any]] = None
+
+    def load_sheets(self) -> Dict[str, pd.DataFrame]:
+        # One authorised client and one spreadsheet handle for all the worksheets
+        client = self.client or connect_to_API(self.service_account_info)
+        spreadsheet = client.open(ConfigSheets.SPREADSHEET_NAME.value)
+
+        return import_worksheets(spreadsheet, [sheet.value for sheet in CONFIG_WORKSHEETS])
+
+
+# Wraps another provider with the local snapshot: served while fresh, refreshed from the source otherwise
+@dataclass
+class SnapshotCachedConfigProvider(ConfigProvider):
+    source: ConfigProvider
+    store: ConfigSnapshotStore
+    refresh: bool = False
+    offline: bool = False
+
+    def load_sheets(self) -> Dict[str, pd.DataFrame]:
+        if self.offline:
+            return self.store.load()
+
+        if not self.refresh and self.store.is_fresh():
+            return self.store.load()
+
+        try:
+            sheets = self.source.load_sheets()
+        except get_source_unavailable_errors():
+            # No network or credentials: fall back to the last snapshot, however old
+            if self.store.exists():
+                return self.store.load()
+            raise
+
+        self.store.save(sheets)
+        return sheets
+
+
+def get_source_unavailable_errors() -> Tuple[type, ...]:
+    # Missing client libraries, network or credential files, a rejected login or a failing Sheets API.
+    # Anything else is a bug in reading the sheets and must not be hidden behind an old snapshot.
+    errors: Tuple[type, ...] = (ImportError, OSError)
+    try:
+        from gspread.exceptions import GSpreadException
+        from google.auth.exceptions import GoogleAuthError
+    except ImportError:
+        return errors
+    return errors + (GSpreadException, GoogleAuthError)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+import pandas as pd
+
+DEFAULT_SNAPSHOT_DIR = os.environ.get("CAPYBARA_CONFIG_SNAPSHOT_DIR", ".config_snapshot")
+DEFAULT_SNAPSHOT_TTL = 3600.0
+MANIFEST_FILE = "manifest.json"
+
+
+# Local copy of the config worksheets: one JSON records file per sheet plus a manifest with content hashes.
+# JSON keeps the exact cell types returned by the Sheets API (mixed int/str columns like daily_event_param).
+# Sheet files are named after their content hash and never overwritten, the manifest switches to them atomically.
+@dataclass
+class ConfigSnapshotStore:
+    directory: str
+    ttl_seconds: Optional[float]
+
+    @staticmethod
+    def initialize(directory: Optional[str] = None, ttl_seconds: Optional[float] = DEFAULT_SNAPSHOT_TTL) -> 'ConfigSnapshotStore':
+        return ConfigSnapshotStore(directory=directory or DEFAULT_SNAPSHOT_DIR, ttl_seconds=ttl_seconds)
+
+    def get_sheet_path(self, sheet_name: str, sheet_hash: str) -> str:
+        return os.path.join(self.directory, f"{sheet_name}.{sheet_hash}.json")
+
+    def get_legacy_sheet_path(self, sheet_name: str) -> str:
+        # Snapshots saved before the sheet files were content addressed
+        return os.path.join(self.directory, f"{sheet_name}.json")
+
+    def get_manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.get_manifest_path())
+
+    def read_manifest(self) -> Dict[str, Any]:
+        with open(self.get_manifest_path(), "r", encoding="utf-8") as manifest_file:
+            return json.load(manifest_file)
+
+    def is_fresh(self) -> bool:
+        # A snapshot without TTL never expires
+        if not self.exists():
+            return False
+        if self.ttl_seconds is None:
+            return True
+        return time.time() - self.read_manifest()["saved_at"] < self.ttl_seconds
+
+    def get_content_hash(self) -> Optional[str]:
+        if not self.exists():
+            return None
+        return self.read_manifest()["content_hash"]
+
+    def save(self, sheets: Dict[str, pd.DataFrame]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+
+        sheet_hashes: Dict[str, str] = {}
+        for sheet_name, sheet_df in sheets.items():
+            payload = serialize_sheet(sheet_df)
+            sheet_hashes[sheet_name] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+            sheet_path = self.get_sheet_path(sheet_name, sheet_hashes[sheet_name])
+            if not os.path.exists(sheet_path):
+                write_atomic(sheet_path, payload)
+
+        content_hash = hashlib.sha256(
+            "".join(f"{name}:{sheet_hashes[name]}" for name in sorted(sheet_hashes)).encode("utf-8")
+        ).hexdigest()
+
+        # The previous sheet files are untouched until the manifest is replaced, a snapshot interrupted
+        # halfway still loads as the previous one
+        previous_hashes = self.read_manifest()["sheets"] if self.exists() else {}
+        manifest = {
+            "saved_at": time.time(),
+            "content_hash": content_hash,
+            "sheets": sheet_hashes,
+        }
+        write_atomic(self.get_manifest_path(), json.dumps(manifest, indent=2))
+        self.remove_stale_sheets(previous_hashes, sheet_hashes)
+
+        return content_hash
+
+    def remove_stale_sheets(self, previous_hashes: Dict[str, str], sheet_hashes: Dict[str, str]):
+        stale_paths = [self.get_legacy_sheet_path(sheet_name) for sheet_name in sheet_hashes]
+        stale_paths += [
+            self.get_sheet_path(sheet_name, sheet_hash)
+            for sheet_name, sheet_hash in previous_hashes.items()
+            if sheet_hashes.get(sheet_name) != sheet_hash
+        ]
+        for path in stale_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def load(self) -> Dict[str, pd.DataFrame]:
+        if not self.exists():
+            raise FileNotFoundError(f"No config snapshot found in {self.directory}")
+
+        manifest = self.read_manifest()
+        sheets: Dict[str, pd.DataFrame] = {}
+        for sheet_name, expected_hash in manifest["sheets"].items():
+            sheet_path = self.get_sheet_path(sheet_name, expected_hash)
+            if not os.path.exists(sheet_path):
+                sheet_path = self.get_legacy_sheet_path(sheet_name)
+            with open(sheet_path, "r", encoding="utf-8") as sheet_file:
+                payload = sheet_file.read()
+            if hashlib.sha256(payload.encode("utf-8")).hexdigest() != expected_hash:
+                raise ValueError(f"Config snapshot sheet {sheet_name} does not match its manifest hash")
+            sheets[sheet_name] = pd.DataFrame(json.loads(payload))
+
+        return sheets
+
+
+def serialize_sheet(sheet_df: pd.DataFrame) -> str:
+    records = [
+        {str(key): to_json_value(value) for key, value in row.items()}
+        for row in sheet_df.to_dict(orient="records")
+    ]
+    return json.dumps(records, sort_keys=False, ensure_ascii=False)
+
+
+def to_json_value(value: Any) -> Any:
+    # DataFrames edited in the app can hold NumPy scalars
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def write_atomic(path: str, payload: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as tmp_file:
+        tmp_file.write(payload)
+    os.replace(tmp_path, path)
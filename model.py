@@ -1,11 +1,55 @@
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+import heapq
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
+import numpy as np
 import pandas as pd
 import config_import as config_import
-from config_import import ConfigKeys, Config, ConfigTimerActions
+from config_import import ConfigKeys, Config, ConfigIndex, ConfigTimerActions
+from config_diff import ConfigDiff
 from enum import Enum
 from utils import Log, Timer
 
+if TYPE_CHECKING:
+    from result_writers import ResultWriter
+
+# Dense integer code of every timer action, the index of its cost in ActionTable.costs.
+# The four stat events come first so they also index DAY_EVENT_EFFECTS.
+class TimerCode:
+    EVENT_INCREASE_ATK = 0
+    EVENT_INCREASE_DEF = 1
+    EVENT_INCREASE_MAX_HP = 2
+    EVENT_RESTORE_HP = 3
+    BATTLE_PLAYER_TURN = 4
+    BATTLE_ENEMY_TURN = 5
+    META_PROGRESSION = 6
+
+TIMER_ACTION_CODES = {action: getattr(TimerCode, action.name) for action in ConfigTimerActions}
+
+# Cost of every timer action, read from the timers sheet once per Config
+@dataclass(frozen=True)
+class ActionTable:
+    costs: Tuple[float, ...]
+
+    @staticmethod
+    def initialize(config: Config) -> 'ActionTable':
+        action_time_costs = config.get_index().action_time_costs
+        missing = [action.value for action in ConfigTimerActions if action.value not in action_time_costs]
+        if missing:
+            raise KeyError(f"Missing time cost for timer actions: {missing}")
+
+        costs = [0.0] * len(TIMER_ACTION_CODES)
+        for action, code in TIMER_ACTION_CODES.items():
+            costs[code] = action_time_costs[action.value]
+        return ActionTable(costs=tuple(costs))
+
+    @staticmethod
+    def get(config: Config) -> 'ActionTable':
+        return config.get_compiled("action_table", ActionTable.initialize)
+
+# Cycles of at most this many actions (most battles) are stepped through time_spent, cheaper than setting up Timer.advance
+MAX_STEPPED_ACTIONS = 64
+
 # Controls the time the players spends in the game
 @dataclass
 class PlayerBehavior:
@@ -13,19 +57,24 @@ class PlayerBehavior:
     timer: Timer
     timers_config: pd.DataFrame
 
+    player_type: str
     player_session_time: float
     player_sessions_per_day: int
     
     @staticmethod
-    def initialize(player_behavior_config: pd.DataFrame, timers_config: pd.DataFrame, log:Log, timer: Timer) -> 'PlayerBehavior':
+    def initialize(config_index: ConfigIndex, timers_config: pd.DataFrame, log:Log, timer: Timer) -> 'PlayerBehavior':
+
+        if config_index.selected_player_type is None:
+            raise ValueError("No player behavior is selected for simulation.")
 
-        selected_player_behavior = player_behavior_config[player_behavior_config[ConfigKeys.PLAYER_BEHAVIOR_SIMULATE.value] == "TRUE"].iloc[0]
-        player_session_time = float(selected_player_behavior.loc[ConfigKeys.PLAYER_BEHAVIOR_SESSION_TIME.value])
-        player_sessions_per_day = int(selected_player_behavior.loc[ConfigKeys.PLAYER_BEHAVIOR_SESSIONS_PER_DAY.value])
+        player_type = config_index.selected_player_type
+        player_session_time = float(get_config_value_str_row(config_index.player_behaviors, player_type, ConfigKeys.PLAYER_BEHAVIOR_SESSION_TIME))
+        player_sessions_per_day = int(get_config_value_str_row(config_index.player_behaviors, player_type, ConfigKeys.PLAYER_BEHAVIOR_SESSIONS_PER_DAY))
 
         return PlayerBehavior(
             log=log,
             timer=timer,
+            player_type=player_type,
             player_session_time=player_session_time,
             player_sessions_per_day=player_sessions_per_day,
             timers_config=timers_config,
@@ -39,13 +88,15 @@ class PlayerBehavior:
             
             if self.timer.get_day_session() >= self.player_sessions_per_day:
                 self.timer.set_new_day()
-                self.log.log_player_new_day(
-                    self.timer.get_day())  
+                if self.log.should_log_code(Log.Code.PLAYER_NEW_DAY):
+                    self.log.log_player_new_day(
+                        self.timer.get_day())  
             else:
                 self.timer.set_new_session()
-                self.log.log_player_new_session(
-                    session_num=self.timer.get_day_session(),
-                    day_num=self.timer.get_day())
+                if self.log.should_log_code(Log.Code.PLAYER_NEW_SESSION):
+                    self.log.log_player_new_session(
+                        session_num=self.timer.get_day_session(),
+                        day_num=self.timer.get_day())
                 
         return
     
@@ -54,29 +105,130 @@ class PlayerBehavior:
         self.check_session()
         return
 
+    def time_spent_repeated(self, time: float, count: int):
+        # Equivalent to calling time_spent `count` times
+        self.time_spent_cycle((time,), count)
+
+    def time_spent_cycle(self, costs: Tuple[float, ...], steps: int):
+        # Equivalent to calling time_spent for `steps` actions whose costs repeat as `costs`. Longer cycles go through
+        # Timer.advance, still O(steps) but vectorized, with the rollover log rows appended in bulk
+        if steps <= MAX_STEPPED_ACTIONS:
+            for step in range(steps):
+                self.time_spent(costs[step % len(costs)])
+            return
+
+        log_rollovers = self.log.is_enabled_code(Log.Code.PLAYER_NEW_SESSION) or self.log.is_enabled_code(Log.Code.PLAYER_NEW_DAY)
+        advance = self.timer.advance(costs, steps, self.player_session_time, self.player_sessions_per_day, with_crossings=log_rollovers)
+        if log_rollovers:
+            self.log.log_timer_rollovers(advance)
+
 
 # -----------------------------
 #     Meta Progression Classes
 # -----------------------------
 
-@dataclass
+# Levels whose cost and value are precomputed, the curves follow the same formulas past them
+META_CURVE_LEVELS = 256
+
+# Cost and value of every level of one meta stat of the PLAYER sheet
+@dataclass(frozen=True)
+class MetaStatCurve:
+    name: str
+    initial_value: int
+    meta_bonus_base: int
+    meta_bonus_exp: int
+    meta_cost_base: int
+    meta_cost_exp: int
+    costs: Tuple[int, ...]
+    values: Tuple[int, ...]
+
+    @staticmethod
+    def initialize(stat_row: Dict[str, Any], levels: int = META_CURVE_LEVELS) -> 'MetaStatCurve':
+        initial_value = stat_row[ConfigKeys.STAT_INITIAL_VALUE.value]
+        meta_bonus_exp = stat_row[ConfigKeys.STAT_META_BONUS_EXP.value]
+        meta_cost_base = int(stat_row[ConfigKeys.STAT_META_COST_BASE.value])
+        meta_cost_exp = int(stat_row[ConfigKeys.STAT_META_COST_EXP.value])
+
+        return MetaStatCurve(
+            name=stat_row[ConfigKeys.STAT_NAME.value],
+            initial_value=initial_value,
+            meta_bonus_base=stat_row[ConfigKeys.STAT_META_BONUS_BASE.value],
+            meta_bonus_exp=meta_bonus_exp,
+            meta_cost_base=meta_cost_base,
+            meta_cost_exp=meta_cost_exp,
+            costs=tuple(meta_cost_base + meta_cost_exp * level for level in range(levels)),
+            values=tuple(initial_value + meta_bonus_exp * level for level in range(levels))
+        )
+
+    def get_cost(self, level: int) -> int:
+        if level < len(self.costs):
+            return self.costs[level]
+        return self.meta_cost_base + self.meta_cost_exp * level
+
+    def get_value(self, level: int) -> int:
+        if level < len(self.values):
+            return self.values[level]
+        return self.initial_value + self.meta_bonus_exp * level
+
+    def has_free_levels(self) -> bool:
+        # Some level costs no gold, so spending all the gold would never stop buying it
+        return self.meta_cost_base <= 0 or self.meta_cost_exp < 0
+
+# Every meta stat of the PLAYER sheet, built once per Config. The combat stats come first, in the order
+# upgrades always compared them, so cost ties still go to atk, then def, then max_hp.
+# Only the combat stats are read by the simulation, so only they are upgraded: the other rows are listed
+# with their curves but never take gold.
+META_COMBAT_STATS = (ConfigKeys.STAT_ATK, ConfigKeys.STAT_DEF, ConfigKeys.STAT_MAX_HP)
+
+@dataclass(frozen=True)
+class MetaStatTable:
+    curves: Tuple[MetaStatCurve, ...]
+    # Indexes in curves of the stats upgrades are bought for
+    upgradeable: Tuple[int, ...]
+
+    @staticmethod
+    def initialize(config: Config) -> 'MetaStatTable':
+        stats_table = config.get_index().stats
+        missing = [stat.value for stat in META_COMBAT_STATS if stat.value not in stats_table]
+        if missing:
+            raise KeyError(f"Missing meta stats in the PLAYER sheet: {missing}")
+
+        names = [stat.value for stat in META_COMBAT_STATS]
+        names += [name for name in stats_table if name not in names]
+        return MetaStatTable(
+            curves=tuple(MetaStatCurve.initialize(stats_table[name]) for name in names),
+            upgradeable=tuple(range(len(META_COMBAT_STATS)))
+        )
+
+    @staticmethod
+    def get(config: Config) -> 'MetaStatTable':
+        return config.get_compiled("meta_stat_table", MetaStatTable.initialize)
+
+    def get_names(self) -> List[str]:
+        return [curve.name for curve in self.curves]
+
+    def check_spend_all_gold(self):
+        free = [self.curves[index].name for index in self.upgradeable if self.curves[index].has_free_levels()]
+        if free:
+            raise ValueError(f"Spending all gold needs a positive cost at every level, free upgrades of: {free}")
+
+@dataclass(slots=True)
 class Meta_stat:
-    name: str = ""
-    initial_value: int = 0
-    meta_bonus_base: int = 0
-    meta_bonus_exp: int = 0
-    meta_cost_base: int = 0
-    meta_cost_exp: int = 0
+    curve: MetaStatCurve
     level: int = 0
 
+    @property
+    def name(self) -> str:
+        return self.curve.name
+
     def get_value(self) -> int:
-        return self.initial_value + self.meta_bonus_exp * self.level
+        return self.curve.get_value(self.level)
     
     def get_bonus_increment(self) -> int:
-        return self.initial_value + self.meta_bonus_exp * (self.level + 1) - (self.initial_value + self.meta_bonus_exp * self.level)
+        return self.curve.get_value(self.level + 1) - self.curve.get_value(self.level)
 
     def get_cost(self) -> int:
-        return self.meta_cost_base + self.meta_cost_exp * self.level
+        return self.curve.get_cost(self.level)
 
     def level_up(self):
         self.level += 1
@@ -89,11 +241,19 @@ class Player_meta_progression:
 
     log: Log
     player_behavior: PlayerBehavior
-    action_time_costs: Dict[str, float]
+    action_costs: Tuple[float, ...]
 
+    # Every stat of the MetaStatTable, in its order
+    stats: List[Meta_stat]
     stat_atk: Meta_stat
     stat_def: Meta_stat
     stat_max_hp: Meta_stat
+    # Indexes in stats of the upgradeable ones, see MetaStatTable
+    upgradeable: Tuple[int, ...]
+    # (next level cost, stat index) of every upgradeable stat, the cheapest upgrade on top
+    upgrade_heap: List[Tuple[int, int]]
+    # Buy every upgrade the gold affords each meta step instead of the cheapest one only
+    spend_all_gold: bool = False
     
     gold: int = 0
     chapter_level: int = 0
@@ -101,34 +261,11 @@ class Player_meta_progression:
 
 
     @staticmethod
-    def initialize(player_config_df, log: Log, player_behavior: PlayerBehavior, action_time_costs: Dict[str, float]) -> 'Player_meta_progression':
-        stat_atk = Meta_stat(
-            name=get_config_value(player_config_df, ConfigKeys.STAT_NAME, ConfigKeys.STAT_ATK, ConfigKeys.STAT_NAME),
-            initial_value=get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_ATK, ConfigKeys.STAT_INITIAL_VALUE),
-            meta_bonus_base=get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_ATK, ConfigKeys.STAT_META_BONUS_BASE),
-            meta_bonus_exp=get_config_value(player_config_df,ConfigKeys.STAT_NAME, ConfigKeys.STAT_ATK, ConfigKeys.STAT_META_BONUS_EXP),
-            meta_cost_base=int(get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_ATK, ConfigKeys.STAT_META_COST_BASE)),
-            meta_cost_exp=int(get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_ATK, ConfigKeys.STAT_META_COST_EXP)),
-            level=0
-        )
-        stat_def = Meta_stat(
-            name=get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_DEF, ConfigKeys.STAT_NAME),
-            initial_value=get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_DEF, ConfigKeys.STAT_INITIAL_VALUE),
-            meta_bonus_base=get_config_value(player_config_df,ConfigKeys.STAT_NAME, ConfigKeys.STAT_DEF, ConfigKeys.STAT_META_BONUS_BASE),
-            meta_bonus_exp=get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_DEF, ConfigKeys.STAT_META_BONUS_EXP),
-            meta_cost_base=int(get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_DEF, ConfigKeys.STAT_META_COST_BASE)),
-            meta_cost_exp=int(get_config_value(player_config_df,ConfigKeys.STAT_NAME, ConfigKeys.STAT_DEF, ConfigKeys.STAT_META_COST_EXP)),
-            level=0
-        )
-        stat_max_hp = Meta_stat(
-            name=get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_MAX_HP, ConfigKeys.STAT_NAME),
-            initial_value=get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_MAX_HP, ConfigKeys.STAT_INITIAL_VALUE),
-            meta_bonus_base=get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_MAX_HP, ConfigKeys.STAT_META_BONUS_BASE),
-            meta_bonus_exp=int(get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_MAX_HP, ConfigKeys.STAT_META_BONUS_EXP)),
-            meta_cost_base=int(get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_MAX_HP, ConfigKeys.STAT_META_COST_BASE)),
-            meta_cost_exp=int(get_config_value(player_config_df, ConfigKeys.STAT_NAME,ConfigKeys.STAT_MAX_HP, ConfigKeys.STAT_META_COST_EXP)),
-            level=0
-        )       
+    def initialize(stat_table: MetaStatTable, log: Log, player_behavior: PlayerBehavior, action_costs: Tuple[float, ...],
+                   spend_all_gold: bool = False) -> 'Player_meta_progression':
+        if spend_all_gold:
+            stat_table.check_spend_all_gold()
+        stats = [Meta_stat(curve=curve, level=0) for curve in stat_table.curves]
         gold = 0
         chapter = 1
         chapter_run_try = 0
@@ -136,38 +273,75 @@ class Player_meta_progression:
         new_meta = Player_meta_progression(
             log=log,
             player_behavior=player_behavior,
-            action_time_costs=action_time_costs,
-            stat_atk=stat_atk,
-            stat_def=stat_def,
-            stat_max_hp=stat_max_hp,
+            action_costs=action_costs,
+            stats=stats,
+            stat_atk=stats[0],
+            stat_def=stats[1],
+            stat_max_hp=stats[2],
+            upgradeable=stat_table.upgradeable,
+            upgrade_heap=[],
+            spend_all_gold=spend_all_gold,
             gold=gold,
             chapter_level=chapter,
             chapter_run_try=chapter_run_try
         ) 
+        new_meta.rebuild_upgrade_heap()
 
         return new_meta
 
+    def rebuild_upgrade_heap(self):
+        # Needed whenever stat levels are changed from outside level_up_cheapest_stat
+        self.upgrade_heap = [(self.stats[index].get_cost(), index) for index in self.upgradeable]
+        heapq.heapify(self.upgrade_heap)
+
+    def get_stat_levels(self) -> Tuple[int, ...]:
+        return tuple(stat.level for stat in self.stats)
+
+    def set_stat_levels(self, levels: Tuple[int, ...]):
+        for stat, level in zip(self.stats, levels):
+            stat.level = level
+        self.rebuild_upgrade_heap()
+
     def add_gold(self, value:int):
         self.gold+= value
         return
     
     def get_cheapest_stat(self) -> Meta_stat:
-        stats = [self.stat_atk, self.stat_def, self.stat_max_hp]
-        return min(stats, key=lambda stat: stat.get_cost())
+        # Lowest cost, ties to the lowest index like min over the stats list
+        return self.stats[self.upgrade_heap[0][1]]
+
+    def level_up_cheapest_stat(self) -> Meta_stat:
+        cost, index = self.upgrade_heap[0]
+        stat = self.stats[index]
+        self.gold -= cost
+        stat.level_up()
+        heapq.heapreplace(self.upgrade_heap, (stat.get_cost(), index))
+        return stat
     
-    def simulate(self):
-    #get cheapest stat to upgrade
-        
-        stat = self.get_cheapest_stat()
-
-        if self.gold >= stat.get_cost():
-            self.gold -= stat.get_cost()
-            stat.level_up()
-            self.log.log_stat_level_up(stat.name, stat.get_level())
-
-        self.player_behavior.time_spent(self.action_time_costs[ConfigTimerActions.META_PROGRESSION.value])
-
-        return
+    def simulate(self) -> bool:
+    # Upgrades the cheapest stat if affordable (every affordable one with spend_all_gold), returns whether any was bought
+
+        upgraded = False
+        if self.spend_all_gold:
+            names: List[str] = []
+            levels: List[int] = []
+            while self.gold >= self.upgrade_heap[0][0]:
+                stat = self.level_up_cheapest_stat()
+                names.append(stat.name)
+                levels.append(stat.level)
+            upgraded = bool(names)
+            if upgraded and self.log.is_enabled_code(Log.Code.META_STAT_LEVEL_UP):
+                self.log.log_stat_level_ups(names, levels)
+
+        elif self.gold >= self.upgrade_heap[0][0]:
+            stat = self.level_up_cheapest_stat()
+            upgraded = True
+            if self.log.should_log_code(Log.Code.META_STAT_LEVEL_UP):
+                self.log.log_stat_level_up(stat.name, stat.get_level())
+
+        self.player_behavior.time_spent(self.action_costs[TimerCode.META_PROGRESSION])
+
+        return upgraded
 
     def chapter_level_up(self):
         self.chapter_level += 1
@@ -177,11 +351,9 @@ class Player_meta_progression:
         self.chapter_run_try += 1
         return
 
-@dataclass
+@dataclass(slots=True)
 class Player_Character:
 
-    log: Log
-
     stat_atk: int
     stat_def: int
     stat_hp: int
@@ -203,9 +375,8 @@ class Player_Character:
         return self.stat_hp <= 0
     
     @staticmethod
-    def initialize(stat_atk: int, stat_def:int, stat_max_hp:int, log:Log) -> 'Player_Character':
+    def initialize(stat_atk: int, stat_def:int, stat_max_hp:int) -> 'Player_Character':
         new_character =Player_Character(
-            log=log,
             stat_atk=stat_atk,
             stat_def=stat_def,
             stat_hp = stat_max_hp,
@@ -214,7 +385,139 @@ class Player_Character:
 
         return new_character
 
-@dataclass
+# Damage of a critical hit, as a multiple of the rolled damage
+CRIT_DAMAGE_MULTIPLIER = 2
+
+# Uniforms drawn per RandomStream refill
+RANDOM_BLOCK_SIZE = 4096
+
+# Consecutive defeats without gold or an upgrade after which a run with combat randomness counts as stuck,
+# a lucky roll can still win such a chapter so it isn't stuck after the first one
+MAX_STALLED_RANDOM_RUNS = 1000
+
+# Damage spread (share of the damage, both ways) and crit/miss chances of one side's attacks,
+# read from the optional randomness columns, empty cells count as 0
+@dataclass(frozen=True)
+class AttackRandomness:
+    damage_variance: float = 0.0
+    crit_chance: float = 0.0
+    miss_chance: float = 0.0
+    is_random: bool = False
+
+    @staticmethod
+    def initialize(damage_variance: float, crit_chance: float, miss_chance: float) -> 'AttackRandomness':
+        if not 0 <= damage_variance <= 1 or not 0 <= crit_chance <= 1 or not 0 <= miss_chance < 1:
+            raise ValueError(f"Invalid combat randomness: damage_variance={damage_variance}, crit_chance={crit_chance}, "
+                             f"miss_chance={miss_chance}, expected shares in [0, 1] and a miss chance below 1")
+        return AttackRandomness(
+            damage_variance=damage_variance,
+            crit_chance=crit_chance,
+            miss_chance=miss_chance,
+            is_random=damage_variance > 0 or crit_chance > 0 or miss_chance > 0
+        )
+
+    @staticmethod
+    def from_row(row: Dict[str, Any], variance_key: ConfigKeys, crit_key: ConfigKeys, miss_key: ConfigKeys) -> 'AttackRandomness':
+        return AttackRandomness.initialize(
+            get_optional_share(row, variance_key), get_optional_share(row, crit_key), get_optional_share(row, miss_key))
+
+    @staticmethod
+    def for_player(stats_table: Dict[str, Dict[str, Any]]) -> 'AttackRandomness':
+        return AttackRandomness.from_row(stats_table[ConfigKeys.STAT_ATK.value], ConfigKeys.STAT_DAMAGE_VARIANCE,
+                                         ConfigKeys.STAT_CRIT_CHANCE, ConfigKeys.STAT_MISS_CHANCE)
+
+    @staticmethod
+    def for_enemy(enemies_table: Dict[str, Dict[str, Any]], enemy_type: str) -> 'AttackRandomness':
+        return AttackRandomness.from_row(enemies_table[enemy_type], ConfigKeys.ENEMY_DAMAGE_VARIANCE,
+                                         ConfigKeys.ENEMY_CRIT_CHANCE, ConfigKeys.ENEMY_MISS_CHANCE)
+
+NO_RANDOMNESS = AttackRandomness()
+
+def get_optional_share(row: Dict[str, Any], key: ConfigKeys) -> float:
+    value = row.get(key.value)
+    if value is None or value == "" or (isinstance(value, float) and value != value):
+        return 0.0
+    return float(value)
+
+# Whether any side of the config's battles rolls its damage, built once per Config
+@dataclass(frozen=True)
+class CombatRandomness:
+    player: AttackRandomness
+    enemies: Dict[str, AttackRandomness]
+
+    @staticmethod
+    def initialize(config: Config) -> 'CombatRandomness':
+        config_index = config.get_index()
+        return CombatRandomness(
+            player=AttackRandomness.for_player(config_index.stats),
+            enemies={enemy_type: AttackRandomness.for_enemy(config_index.enemies, enemy_type) for enemy_type in config_index.enemies}
+        )
+
+    @staticmethod
+    def get(config: Config) -> 'CombatRandomness':
+        return config.get_compiled("combat_randomness", CombatRandomness.initialize)
+
+    def is_stochastic(self) -> bool:
+        return self.player.is_random or any(randomness.is_random for randomness in self.enemies.values())
+
+# Uniform draws of one side of a run's battles, generated a block at a time instead of one RNG call per attack
+@dataclass(slots=True)
+class RandomStream:
+    generator: np.random.Generator
+    block: List[float]
+    position: int
+    # Bit generator state the current block was drawn from, with position it rewinds the stream (see get_state)
+    block_state: Dict[str, Any]
+
+    @staticmethod
+    def initialize(seed_sequence: np.random.SeedSequence) -> 'RandomStream':
+        return RandomStream(generator=np.random.default_rng(seed_sequence), block=[], position=0, block_state={})
+
+    @staticmethod
+    def spawn_combat_streams(seed: Optional[int]) -> Tuple['RandomStream', 'RandomStream']:
+        # (player, enemy) streams of a run. Keyed by the run's seed only, so a run draws the same numbers
+        # whichever worker plays it, and the player's draws don't shift when only enemy chances change
+        player_sequence, enemy_sequence = np.random.SeedSequence(seed).spawn(2)
+        return RandomStream.initialize(player_sequence), RandomStream.initialize(enemy_sequence)
+
+    def refill(self):
+        self.block_state = self.generator.bit_generator.state
+        self.block = self.generator.random(RANDOM_BLOCK_SIZE).tolist()
+        self.position = 0
+
+    def draw(self) -> float:
+        if self.position == len(self.block):
+            self.refill()
+        value = self.block[self.position]
+        self.position += 1
+        return value
+
+    def roll_damage(self, damage: int, randomness: AttackRandomness) -> int:
+        # Three draws per attack whatever the chances, so editing one chance doesn't shift the others' draws
+        miss, spread, crit = self.draw(), self.draw(), self.draw()
+        if miss < randomness.miss_chance:
+            return 0
+        if randomness.damage_variance > 0:
+            damage = max(0, round(damage * (1 + randomness.damage_variance * (2 * spread - 1))))
+        if crit < randomness.crit_chance:
+            damage *= CRIT_DAMAGE_MULTIPLIER
+        return damage
+
+    def get_state(self) -> Optional[Tuple[Dict[str, Any], int]]:
+        # None until the first draw
+        if not self.block:
+            return None
+        return (self.block_state, self.position)
+
+    def set_state(self, state: Optional[Tuple[Dict[str, Any], int]]):
+        if state is None:
+            return
+        block_state, position = state
+        self.generator.bit_generator.state = block_state
+        self.refill()
+        self.position = position
+
+@dataclass(slots=True)
 class EnemyCharacter:
 
     class Enemy_Types (Enum):
@@ -222,13 +525,13 @@ class EnemyCharacter:
         SKELETON = "skeleton"
         BOSS = "boss"
 
-    log:Log
-   
     type: Enemy_Types
     stat_atk: int
     stat_def: int
     stat_max_hp: int
     stat_hp: int
+    randomness: AttackRandomness = NO_RANDOMNESS
+    battle_table: Optional['BattleTable'] = None
 
     def modify_atk(self, value: int):
         self.stat_atk += value
@@ -243,20 +546,78 @@ class EnemyCharacter:
         return self.stat_hp <= 0
     
     @staticmethod
-    def initialize(enemies_config, enemy_type: Enemy_Types, log: Log) -> 'EnemyCharacter':
+    def initialize(enemies_table: Dict[str, Dict[str, Any]], enemy_type: Enemy_Types) -> 'EnemyCharacter':
+        return EnemyTemplate.initialize(enemies_table, enemy_type).spawn()
+
+# Enemy stats resolved once from the ENEMIES sheet, every battle spawns a fresh EnemyCharacter from it
+@dataclass(frozen=True)
+class EnemyTemplate:
+    type: EnemyCharacter.Enemy_Types
+    stat_atk: int
+    stat_def: int
+    stat_max_hp: int
+    randomness: AttackRandomness
+    battle_table: Optional['BattleTable'] = None
+
+    @staticmethod
+    def initialize(enemies_table: Dict[str, Dict[str, Any]], enemy_type: EnemyCharacter.Enemy_Types,
+                   battle_table: Optional['BattleTable'] = None) -> 'EnemyTemplate':
+        return EnemyTemplate(
+            type=enemy_type,
+            stat_atk=get_config_value_str_row(enemies_table, enemy_type.value, ConfigKeys.ENEMY_ATK),
+            stat_def=get_config_value_str_row(enemies_table, enemy_type.value, ConfigKeys.ENEMY_DEF),
+            stat_max_hp=get_config_value_str_row(enemies_table, enemy_type.value, ConfigKeys.ENEMY_MAX_HP),
+            randomness=AttackRandomness.for_enemy(enemies_table, enemy_type.value),
+            battle_table=battle_table
+        )
+
+    def spawn(self) -> EnemyCharacter:
+        return EnemyCharacter(
+            type=self.type,
+            stat_atk=self.stat_atk,
+            stat_def=self.stat_def,
+            stat_max_hp=self.stat_max_hp,
+            stat_hp=self.stat_max_hp,
+            randomness=self.randomness,
+            battle_table=self.battle_table
+        )
+
+
+# Objects shared by every day of a run, passed along instead of being stored in each Day
+@dataclass(slots=True)
+class RunContext:
+    log: Log
+    player_behavior: PlayerBehavior
+    # ActionTable.costs, indexed by TimerCode
+    action_costs: Tuple[float, ...]
+    # Whether battles are played attack by attack for the combat trace
+    trace_combat: bool
+    # Streams of the stochastic combat, None when no side of the config rolls its damage
+    player_stream: Optional[RandomStream] = None
+    enemy_stream: Optional[RandomStream] = None
+    player_randomness: AttackRandomness = NO_RANDOMNESS
 
-        new_enemy = EnemyCharacter(
+    @staticmethod
+    def initialize(log: Log, player_behavior: PlayerBehavior, action_table: ActionTable,
+                   combat_streams: Tuple[RandomStream, ...] = (), player_randomness: AttackRandomness = NO_RANDOMNESS) -> 'RunContext':
+        player_stream, enemy_stream = combat_streams or (None, None)
+        return RunContext(
             log=log,
-            type = enemy_type,
-            stat_atk= get_config_value_str_row(enemies_config, ConfigKeys.ENEMY_TYPE, enemy_type.value, ConfigKeys.ENEMY_ATK),
-            stat_def= get_config_value_str_row(enemies_config, ConfigKeys.ENEMY_TYPE, enemy_type.value, ConfigKeys.ENEMY_DEF),
-            stat_max_hp= get_config_value_str_row(enemies_config, ConfigKeys.ENEMY_TYPE, enemy_type.value, ConfigKeys.ENEMY_MAX_HP),
-            stat_hp= get_config_value_str_row(enemies_config, ConfigKeys.ENEMY_TYPE, enemy_type.value, ConfigKeys.ENEMY_MAX_HP)
+            player_behavior=player_behavior,
+            action_costs=action_table.costs,
+            trace_combat=log.is_enabled_code(Log.Code.PLAYER_ATTACK) or log.is_enabled_code(Log.Code.ENEMY_ATTACK),
+            player_stream=player_stream,
+            enemy_stream=enemy_stream,
+            player_randomness=player_randomness
         )
 
-        return new_enemy
+# Day events that aren't battles are coded by the timer code of their cost
+BATTLE_EVENT_CODE = -1
 
-@dataclass
+# Turns of a battle (player and enemy attacks) past which it counts as a stalemate, whatever path resolves it
+MAX_BATTLE_TURNS = 1000
+
+@dataclass(slots=True)
 class Day:
 
     class EventType(Enum):
@@ -265,189 +626,491 @@ class Day:
         INCREASE_MAX_HP = "increase_max_hp"
         RESTORE_HP = "restore_hp"
         BATTLE = "battle"    
-    log: Log
-    playerbehavior: PlayerBehavior
-    action_time_costs: Dict[str, float]
     chapter_num: int
     day_num: int
     event_type: EventType
+    event_code: int
     event_param: Any
     gold_reward: int
     event_enemy: Optional[EnemyCharacter]
 
     @staticmethod
-    def initialize(day_config, enemies_config, log: Log, playerbehavior: PlayerBehavior, action_time_costs: Dict[str, float]) -> 'Day':
-        event_name = day_config[ConfigKeys.CHAPTER_DAILY_EVENT.value]
-        event_type = Day.EventType(event_name)
-        event_param = day_config[ConfigKeys.CHAPTER_DAILY_EVENT_PARAM.value]
-        gold_reward = int(day_config[ConfigKeys.CHAPTER_DAILY_GOLD_REWARD.value]) 
-        chapter_num = int(day_config[ConfigKeys.CHAPTER_NUM.value])
-        day_num = int(day_config[ConfigKeys.CHAPTER_DAY_NUM.value])
-
-        # Convert event_param to int for numeric operations
-        if event_type in [Day.EventType.INCREASE_ATK, Day.EventType.INCREASE_DEF, 
-                      Day.EventType.INCREASE_MAX_HP, Day.EventType.RESTORE_HP]:
-            event_param = int(event_param)
-
-        enemy_type = None
-        if event_type == Day.EventType.BATTLE:
-            enemy_type = EnemyCharacter.Enemy_Types(event_param) 
+    def initialize(day_plan: 'DayPlan') -> 'Day':
 
         new_day =  Day(
-            log=log,
-            playerbehavior=playerbehavior,
-            action_time_costs=action_time_costs,
-            chapter_num=chapter_num,
-            day_num=day_num,
-            event_type=event_type,
-            event_param=event_param,
-            gold_reward=gold_reward,
-            event_enemy=EnemyCharacter.initialize(
-                enemies_config,
-                enemy_type,
-                log
-            ) if enemy_type else None
+            chapter_num=day_plan.chapter_num,
+            day_num=day_plan.day_num,
+            event_type=day_plan.event_type,
+            event_code=day_plan.event_code,
+            event_param=day_plan.event_param,
+            gold_reward=day_plan.gold_reward,
+            event_enemy=day_plan.enemy.spawn() if day_plan.enemy else None
         )   
 
         return new_day
 
-    def simulate(self, player_character: Player_Character, meta_progression: Player_meta_progression):
-
-        self.log.log_chapter_run_day_completed(
-            chapter_num=self.chapter_num,
-            day_num=self.day_num,
-            event_type=self.event_type.value,
-            event_param=self.event_param,
-            player_hp=player_character.stat_hp,
-            player_max_hp=player_character.stat_max_hp,
-            player_atk=player_character.stat_atk,
-            player_def=player_character.stat_def
-        )
+    def simulate(self, context: RunContext, player_character: Player_Character, meta_progression: Player_meta_progression):
+
+        log = context.log
+        if log.should_log_code(Log.Code.DAY_COMPLETED):
+            log.log_chapter_run_day_completed(
+                chapter_num=self.chapter_num,
+                day_num=self.day_num,
+                event_type=self.event_type.value,
+                event_param=self.event_param,
+                player_hp=player_character.stat_hp,
+                player_max_hp=player_character.stat_max_hp,
+                player_atk=player_character.stat_atk,
+                player_def=player_character.stat_def
+            )
         
-        match self.event_type:
-            case Day.EventType.INCREASE_ATK:
-                player_character.modify_atk(self.event_param)
+        code = self.event_code
+        if code == BATTLE_EVENT_CODE:
+            if self.event_enemy is None:
+                raise ValueError("Battle event requires an enemy character.")
+            battle_steps = self.simulate_battle(context, meta_progression.chapter_run_try,player_character, self.event_enemy)
+            if(not player_character.is_dead()):
                 meta_progression.add_gold(self.gold_reward)
-                self.playerbehavior.time_spent(self.action_time_costs[ConfigTimerActions.EVENT_INCREASE_ATK.value])
-            case Day.EventType.INCREASE_DEF:
-                player_character.modify_def(self.event_param)
-                meta_progression.add_gold(self.gold_reward)
-                self.playerbehavior.time_spent(self.action_time_costs[ConfigTimerActions.EVENT_INCREASE_DEF.value])
-            case Day.EventType.INCREASE_MAX_HP:
-                player_character.modify_max_hp(self.event_param)
-                meta_progression.add_gold(self.gold_reward)
-                self.playerbehavior.time_spent(self.action_time_costs[ConfigTimerActions.EVENT_INCREASE_MAX_HP.value])
-            case Day.EventType.RESTORE_HP:
-                player_character.modify_hp(self.event_param)
-                meta_progression.add_gold(self.gold_reward)
-                self.playerbehavior.time_spent(self.action_time_costs[ConfigTimerActions.EVENT_RESTORE_HP.value])
-            case Day.EventType.BATTLE:
-                if self.event_enemy is None:
-                    raise ValueError("Battle event requires an enemy character.")
-                self.simulate_battle(meta_progression.chapter_run_try,player_character, self.event_enemy, self.log)
-                if(not player_character.is_dead()):
-                    meta_progression.add_gold(self.gold_reward)
-            case _:
-                raise ValueError(f"Unknown event type: {self._event_type}")
+            return battle_steps
+
+        DAY_EVENT_EFFECTS[code](player_character, self.event_param)
+        meta_progression.add_gold(self.gold_reward)
+        context.player_behavior.time_spent(context.action_costs[code])
+
+        return None
+
+    def replay(self, context: RunContext, outcome: 'DayOutcome'):
+        # Same timer and log effects as simulate, taken from a recorded outcome of this day
+        log = context.log
+        if log.should_log_code(Log.Code.DAY_COMPLETED):
+            log.log_chapter_run_day_completed(
+                chapter_num=self.chapter_num,
+                day_num=self.day_num,
+                event_type=self.event_type.value,
+                event_param=self.event_param,
+                player_hp=outcome.player_hp,
+                player_max_hp=outcome.player_max_hp,
+                player_atk=outcome.player_atk,
+                player_def=outcome.player_def
+            )
 
-        return
+        if outcome.battle_steps is None:
+            context.player_behavior.time_spent(context.action_costs[self.event_code])
+            return
+
+        # No turns means the enemy was dead from the start, resolve_battle logged nothing either
+        if outcome.battle_steps == 0:
+            return
+
+        context.player_behavior.time_spent_cycle(
+            (context.action_costs[TimerCode.BATTLE_PLAYER_TURN], context.action_costs[TimerCode.BATTLE_ENEMY_TURN]),
+            outcome.battle_steps)
+        Day.log_battle_result(log, self.event_enemy.type.value, outcome.player_hp_after > 0,
+                               outcome.player_hp_after, outcome.enemy_hp_after, outcome.player_damage)
+
+    def simulate_battle(self, context: RunContext, run_try: int, player_character: Player_Character, enemy: EnemyCharacter) -> Optional[int]:
+        # Per-round attack rows are only needed for the combat trace, and rolled damage can't be solved
+        # in closed form, otherwise solve the fight directly
+        if context.trace_combat or (context.player_stream is not None and (context.player_randomness.is_random or enemy.randomness.is_random)):
+            self.simulate_battle_rounds(context, run_try, player_character, enemy)
+            return None
+
+        return self.resolve_battle(context, player_character, enemy)
+
+    def resolve_battle(self, context: RunContext, player_character: Player_Character, enemy: EnemyCharacter) -> int:
+        # Returns the number of turns played
+        log = context.log
+
+        if player_character.is_dead() or enemy.is_dead():
+            return 0
+
+        atk, defense = player_character.stat_atk, player_character.stat_def
+        table = enemy.battle_table
+        if (table is not None and enemy.stat_hp == enemy.stat_max_hp
+                and 0 <= atk < len(table.player_hits_by_atk) and 0 <= defense < len(table.damage_to_player_by_def)):
+            # One lookup per stat, see BattleTable
+            damage_to_enemy = table.damage_to_enemy_by_atk[atk]
+            damage_to_player = table.damage_to_player_by_def[defense]
+            player_hits_to_kill = table.player_hits_by_atk[atk] or None
+            turn_costs = table.turn_costs
+        else:
+            damage_to_enemy = max(0, atk - enemy.stat_def)
+            damage_to_player = max(0, enemy.stat_atk - defense)
+            # Hits the player needs to land (int() for float stats edited in the sheets)
+            player_hits_to_kill = int(-(-enemy.stat_hp // damage_to_enemy)) if damage_to_enemy > 0 else None
+            turn_costs = (context.action_costs[TimerCode.BATTLE_PLAYER_TURN], context.action_costs[TimerCode.BATTLE_ENEMY_TURN])
+        assert not(damage_to_enemy == 0 and damage_to_player == 0), "Infinite battle detected, both 0 damage"
+
+        # Hits the enemy needs to land, the player always strikes first
+        enemy_hits_to_kill = int(-(-player_character.stat_hp // damage_to_player)) if damage_to_player > 0 else None
+        victory = enemy_hits_to_kill is None or (player_hits_to_kill is not None and player_hits_to_kill <= enemy_hits_to_kill)
+
+        if victory:
+            player_turns = player_hits_to_kill
+            enemy_turns = player_hits_to_kill - 1
+        else:
+            player_turns = enemy_hits_to_kill
+            enemy_turns = enemy_hits_to_kill
+
+        # Same ceiling as simulate_battle_rounds, so the log verbosity never decides whether a config fails
+        assert player_turns + enemy_turns <= MAX_BATTLE_TURNS, "Possible infinite loop detected in battle simulation"
+
+        enemy.modify_hp(-damage_to_enemy * player_turns)
+        player_character.modify_hp(-damage_to_player * enemy_turns)
 
-    def simulate_battle(self, run_try: int, player_character: Player_Character, enemy: EnemyCharacter, log: Log):
+        context.player_behavior.time_spent_cycle(turn_costs, player_turns + enemy_turns)
+
+        Day.log_battle_result(log, enemy.type.value, victory, player_character.stat_hp, enemy.stat_hp, damage_to_enemy)
+
+        return player_turns + enemy_turns
+
+    @staticmethod
+    def log_battle_result(log: Log, enemy_type: str, victory: bool, player_hp: int, enemy_hp: int, player_damage: int):
+        if victory:
+            if log.should_log_code(Log.Code.BATTLE_VICTORY):
+                log.log_battle_victory(
+                    enemy_type=enemy_type,
+                    player_hp=player_hp,
+                    enemy_hp=enemy_hp,
+                    player_damage=player_damage
+                )
+        else:
+            if log.should_log_code(Log.Code.BATTLE_DEFEAT):
+                log.log_battle_defeat(
+                    enemy_type=enemy_type,
+                    enemy_hp=enemy_hp
+                )
+
+    def simulate_battle_rounds(self, context: RunContext, run_try: int, player_character: Player_Character, enemy: EnemyCharacter):
+        log = context.log
+        # Streams only of the sides that roll their damage
+        player_stream = context.player_stream if context.player_randomness.is_random else None
+        enemy_stream = context.enemy_stream if enemy.randomness.is_random else None
 
         combat_rounds = 0
 
         while not player_character.is_dead() and not enemy.is_dead():
             
-            assert combat_rounds < 1000, "Possible infinite loop detected in battle simulation"
+            assert combat_rounds < MAX_BATTLE_TURNS, "Possible infinite loop detected in battle simulation"
             # Player attacks enemy
             combat_rounds += 1
-            damage_to_enemy = max(0, player_character.stat_atk - enemy.stat_def)
+            base_damage_to_enemy = damage_to_enemy = max(0, player_character.stat_atk - enemy.stat_def)
+            if player_stream is not None:
+                damage_to_enemy = player_stream.roll_damage(base_damage_to_enemy, context.player_randomness)
             enemy.modify_hp(-damage_to_enemy)
-            log.log_player_attack(
-                chapter=self.chapter_num,
-                chapter_run_try=run_try,
-                day=self.day_num,
-                combat_round=combat_rounds,
-                enemy_type=enemy.type.value,
-                damage=damage_to_enemy,
-                enemy_hp=enemy.stat_hp
-            )
-            self.playerbehavior.time_spent(self.action_time_costs[ConfigTimerActions.BATTLE_PLAYER_TURN.value])
+            if log.should_log_code(Log.Code.PLAYER_ATTACK):
+                log.log_player_attack(
+                    chapter=self.chapter_num,
+                    chapter_run_try=run_try,
+                    day=self.day_num,
+                    combat_round=combat_rounds,
+                    enemy_type=enemy.type.value,
+                    damage=damage_to_enemy,
+                    enemy_hp=enemy.stat_hp
+                )
+            context.player_behavior.time_spent(context.action_costs[TimerCode.BATTLE_PLAYER_TURN])
 
             if enemy.is_dead():
 
-                log.log_battle_victory(
-                    enemy_type=enemy.type.value,
-                    player_hp=player_character.stat_hp,
-                    enemy_hp=enemy.stat_hp,
-                    player_damage=damage_to_enemy
-                )
+                if log.should_log_code(Log.Code.BATTLE_VICTORY):
+                    log.log_battle_victory(
+                        enemy_type=enemy.type.value,
+                        player_hp=player_character.stat_hp,
+                        enemy_hp=enemy.stat_hp,
+                        player_damage=damage_to_enemy
+                    )
                 break
 
 
             # Enemy attacks player
             combat_rounds += 1
-            damage_to_player = max(0, enemy.stat_atk - player_character.stat_def)
+            base_damage_to_player = damage_to_player = max(0, enemy.stat_atk - player_character.stat_def)
+            if enemy_stream is not None:
+                damage_to_player = enemy_stream.roll_damage(base_damage_to_player, enemy.randomness)
             player_character.modify_hp(-damage_to_player)
-            log.log_enemy_attack(
-                chapter=self.chapter_num,
-                chapter_run_try=run_try,
-                day=self.day_num,
-                combat_round=combat_rounds,
-                enemy_type=enemy.type.value,
-                damage=damage_to_player,
-                player_hp=player_character.stat_hp,
-                enemy_hp=enemy.stat_hp
-            )
-            self.playerbehavior.time_spent(self.action_time_costs[ConfigTimerActions.BATTLE_ENEMY_TURN.value])
+            if log.should_log_code(Log.Code.ENEMY_ATTACK):
+                log.log_enemy_attack(
+                    chapter=self.chapter_num,
+                    chapter_run_try=run_try,
+                    day=self.day_num,
+                    combat_round=combat_rounds,
+                    enemy_type=enemy.type.value,
+                    damage=damage_to_player,
+                    player_hp=player_character.stat_hp,
+                    enemy_hp=enemy.stat_hp
+                )
+            context.player_behavior.time_spent(context.action_costs[TimerCode.BATTLE_ENEMY_TURN])
 
             if player_character.is_dead():
 
-                log.log_battle_defeat(
-                    enemy_type=enemy.type.value,
-                    enemy_hp= enemy.stat_hp
-                )
+                if log.should_log_code(Log.Code.BATTLE_DEFEAT):
+                    log.log_battle_defeat(
+                        enemy_type=enemy.type.value,
+                        enemy_hp= enemy.stat_hp
+                    )
 
                 break
 
-            assert not(damage_to_enemy == 0 and damage_to_player == 0), "Infinite battle detected, both 0 damage"
+            assert not(base_damage_to_enemy == 0 and base_damage_to_player == 0), "Infinite battle detected, both 0 damage"
 
         return
 
+# Integer code of every day event, see BATTLE_EVENT_CODE
+DAY_EVENT_CODES = {
+    Day.EventType.INCREASE_ATK: TimerCode.EVENT_INCREASE_ATK,
+    Day.EventType.INCREASE_DEF: TimerCode.EVENT_INCREASE_DEF,
+    Day.EventType.INCREASE_MAX_HP: TimerCode.EVENT_INCREASE_MAX_HP,
+    Day.EventType.RESTORE_HP: TimerCode.EVENT_RESTORE_HP,
+    Day.EventType.BATTLE: BATTLE_EVENT_CODE,
+}
+
+# Stat change of every non-battle day event, indexed by its code
+DAY_EVENT_EFFECTS = (
+    Player_Character.modify_atk,
+    Player_Character.modify_def,
+    Player_Character.modify_max_hp,
+    Player_Character.modify_hp,
+)
+
+# Upper bound on the length of a BattleTable axis, stats past it are resolved without the table
+MAX_BATTLE_TABLE_STAT = 1 << 16
+
+# Battle lookups against one enemy type at full HP, built once per Config as dense arrays over the reachable stats:
+# indexed by the player's atk, the damage it deals and the hits it needs (0: can't hurt it), indexed by its def,
+# the damage it takes. The player's HP changes between fights, so only its hits to die are left to compute.
+@dataclass(frozen=True)
+class BattleTable:
+    enemy_type: EnemyCharacter.Enemy_Types
+    damage_to_enemy: np.ndarray
+    player_hits_to_kill: np.ndarray
+    damage_to_player: np.ndarray
+    # BATTLE_PLAYER_TURN and BATTLE_ENEMY_TURN costs
+    turn_costs: Tuple[float, float]
+    # List copies of the arrays, indexing them with a Python int is much cheaper than indexing an ndarray
+    damage_to_enemy_by_atk: List[int]
+    player_hits_by_atk: List[int]
+    damage_to_player_by_def: List[int]
+
+    @staticmethod
+    def initialize(template: 'EnemyTemplate', atk_limit: int, def_limit: int, turn_costs: Tuple[float, float]) -> 'BattleTable':
+        atk = np.arange(atk_limit, dtype=np.int64)
+        defense = np.arange(def_limit, dtype=np.int64)
+        damage_to_enemy = np.maximum(0, atk - template.stat_def)
+        player_hits_to_kill = np.where(damage_to_enemy > 0, -(-template.stat_max_hp // np.maximum(damage_to_enemy, 1)), 0)
+        damage_to_player = np.maximum(0, template.stat_atk - defense)
+
+        return BattleTable(
+            enemy_type=template.type,
+            damage_to_enemy=damage_to_enemy,
+            player_hits_to_kill=player_hits_to_kill,
+            damage_to_player=damage_to_player,
+            turn_costs=turn_costs,
+            damage_to_enemy_by_atk=damage_to_enemy.tolist(),
+            player_hits_by_atk=player_hits_to_kill.tolist(),
+            damage_to_player_by_def=damage_to_player.tolist()
+        )
+
+    @staticmethod
+    def build_all(config: Config) -> Dict[EnemyCharacter.Enemy_Types, 'BattleTable']:
+        # Empty when some stat isn't a whole number (edited sheets), those battles are solved without tables
+        atk_limit = get_reachable_stat_limit(config, ConfigKeys.STAT_ATK, Day.EventType.INCREASE_ATK)
+        def_limit = get_reachable_stat_limit(config, ConfigKeys.STAT_DEF, Day.EventType.INCREASE_DEF)
+        if atk_limit is None or def_limit is None:
+            return {}
+
+        costs = ActionTable.get(config).costs
+        turn_costs = (costs[TimerCode.BATTLE_PLAYER_TURN], costs[TimerCode.BATTLE_ENEMY_TURN])
+        enemies_table = config.get_index().enemies
+        tables: Dict[EnemyCharacter.Enemy_Types, BattleTable] = {}
+        for enemy_type in EnemyCharacter.Enemy_Types:
+            if enemy_type.value not in enemies_table:
+                continue
+            template = EnemyTemplate.initialize(enemies_table, enemy_type)
+            if all(is_whole_number(value) for value in (template.stat_atk, template.stat_def, template.stat_max_hp)):
+                tables[enemy_type] = BattleTable.initialize(template, atk_limit, def_limit, turn_costs)
+        return tables
+
+    @staticmethod
+    def get_tables(config: Config) -> Dict[EnemyCharacter.Enemy_Types, 'BattleTable']:
+        return config.get_compiled("battle_tables", BattleTable.build_all)
+
+def is_whole_number(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def get_reachable_stat_limit(config: Config, stat: ConfigKeys, event_type: 'Day.EventType') -> Optional[int]:
+    # One past the highest value the stat reaches within the precomputed meta levels plus the biggest
+    # boost one chapter run gives it, capped to MAX_BATTLE_TABLE_STAT
+    curve = next(curve for curve in MetaStatTable.get(config).curves if curve.name == stat.value)
+    if not is_whole_number(curve.initial_value) or not is_whole_number(curve.meta_bonus_exp):
+        return None
+
+    # Read from the sheet rather than the chapter plans, which are built with these tables
+    chapter_boosts: Dict[int, int] = {}
+    for day_config in config.get_all_chapters_config().to_dict(orient="records"):
+        if day_config[ConfigKeys.CHAPTER_DAILY_EVENT.value] == event_type.value:
+            chapter_num = int(day_config[ConfigKeys.CHAPTER_NUM.value])
+            boost = max(0, int(day_config[ConfigKeys.CHAPTER_DAILY_EVENT_PARAM.value]))
+            chapter_boosts[chapter_num] = chapter_boosts.get(chapter_num, 0) + boost
+
+    highest = max(curve.get_value(0), curve.get_value(META_CURVE_LEVELS)) + max(chapter_boosts.values(), default=0)
+    return max(1, min(highest + 1, MAX_BATTLE_TABLE_STAT))
+
+
+# -----------------------------
+#     Compiled Chapter Plans
+# -----------------------------
+
+@dataclass(frozen=True)
+class DayPlan:
+    chapter_num: int
+    day_num: int
+    event_type: Day.EventType
+    event_code: int
+    event_param: Any
+    gold_reward: int
+    enemy: Optional[EnemyTemplate]
+
+    @staticmethod
+    def initialize(day_config, enemy_templates: Dict[EnemyCharacter.Enemy_Types, EnemyTemplate]) -> 'DayPlan':
+        event_name = day_config[ConfigKeys.CHAPTER_DAILY_EVENT.value]
+        event_type = Day.EventType(event_name)
+        event_param = day_config[ConfigKeys.CHAPTER_DAILY_EVENT_PARAM.value]
+        gold_reward = int(day_config[ConfigKeys.CHAPTER_DAILY_GOLD_REWARD.value]) 
+        chapter_num = int(day_config[ConfigKeys.CHAPTER_NUM.value])
+        day_num = int(day_config[ConfigKeys.CHAPTER_DAY_NUM.value])
+
+        # Convert event_param to int for numeric operations
+        if event_type in [Day.EventType.INCREASE_ATK, Day.EventType.INCREASE_DEF, 
+                      Day.EventType.INCREASE_MAX_HP, Day.EventType.RESTORE_HP]:
+            event_param = int(event_param)
+
+        enemy = None
+        if event_type == Day.EventType.BATTLE:
+            enemy = enemy_templates[EnemyCharacter.Enemy_Types(event_param)]
+
+        return DayPlan(
+            chapter_num=chapter_num,
+            day_num=day_num,
+            event_type=event_type,
+            event_code=DAY_EVENT_CODES[event_type],
+            event_param=event_param,
+            gold_reward=gold_reward,
+            enemy=enemy
+        )
+
+# Immutable description of a chapter, built once per Config and shared by every run and retry
+@dataclass(frozen=True)
+class ChapterPlan:
+    chapter_num: int
+    days: Tuple[DayPlan, ...]
+
+    @staticmethod
+    def compile_all(config: Config) -> Dict[int, 'ChapterPlan']:
+        enemies_table = config.get_index().enemies
+        battle_tables = BattleTable.get_tables(config)
+        enemy_templates = {
+            enemy_type: EnemyTemplate.initialize(enemies_table, enemy_type, battle_tables.get(enemy_type))
+            for enemy_type in EnemyCharacter.Enemy_Types
+            if enemy_type.value in enemies_table
+        }
+
+        chapter_days: Dict[int, List[DayPlan]] = {}
+        for day_config in config.get_all_chapters_config().to_dict(orient="records"):
+            day_plan = DayPlan.initialize(day_config, enemy_templates)
+            chapter_days.setdefault(day_plan.chapter_num, []).append(day_plan)
+
+        return {
+            chapter_num: ChapterPlan(chapter_num=chapter_num, days=tuple(days))
+            for chapter_num, days in chapter_days.items()
+        }
+
+    @staticmethod
+    def get_plans(config: Config) -> Dict[int, 'ChapterPlan']:
+        return config.get_compiled("chapter_plans", ChapterPlan.compile_all)
+
+
+# -----------------------------
+#     Chapter Outcome Cache
+# -----------------------------
+
+# What a played day left behind: the values its logs need and the number of battle turns to replay on the timer
+@dataclass(frozen=True)
+class DayOutcome:
+    player_hp: int
+    player_max_hp: int
+    player_atk: int
+    player_def: int
+    battle_steps: Optional[int]
+    player_hp_after: int
+    enemy_hp_after: Optional[int]
+    player_damage: Optional[int]
+
+# A chapter run only depends on the chapter and the starting stats, never on the timer
+@dataclass(frozen=True)
+class ChapterOutcome:
+    victory: bool
+    gold_earned: int
+    days: Tuple[DayOutcome, ...]
+
+# LRU of chapter outcomes keyed by (chapter, atk, def, max_hp), compiled per Config so every run of a batch shares it
+@dataclass
+class ChapterOutcomeCache:
+    max_size: int = 4096
+    entries: 'OrderedDict[Tuple, ChapterOutcome]' = field(default_factory=OrderedDict)
+    hits: int = 0
+    misses: int = 0
+
+    @staticmethod
+    def get_cache(config: Config) -> 'ChapterOutcomeCache':
+        return config.get_compiled("chapter_outcomes", lambda _: ChapterOutcomeCache())
+
+    def get(self, key: Tuple) -> Optional[ChapterOutcome]:
+        outcome = self.entries.get(key)
+        if outcome is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return outcome
+
+    def put(self, key: Tuple, outcome: ChapterOutcome):
+        self.entries[key] = outcome
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
 
 @dataclass
 class Chapter:
 
-    log: Log
-    player_behavior: PlayerBehavior
-    action_time_costs: Dict[str, float]
+    context: RunContext
 
     days: List[Day]
     player_character: Player_Character
     meta_progression: Player_meta_progression
 
+    # Recorded or replayed outcome of the run, when it went through the outcome cache
+    outcome: Optional[ChapterOutcome] = None
+
     @staticmethod
-    def initialize(chapter_config_df, meta_progression: Player_meta_progression, enemies_config_df, log: Log, player_behavior: PlayerBehavior, action_time_costs: Dict[str, float]) -> 'Chapter':
+    def initialize(chapter_plan: ChapterPlan, meta_progression: Player_meta_progression, context: RunContext) -> 'Chapter':
 
         #Instantiate the player characteer
         player_character = Player_Character.initialize(
             meta_progression.stat_atk.get_value(),
             meta_progression.stat_def.get_value(),
-            meta_progression.stat_max_hp.get_value(),
-            log=log
+            meta_progression.stat_max_hp.get_value()
             )    
         
         #Instantiate the day list with all the events
         days: List[Day] = []
-        for index,day_config in chapter_config_df.iterrows():
-            new_day = Day.initialize(day_config, enemies_config_df, log, player_behavior , action_time_costs)
+        for day_plan in chapter_plan.days:
+            new_day = Day.initialize(day_plan)
             days.append(new_day)
     
         #Create the new chapter
         chapter = Chapter(
-            log=log,
-            player_behavior=player_behavior,
-            action_time_costs=action_time_costs,
+            context=context,
             days=days,
             player_character=player_character,
             meta_progression=meta_progression
@@ -456,28 +1119,92 @@ class Chapter:
         return chapter
 
 
-    def simulate(self) -> bool:
+    def simulate(self, outcome_cache: Optional[ChapterOutcomeCache] = None) -> bool:
 
-        victory = True
+        if outcome_cache is None:
+            victory = self.simulate_days()
+        else:
+            key = (self.meta_progression.chapter_level, self.player_character.stat_atk,
+                   self.player_character.stat_def, self.player_character.stat_max_hp)
+            outcome = outcome_cache.get(key)
+            if outcome is None:
+                outcome = self.record_days()
+                outcome_cache.put(key, outcome)
+            else:
+                self.replay_days(outcome)
+            self.outcome = outcome
+            victory = outcome.victory
+
+        log = self.context.log
+        if victory:
+            if log.should_log_code(Log.Code.CHAPTER_VICTORY):
+                log.log_chapter_victory(self.meta_progression.chapter_level, self.meta_progression.chapter_run_try)
+        else:
+            if log.should_log_code(Log.Code.CHAPTER_DEFEAT):
+                log.log_chapter_defeat(self.meta_progression.chapter_level)
 
+        return victory
+
+    def simulate_days(self) -> bool:
         for day in self.days:
-            day.simulate(self.player_character, self.meta_progression)
+            day.simulate(self.context, self.player_character, self.meta_progression)
             if(self.player_character.is_dead()):
+                return False
+        return True
+
+    def record_days(self) -> ChapterOutcome:
+        # simulate_days, keeping what is needed to replay the run later
+        player_character = self.player_character
+        gold_before = self.meta_progression.gold
+        day_outcomes: List[DayOutcome] = []
+        victory = True
+
+        for day in self.days:
+            player_hp, player_max_hp, player_atk, player_def = player_character.stat_hp, player_character.stat_max_hp, player_character.stat_atk, player_character.stat_def
+            battle_steps = day.simulate(self.context, player_character, self.meta_progression)
+            enemy = day.event_enemy
+            day_outcomes.append(DayOutcome(
+                player_hp=player_hp,
+                player_max_hp=player_max_hp,
+                player_atk=player_atk,
+                player_def=player_def,
+                battle_steps=battle_steps,
+                player_hp_after=player_character.stat_hp,
+                enemy_hp_after=enemy.stat_hp if enemy else None,
+                player_damage=max(0, player_character.stat_atk - enemy.stat_def) if enemy else None
+            ))
+            if(player_character.is_dead()):
                 victory = False
                 break
 
-        if victory:
-            self.log.log_chapter_victory(self.meta_progression.chapter_level, self.meta_progression.chapter_run_try)
-        else:
-            self.log.log_chapter_defeat(self.meta_progression.chapter_level)
+        return ChapterOutcome(
+            victory=victory,
+            gold_earned=self.meta_progression.gold - gold_before,
+            days=tuple(day_outcomes)
+        )
 
-        return victory
+    def replay_days(self, outcome: ChapterOutcome):
+        for day, day_outcome in zip(self.days, outcome.days):
+            day.replay(self.context, day_outcome)
+        self.meta_progression.add_gold(outcome.gold_earned)
+
+    def get_time_costs(self) -> Tuple[float, ...]:
+        # Every timer cost of the run, in the order they were spent
+        action_costs = self.context.action_costs
+        battle_costs = (action_costs[TimerCode.BATTLE_PLAYER_TURN], action_costs[TimerCode.BATTLE_ENEMY_TURN])
+        costs: List[float] = []
+        for day, day_outcome in zip(self.days, self.outcome.days):
+            if day_outcome.battle_steps is None:
+                costs.append(action_costs[day.event_code])
+            else:
+                costs.extend(battle_costs[step % 2] for step in range(day_outcome.battle_steps))
+        return tuple(costs)
 
-def get_config_value(config_df, row: ConfigKeys, row_key: ConfigKeys, column_key: ConfigKeys) -> Any:
-    return config_df.loc[config_df[row.value] == row_key.value, column_key.value].iloc[0]
+def get_config_value(config_table: Dict[str, Dict[str, Any]], row_key: ConfigKeys, column_key: ConfigKeys) -> Any:
+    return config_table[row_key.value][column_key.value]
 
-def get_config_value_str_row(config_df, row: ConfigKeys, row_key: str, column_key: ConfigKeys) -> Any:
-    return config_df.loc[config_df[row.value] == row_key, column_key.value].iloc[0]
+def get_config_value_str_row(config_table: Dict[str, Dict[str, Any]], row_key: str, column_key: ConfigKeys) -> Any:
+    return config_table[row_key][column_key.value]
 
 
 
@@ -486,7 +1213,54 @@ def get_config_value_str_row(config_df, row: ConfigKeys, row_key: str, column_ke
 # -----------------------------
 
 
-        
+# State of a run when it first reaches a chapter, enough to carry on from there (see Model.resume)
+@dataclass(frozen=True)
+class ModelCheckpoint:
+    chapter_level: int
+    rounds_done: int
+    gold: int
+    # Level of every meta stat, in MetaStatTable order
+    stat_levels: Tuple[int, ...]
+    total_time: float
+    session_time: float
+    day_session_num: int
+    log_rows: int
+    sample_counters: Tuple[int, ...]
+    # RandomStream.get_state of the combat streams, empty for deterministic runs
+    stream_states: Tuple[Any, ...] = ()
+
+    @staticmethod
+    def capture(model: 'Model') -> 'ModelCheckpoint':
+        meta_progression = model.meta_progression
+        return ModelCheckpoint(
+            chapter_level=meta_progression.chapter_level,
+            rounds_done=model.rounds_done,
+            gold=meta_progression.gold,
+            stat_levels=meta_progression.get_stat_levels(),
+            total_time=model.timer.total_time,
+            session_time=model.timer.session_time,
+            day_session_num=model.timer.day_session_num,
+            log_rows=model.log.get_row_count(),
+            sample_counters=tuple(model.log.sample_counters),
+            stream_states=tuple(stream.get_state() for stream in model.combat_streams)
+        )
+
+    def restore(self, model: 'Model', previous_log: Log):
+        # Puts a freshly initialized model where the checkpointed run was, with the rows it had logged
+        meta_progression = model.meta_progression
+        meta_progression.chapter_level = self.chapter_level
+        meta_progression.chapter_run_try = 0
+        meta_progression.gold = self.gold
+        meta_progression.set_stat_levels(self.stat_levels)
+
+        model.timer.total_time = self.total_time
+        model.timer.session_time = self.session_time
+        model.timer.day_session_num = self.day_session_num
+        model.rounds_done = self.rounds_done
+        model.log.restore_rows(previous_log, self.log_rows, list(self.sample_counters))
+        for stream, state in zip(model.combat_streams, self.stream_states):
+            stream.set_state(state)
+
         
 @dataclass
 class Model:
@@ -497,25 +1271,42 @@ class Model:
     player_behavior: PlayerBehavior
     meta_progression: Player_meta_progression
 
-    action_time_costs: Dict[str, float]
+    action_table: ActionTable
+
+    rounds_done: int = 0
+    use_outcome_cache: bool = True
+    fast_forward: bool = False
+    max_rounds: Optional[int] = None
+    spend_all_gold: bool = False
+    # Seed of the combat streams, only drawn from when the config has combat randomness (None: fresh OS entropy)
+    seed: Optional[int] = None
+    combat_streams: Tuple[RandomStream, ...] = ()
+    player_randomness: AttackRandomness = NO_RANDOMNESS
+
+    # Sheets the model was built from and its state on reaching every chapter, to resume it after a config edit
+    config_sheets: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    checkpoints: Dict[int, ModelCheckpoint] = field(default_factory=dict)
 
 
     @staticmethod
-    def initialize(config: Config) -> 'Model':
+    def initialize(config: Config, verbosity: Log.Verbosity = Log.Verbosity.DAY, sample_rates: Optional[Dict[Log.Action, int]] = None,
+                   use_outcome_cache: bool = True, fast_forward: bool = False, max_rounds: Optional[int] = None,
+                   log_sink: Optional['ResultWriter'] = None, log_buffer_rows: int = 10_000, spend_all_gold: bool = False,
+                   seed: Optional[int] = None) -> 'Model':
+        # With a log_sink the events are written to it every log_buffer_rows rows instead of piling up in memory
 
         timer = Timer.initialize(config.get_player_behavior_config())
-        log = Log.initialize(timer)
-        player_behavior = PlayerBehavior.initialize(config.get_player_behavior_config(), config.get_timers_config(), log, timer)
-        player_config = config.get_player_config()
+        log = Log.initialize(timer, verbosity=verbosity, sample_rates=sample_rates, sink=log_sink, buffer_rows=log_buffer_rows)
+        config_index = config.get_index()
+        player_behavior = PlayerBehavior.initialize(config_index, config.get_timers_config(), log, timer)
 
-        action_time_costs = {
-            str(row[ConfigKeys.TIMERS_ACTION_TYPE.value]): float(row[ConfigKeys.TIMERS_ACTION_TIME_COST.value])
-            for _, row in config.get_timers_config().iterrows()
-        }
+        action_table = ActionTable.get(config)
 
-        meta_progression = Player_meta_progression.initialize(player_config, log, player_behavior, action_time_costs)
+        meta_progression = Player_meta_progression.initialize(MetaStatTable.get(config), log, player_behavior, action_table.costs,
+                                                              spend_all_gold=spend_all_gold)
 
-        
+        combat_randomness = CombatRandomness.get(config)
+        combat_streams = RandomStream.spawn_combat_streams(seed) if combat_randomness.is_stochastic() else ()
 
         return Model(
             log=log,
@@ -523,19 +1314,68 @@ class Model:
             timer=timer,
             player_behavior=player_behavior,
             meta_progression=meta_progression,
-            action_time_costs=action_time_costs
+            action_table=action_table,
+            use_outcome_cache=use_outcome_cache,
+            fast_forward=fast_forward,
+            max_rounds=max_rounds,
+            spend_all_gold=spend_all_gold,
+            seed=seed,
+            combat_streams=combat_streams,
+            player_randomness=combat_randomness.player,
+            config_sheets=config.get_sheets()
         )
 
-    def simulate(self)-> Log:
+    @staticmethod
+    def resume(previous: 'Model', config: Config, verbosity: Log.Verbosity = Log.Verbosity.DAY,
+               sample_rates: Optional[Dict[Log.Action, int]] = None, seed: Optional[int] = None) -> 'Model':
+        # Model of the edited config that starts from the last checkpoint of the previous run the edit leaves valid,
+        # keeping the rows logged until there. Starts from chapter 1 when nothing before the edit can be reused.
+        model = Model.initialize(config, verbosity=verbosity, sample_rates=sample_rates, use_outcome_cache=previous.use_outcome_cache,
+                                 fast_forward=previous.fast_forward, max_rounds=previous.max_rounds, spend_all_gold=previous.spend_all_gold,
+                                 seed=seed)
+        if model.log.sample_rates != previous.log.sample_rates or previous.log.rows_flushed > 0:
+            return model
+        # Draws of another seed, or of OS entropy, can't be replayed
+        if model.combat_streams and (seed is None or seed != previous.seed):
+            return model
+
+        first_chapter = ConfigDiff.between(previous.config_sheets, model.config_sheets).first_chapter
+        # select_player_type edits the behavior sheet in place, so compare the behaviors the runs actually used
+        previous_behavior, behavior = previous.player_behavior, model.player_behavior
+        if (previous_behavior.player_type, previous_behavior.player_session_time, previous_behavior.player_sessions_per_day) != \
+                (behavior.player_type, behavior.player_session_time, behavior.player_sessions_per_day):
+            first_chapter = 1
+
+        # A checkpoint on reaching a chapter only depends on the chapters played before it
+        valid = [chapter for chapter in previous.checkpoints if first_chapter is None or chapter <= first_chapter]
+        if not valid:
+            return model
+
+        checkpoint = previous.checkpoints[max(valid)]
+        checkpoint.restore(model, previous.log)
+        model.checkpoints = {chapter: saved for chapter, saved in previous.checkpoints.items() if chapter <= checkpoint.chapter_level}
+        return model
+
+    def save_checkpoint(self):
+        if self.meta_progression.chapter_level not in self.checkpoints:
+            self.checkpoints[self.meta_progression.chapter_level] = ModelCheckpoint.capture(self)
+
+    def simulate(self, until_chapter: Optional[int] = None)-> Log:
+        # With until_chapter, stops as soon as the player reaches that chapter, calling simulate again resumes from there
     
-        enemies_config = self.config.get_enemies_config()
+        chapter_plans = ChapterPlan.get_plans(self.config)
         total_chapters = self.config.get_total_chapters()
-
-        rounds_done = 0
+        outcome_cache = self.get_outcome_cache()
+        context = RunContext.initialize(self.log, self.player_behavior, self.action_table, self.combat_streams, self.player_randomness)
+        self.save_checkpoint()
+        stalled_runs = 0
 
         while(self.meta_progression.chapter_level<=total_chapters):
-            rounds_done+=1
-            assert rounds_done < 1000, "Possible infinite loop detected"
+            if until_chapter is not None and self.meta_progression.chapter_level >= until_chapter:
+                break
+
+            self.rounds_done+=1
+            assert self.max_rounds is None or self.rounds_done <= self.max_rounds, "Possible infinite loop detected"
 
             # Player Behavior Simulation
             #self.player_behavior.check_session()
@@ -543,24 +1383,79 @@ class Model:
             # Chapter Simulation
             chapter_level = self.meta_progression.chapter_level
             self.meta_progression.new_chapter_run()
-            chapter_config = self.config.get_chapter_config(chapter_level)
-            chapter = Chapter.initialize(chapter_config, self.meta_progression, enemies_config, self.log, self.player_behavior, self.action_time_costs)
-            victory_bool = chapter.simulate()
+            chapter_plan = chapter_plans.get(chapter_level, ChapterPlan(chapter_num=chapter_level, days=()))
+            chapter = Chapter.initialize(chapter_plan, self.meta_progression, context)
+            gold_before = self.meta_progression.gold
+            victory_bool = chapter.simulate(outcome_cache)
+            gold_earned = self.meta_progression.gold - gold_before
 
 
             # Player Behavior Simulation
             #self.player_behavior.check_session()
 
             # Meta Progression Simulation
-            self.meta_progression.simulate()
+            upgraded = self.meta_progression.simulate()
 
-            self.log.log_round_completed(chapter_level, victory_bool, rounds_done)
+            if self.log.should_log_code(Log.Code.ROUND_COMPLETED):
+                self.log.log_round_completed(chapter_level, victory_bool, self.rounds_done, self.meta_progression.gold)
 
             if victory_bool:
                 self.meta_progression.chapter_level += 1
                 self.meta_progression.chapter_run_try= 0
+                self.save_checkpoint()
+                stalled_runs = 0
+            elif not upgraded and not self.combat_streams:
+                # Same stats next round, so the same defeat until enough gold is saved for the next upgrade
+                assert gold_earned > 0, f"Chapter {chapter_level} can't be cleared: it's lost without earning gold or affording an upgrade"
+                if self.fast_forward and chapter.outcome is not None:
+                    self.fast_forward_runs(chapter, gold_earned)
+            elif not upgraded and gold_earned == 0:
+                # Rolled damage can still win the chapter, but not after this many fruitless tries in a row
+                stalled_runs += 1
+                assert stalled_runs < MAX_STALLED_RANDOM_RUNS, \
+                    f"Chapter {chapter_level} can't be cleared: lost {stalled_runs} times in a row without earning gold or affording an upgrade"
+            else:
+                stalled_runs = 0
 
+        self.log.flush()
         return self.log
+
+    def fast_forward_runs(self, chapter: Chapter, gold_earned: int):
+        # Applies in one step every lost run left before the cheapest upgrade is affordable,
+        # their log rows are replaced by a single ROUNDS_FAST_FORWARDED row
+        cost = self.meta_progression.get_cheapest_stat().get_cost()
+        runs_until_upgrade = -(-(cost - self.meta_progression.gold) // gold_earned)
+        skipped = runs_until_upgrade - 1
+        # Never past max_rounds, the next round then fails its check as it would without fast forward
+        if self.max_rounds is not None:
+            skipped = min(skipped, self.max_rounds - self.rounds_done)
+        if skipped <= 0:
+            return
+
+        round_costs = chapter.get_time_costs() + (self.action_table.costs[TimerCode.META_PROGRESSION],)
+        self.player_behavior.time_spent_cycle(round_costs, skipped * len(round_costs))
+
+        self.meta_progression.add_gold(skipped * gold_earned)
+        self.meta_progression.chapter_run_try += skipped
+        self.rounds_done += skipped
+
+        if self.log.should_log_code(Log.Code.ROUNDS_FAST_FORWARDED):
+            self.log.log_rounds_fast_forwarded(
+                chapter_level=self.meta_progression.chapter_level,
+                chapter_run_try=self.meta_progression.chapter_run_try,
+                rounds_done=self.rounds_done,
+                rounds_skipped=skipped,
+                gold=self.meta_progression.gold
+            )
+
+    def get_outcome_cache(self) -> Optional[ChapterOutcomeCache]:
+        # Retries with unchanged stats replay the cached run, unless the combat trace needs every attack
+        # or the damage is rolled
+        if not self.use_outcome_cache or self.combat_streams:
+            return None
+        if self.log.is_enabled_code(Log.Code.PLAYER_ATTACK) or self.log.is_enabled_code(Log.Code.ENEMY_ATTACK):
+            return None
+        return ChapterOutcomeCache.get_cache(self.config)
                 
 
     
@@ -0,0 +1,429 @@
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+from config_import import Config, ConfigKeys, ConfigTimerActions
+from model import ChapterPlan, Day, MetaStatTable, CombatRandomness, MAX_BATTLE_TURNS
+
+# Vectorized counterpart of Model.simulate: the state of every simulated player lives in NumPy arrays
+# and each day event, battle, meta upgrade and Timer update is applied to all players at once.
+# Per-player results agree with running Model.simulate for the same player type.
+
+EVENT_CODES = {
+    Day.EventType.INCREASE_ATK: 0,
+    Day.EventType.INCREASE_DEF: 1,
+    Day.EventType.INCREASE_MAX_HP: 2,
+    Day.EventType.RESTORE_HP: 3,
+    Day.EventType.BATTLE: 4,
+}
+NO_EVENT = -1
+
+EVENT_TIMER_ACTIONS = [
+    ConfigTimerActions.EVENT_INCREASE_ATK,
+    ConfigTimerActions.EVENT_INCREASE_DEF,
+    ConfigTimerActions.EVENT_INCREASE_MAX_HP,
+    ConfigTimerActions.EVENT_RESTORE_HP,
+]
+
+# Stat columns in MetaStatTable order, the combat stats first, so cost ties go to the first one like in the Model
+STAT_ATK, STAT_DEF, STAT_MAX_HP = 0, 1, 2
+
+# Most (player, turn) times time_spent_battle accumulates at once
+MAX_BATTLE_CHUNK_CELLS = 1 << 20
+
+
+# Chapter plans and config values laid out as dense arrays indexed by [chapter, day]
+@dataclass
+class PopulationPlan:
+    total_chapters: int
+    day_counts: np.ndarray
+    event_codes: np.ndarray
+    event_params: np.ndarray
+    gold_rewards: np.ndarray
+    enemy_atk: np.ndarray
+    enemy_def: np.ndarray
+    enemy_hp: np.ndarray
+
+    event_costs: np.ndarray
+    player_turn_cost: float
+    enemy_turn_cost: float
+    meta_progression_cost: float
+
+    stat_names: List[str]
+    stat_initial_values: np.ndarray
+    stat_bonus_exp: np.ndarray
+    stat_cost_base: np.ndarray
+    stat_cost_exp: np.ndarray
+    # Stat columns upgrades are bought for, MetaStatTable.upgradeable
+    stat_upgradeable: np.ndarray
+
+    @staticmethod
+    def initialize(config: Config) -> 'PopulationPlan':
+        if CombatRandomness.get(config).is_stochastic():
+            raise ValueError("Population runs only play deterministic battles, simulate configs with combat randomness with Model runs")
+        config_index = config.get_index()
+        chapter_plans = ChapterPlan.get_plans(config)
+        total_chapters = int(config.get_total_chapters())
+        max_days = max([len(plan.days) for plan in chapter_plans.values()] + [1])
+
+        shape = (total_chapters + 1, max_days)
+        day_counts = np.zeros(total_chapters + 1, dtype=np.int64)
+        event_codes = np.full(shape, NO_EVENT, dtype=np.int8)
+        event_params = np.zeros(shape, dtype=np.float64)
+        gold_rewards = np.zeros(shape, dtype=np.int64)
+        enemy_atk = np.zeros(shape, dtype=np.float64)
+        enemy_def = np.zeros(shape, dtype=np.float64)
+        enemy_hp = np.zeros(shape, dtype=np.float64)
+
+        for chapter_num, plan in chapter_plans.items():
+            if not 1 <= chapter_num <= total_chapters:
+                continue
+            day_counts[chapter_num] = len(plan.days)
+            for day_index, day_plan in enumerate(plan.days):
+                event_codes[chapter_num, day_index] = EVENT_CODES[day_plan.event_type]
+                gold_rewards[chapter_num, day_index] = day_plan.gold_reward
+                if day_plan.enemy is not None:
+                    enemy_atk[chapter_num, day_index] = day_plan.enemy.stat_atk
+                    enemy_def[chapter_num, day_index] = day_plan.enemy.stat_def
+                    enemy_hp[chapter_num, day_index] = day_plan.enemy.stat_max_hp
+                else:
+                    event_params[chapter_num, day_index] = day_plan.event_param
+
+        costs = config_index.action_time_costs
+        stat_table = MetaStatTable.get(config)
+        curves = stat_table.curves
+
+        return PopulationPlan(
+            total_chapters=total_chapters,
+            day_counts=day_counts,
+            event_codes=event_codes,
+            event_params=event_params,
+            gold_rewards=gold_rewards,
+            enemy_atk=enemy_atk,
+            enemy_def=enemy_def,
+            enemy_hp=enemy_hp,
+            event_costs=np.array([costs[action.value] for action in EVENT_TIMER_ACTIONS], dtype=np.float64),
+            player_turn_cost=costs[ConfigTimerActions.BATTLE_PLAYER_TURN.value],
+            enemy_turn_cost=costs[ConfigTimerActions.BATTLE_ENEMY_TURN.value],
+            meta_progression_cost=costs[ConfigTimerActions.META_PROGRESSION.value],
+            stat_names=[curve.name for curve in curves],
+            stat_initial_values=np.array([curve.initial_value for curve in curves], dtype=np.float64),
+            stat_bonus_exp=np.array([curve.meta_bonus_exp for curve in curves], dtype=np.float64),
+            stat_cost_base=np.array([curve.meta_cost_base for curve in curves], dtype=np.int64),
+            stat_cost_exp=np.array([curve.meta_cost_exp for curve in curves], dtype=np.int64),
+            stat_upgradeable=np.array(stat_table.upgradeable, dtype=np.int64),
+        )
+
+    @staticmethod
+    def get(config: Config) -> 'PopulationPlan':
+        return config.get_compiled("population_plan", PopulationPlan.initialize)
+
+
+# One entry per simulated player in every array
+@dataclass
+class PopulationState:
+    player_types: np.ndarray
+    session_limit: np.ndarray
+    sessions_per_day: np.ndarray
+
+    total_time: np.ndarray
+    session_time: np.ndarray
+    day_session_num: np.ndarray
+
+    stat_levels: np.ndarray
+    gold: np.ndarray
+    chapter_level: np.ndarray
+    chapter_run_try: np.ndarray
+    rounds_done: np.ndarray
+    stalled: np.ndarray
+
+    clear_day: np.ndarray
+    clear_run_try: np.ndarray
+    clear_gold: np.ndarray
+
+    @staticmethod
+    def initialize(config: Config, player_types: Sequence[str], total_chapters: int) -> 'PopulationState':
+        player_behaviors = config.get_index().player_behaviors
+        unknown = sorted(set(player_types) - set(player_behaviors))
+        if unknown:
+            raise ValueError(f"Unknown player types: {unknown}")
+
+        size = len(player_types)
+        return PopulationState(
+            player_types=np.array(player_types, dtype=object),
+            session_limit=np.array([float(player_behaviors[player_type][ConfigKeys.PLAYER_BEHAVIOR_SESSION_TIME.value]) for player_type in player_types], dtype=np.float64),
+            sessions_per_day=np.array([int(player_behaviors[player_type][ConfigKeys.PLAYER_BEHAVIOR_SESSIONS_PER_DAY.value]) for player_type in player_types], dtype=np.int64),
+            total_time=np.zeros(size, dtype=np.float64),
+            session_time=np.zeros(size, dtype=np.float64),
+            day_session_num=np.ones(size, dtype=np.int64),
+            stat_levels=np.zeros((size, len(MetaStatTable.get(config).curves)), dtype=np.int64),
+            gold=np.zeros(size, dtype=np.int64),
+            chapter_level=np.ones(size, dtype=np.int64),
+            chapter_run_try=np.zeros(size, dtype=np.int64),
+            rounds_done=np.zeros(size, dtype=np.int64),
+            stalled=np.zeros(size, dtype=bool),
+            clear_day=np.zeros((size, total_chapters + 1), dtype=np.int64),
+            clear_run_try=np.zeros((size, total_chapters + 1), dtype=np.int64),
+            clear_gold=np.zeros((size, total_chapters + 1), dtype=np.int64),
+        )
+
+    def get_day(self) -> np.ndarray:
+        return (self.total_time // 1440).astype(np.int64) + 1
+
+
+@dataclass
+class PopulationModel:
+    plan: PopulationPlan
+    state: PopulationState
+    max_rounds: Optional[int]
+    # Same as Model.spend_all_gold
+    spend_all_gold: bool = False
+
+    @staticmethod
+    def initialize(config: Config, player_types: Sequence[str], max_rounds: Optional[int] = None,
+                   spend_all_gold: bool = False) -> 'PopulationModel':
+        if spend_all_gold:
+            MetaStatTable.get(config).check_spend_all_gold()
+        plan = PopulationPlan.get(config)
+        return PopulationModel(
+            plan=plan,
+            state=PopulationState.initialize(config, player_types, plan.total_chapters),
+            max_rounds=max_rounds,
+            spend_all_gold=spend_all_gold
+        )
+
+    @staticmethod
+    def from_counts(config: Config, player_type_counts: Dict[str, int], max_rounds: Optional[int] = None,
+                    spend_all_gold: bool = False) -> 'PopulationModel':
+        player_types: List[str] = []
+        for player_type, count in player_type_counts.items():
+            player_types.extend([player_type] * count)
+        return PopulationModel.initialize(config, player_types, max_rounds, spend_all_gold)
+
+    # ------ Timer ------
+
+    def check_session(self, mask: np.ndarray):
+        # Same rollover rules as PlayerBehavior.check_session
+        state = self.state
+        over = mask & (state.session_time > state.session_limit)
+        new_day = over & (state.day_session_num >= state.sessions_per_day)
+
+        state.total_time[new_day] = state.total_time[new_day] + (1440 - np.mod(state.total_time[new_day], 1440) + 1)
+        state.day_session_num[new_day] = 0
+        state.session_time[over] = 0
+        state.day_session_num[over] += 1
+
+    def time_spent(self, mask: np.ndarray, minutes):
+        self.state.total_time[mask] += minutes
+        self.state.session_time[mask] += minutes
+        self.check_session(mask)
+
+    def time_spent_battle(self, mask: np.ndarray, steps: np.ndarray):
+        # Vectorized PlayerBehavior.time_spent_cycle over the (player turn, enemy turn) costs. Like Timer.advance,
+        # every player's times are summed turn by turn, one row per player, in chunks cut at their next rollover.
+        state = self.state
+        cycle = np.array([self.plan.player_turn_cost, self.plan.enemy_turn_cost], dtype=np.float64)
+        mean_cost = float(cycle.mean())
+        steps = np.where(mask, steps, 0).astype(np.int64)
+        offset = np.zeros(len(steps), dtype=np.int64)
+
+        while True:
+            pending = np.flatnonzero(steps > 0)
+            if len(pending) == 0:
+                break
+
+            # Enough turns for most players to reach their next rollover, within the memory bound
+            needed = steps[pending]
+            if mean_cost > 0:
+                remaining = np.maximum(0.0, state.session_limit[pending] - state.session_time[pending])
+                needed = np.minimum(needed, (remaining // mean_cost).astype(np.int64) + len(cycle) + 1)
+            chunk = max(1, min(int(needed.max()), MAX_BATTLE_CHUNK_CELLS // len(pending)))
+
+            # Starting times first, so the cumulative sums add the costs onto them in turn order
+            turn_costs = np.empty((len(pending), chunk + 1), dtype=np.float64)
+            turn_costs[:, 1:] = cycle[(offset[pending, None] + np.arange(chunk)) % len(cycle)]
+            turn_costs[:, 0] = state.session_time[pending]
+            session_times = np.cumsum(turn_costs, axis=1)
+            turn_costs[:, 0] = state.total_time[pending]
+            total_times = np.cumsum(turn_costs, axis=1)
+
+            over = (session_times[:, 1:] > state.session_limit[pending, None]) & (np.arange(chunk) < steps[pending, None])
+            rolled = over.any(axis=1)
+            taken = np.where(rolled, over.argmax(axis=1) + 1, np.minimum(steps[pending], chunk))
+
+            rows = np.arange(len(pending))
+            state.session_time[pending] = session_times[rows, taken]
+            state.total_time[pending] = total_times[rows, taken]
+            rolled_mask = np.zeros(len(steps), dtype=bool)
+            rolled_mask[pending[rolled]] = True
+            self.check_session(rolled_mask)
+
+            steps[pending] -= taken
+            offset[pending] = (offset[pending] + taken) % len(cycle)
+
+    # ------ Simulation ------
+
+    def get_stat_values(self, stat: int) -> np.ndarray:
+        return self.plan.stat_initial_values[stat] + self.plan.stat_bonus_exp[stat] * self.state.stat_levels[:, stat]
+
+    def simulate_battle(self, mask: np.ndarray, chapter: np.ndarray, day: int,
+                        atk: np.ndarray, defense: np.ndarray, hp: np.ndarray) -> np.ndarray:
+        plan = self.plan
+        enemy_atk = plan.enemy_atk[chapter, day]
+        enemy_def = plan.enemy_def[chapter, day]
+        enemy_hp = plan.enemy_hp[chapter, day]
+
+        damage_to_enemy = np.maximum(0, atk - enemy_def)
+        damage_to_player = np.maximum(0, enemy_atk - defense)
+        fighting = mask & (enemy_hp > 0)
+        assert not (fighting & (damage_to_enemy == 0) & (damage_to_player == 0)).any(), "Infinite battle detected, both 0 damage"
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            player_hits_to_kill = np.where(damage_to_enemy > 0, -(-enemy_hp // np.where(damage_to_enemy > 0, damage_to_enemy, 1)), np.inf)
+            enemy_hits_to_kill = np.where(damage_to_player > 0, -(-hp // np.where(damage_to_player > 0, damage_to_player, 1)), np.inf)
+        victory = player_hits_to_kill <= enemy_hits_to_kill
+
+        player_turns = np.where(victory, player_hits_to_kill, enemy_hits_to_kill)
+        enemy_turns = np.where(victory, player_hits_to_kill - 1, enemy_hits_to_kill)
+        player_turns = np.where(fighting, player_turns, 0)
+        enemy_turns = np.where(fighting, enemy_turns, 0)
+        assert not (player_turns + enemy_turns > MAX_BATTLE_TURNS).any(), "Possible infinite loop detected in battle simulation"
+
+        hp[fighting] -= (damage_to_player * enemy_turns)[fighting]
+        self.time_spent_battle(fighting, (player_turns + enemy_turns).astype(np.int64))
+
+        return mask & (hp > 0)
+
+    def simulate_chapter(self, running: np.ndarray) -> np.ndarray:
+        plan, state = self.plan, self.state
+        chapter = np.where(running, state.chapter_level, 0)
+
+        atk = self.get_stat_values(STAT_ATK)
+        defense = self.get_stat_values(STAT_DEF)
+        max_hp = self.get_stat_values(STAT_MAX_HP)
+        hp = max_hp.copy()
+
+        alive = running.copy()
+        for day in range(plan.event_codes.shape[1]):
+            active = alive & (day < plan.day_counts[chapter])
+            if not active.any():
+                break
+
+            codes = plan.event_codes[chapter, day]
+            params = plan.event_params[chapter, day]
+            rewards = plan.gold_rewards[chapter, day]
+
+            for code, stat_values in ((0, atk), (1, defense), (2, max_hp)):
+                event_mask = active & (codes == code)
+                stat_values[event_mask] += params[event_mask]
+                state.gold[event_mask] += rewards[event_mask]
+                self.time_spent(event_mask, plan.event_costs[code])
+
+            restore_mask = active & (codes == 3)
+            hp[restore_mask] = np.minimum(hp[restore_mask] + params[restore_mask], max_hp[restore_mask])
+            state.gold[restore_mask] += rewards[restore_mask]
+            self.time_spent(restore_mask, plan.event_costs[3])
+
+            battle_mask = active & (codes == 4)
+            if battle_mask.any():
+                survived = self.simulate_battle(battle_mask, chapter, day, atk, defense, hp)
+                state.gold[survived] += rewards[survived]
+                alive &= ~(battle_mask & ~survived)
+
+        return alive
+
+    def simulate_meta_progression(self, running: np.ndarray) -> np.ndarray:
+        plan, state = self.plan, self.state
+        upgraded = np.zeros(len(running), dtype=bool)
+        while True:
+            upgradeable = plan.stat_upgradeable
+            costs = plan.stat_cost_base[upgradeable] + plan.stat_cost_exp[upgradeable] * state.stat_levels[:, upgradeable]
+            cheapest_column = np.argmin(costs, axis=1)
+            cheapest_cost = costs[np.arange(len(cheapest_column)), cheapest_column]
+            cheapest = upgradeable[cheapest_column]
+
+            upgrade = running & (state.gold >= cheapest_cost)
+            state.gold[upgrade] -= cheapest_cost[upgrade]
+            state.stat_levels[upgrade, cheapest[upgrade]] += 1
+            upgraded |= upgrade
+            if not self.spend_all_gold or not upgrade.any():
+                break
+
+        self.time_spent(running, plan.meta_progression_cost)
+
+        return upgraded
+
+    def simulate(self) -> 'PopulationModel':
+        plan, state = self.plan, self.state
+
+        while True:
+            running = (state.chapter_level <= plan.total_chapters) & ~state.stalled
+            if not running.any():
+                break
+
+            state.rounds_done[running] += 1
+            if self.max_rounds is not None:
+                stalled_now = running & (state.rounds_done > self.max_rounds)
+                state.stalled |= stalled_now
+                running &= ~stalled_now
+
+            state.chapter_run_try[running] += 1
+            gold_before = state.gold.copy()
+            victory = self.simulate_chapter(running)
+            gold_earned = state.gold - gold_before
+
+            winners = np.flatnonzero(victory)
+            won_chapter = state.chapter_level[winners]
+            state.clear_day[winners, won_chapter] = state.get_day()[winners]
+            state.clear_run_try[winners, won_chapter] = state.chapter_run_try[winners]
+
+            upgraded = self.simulate_meta_progression(running)
+
+            # Lost without gold or an upgrade: every later run is the same defeat, Model.simulate asserts on it
+            state.stalled |= running & ~victory & ~upgraded & (gold_earned <= 0)
+
+            state.clear_gold[winners, won_chapter] = state.gold[winners]
+            state.chapter_level[winners] += 1
+            state.chapter_run_try[winners] = 0
+
+        return self
+
+    # ------ Results ------
+
+    def get_chapter_results(self) -> pd.DataFrame:
+        # Same rows as batch.summarize_chapters, one per player and cleared chapter
+        state = self.state
+        players, chapters = np.nonzero(state.clear_day[:, 1:])
+        chapters = chapters + 1
+
+        clear_day = state.clear_day[players, chapters]
+        previous_clear_day = np.ones_like(clear_day)
+        same_player = np.r_[False, players[1:] == players[:-1]]
+        previous_clear_day[same_player] = clear_day[np.flatnonzero(same_player) - 1]
+
+        return pd.DataFrame({
+            "run_id": players,
+            "player_type": state.player_types[players],
+            "seed": None,
+            "chapter": chapters,
+            "clear_day": clear_day,
+            "days_to_clear": clear_day - previous_clear_day,
+            "run_tries": state.clear_run_try[players, chapters],
+            "gold": state.clear_gold[players, chapters],
+        })
+
+    def get_players_df(self) -> pd.DataFrame:
+        state = self.state
+        data = {
+            "player_type": state.player_types,
+            "rounds_done": state.rounds_done,
+            "finished": state.chapter_level > self.plan.total_chapters,
+            "stalled": state.stalled,
+            "chapter_level": state.chapter_level,
+            "gold": state.gold,
+            "timer_day": state.get_day(),
+            "timer_total_time": state.total_time,
+        }
+        for stat_index, stat_name in enumerate(self.plan.stat_names):
+            data[f"{stat_name}_level"] = state.stat_levels[:, stat_index]
+        return pd.DataFrame(data)
@@ -0,0 +1,193 @@
+import contextvars
+import functools
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Callable, Tuple
+import pandas as pd
+from config_import import Config
+from model import Model, Chapter, Day, Player_meta_progression, PlayerBehavior
+from utils import Log
+
+# Opt-in instrumentation of the simulation phases, e.g.
+#   profiler = Profiler()
+#   with profiler:
+#       model.simulate()
+#   profiler.get_report().to_dataframe()
+#
+# The phase methods are only wrapped while a profiler is active, so runs without one pay nothing.
+# Other threads (Streamlit sessions) running meanwhile go through the wrappers but aren't recorded.
+# The bookkeeping of every call is left out of the phase times, counting allocations is opt-in as it
+# adds a few microseconds per call: Profiler(count_allocations=True).
+
+
+# Instrumented methods: (owner class, method name, phase name)
+PROFILED_PHASES: List[Tuple[type, str, str]] = [
+    (Model, "simulate", "model.simulate"),
+    (Model, "fast_forward_runs", "model.fast_forward_runs"),
+    (Chapter, "initialize", "chapter.initialize"),
+    (Chapter, "simulate", "chapter.simulate"),
+    (Day, "simulate", "day.simulate"),
+    (Day, "replay", "day.replay"),
+    (Day, "simulate_battle", "day.simulate_battle"),
+    (Player_meta_progression, "simulate", "meta_progression.simulate"),
+    (PlayerBehavior, "time_spent", "timer.time_spent"),
+    (PlayerBehavior, "time_spent_cycle", "timer.time_spent_cycle"),
+    (PlayerBehavior, "time_spent_repeated", "timer.time_spent_repeated"),
+    (Config, "get_compiled", "config.get_compiled"),
+    (Log, "get_logs_as_dataframe", "log.get_logs_as_dataframe"),
+] + [
+    (Log, name, f"log.{name}") for name in sorted(vars(Log)) if name.startswith("log_")
+]
+
+REPORT_COLUMNS = ["phase", "calls", "total_ms", "self_ms", "mean_us", "self_share", "allocated_blocks"]
+ALLOCATION_COLUMNS = ["allocated_blocks"]
+
+_active_profiler: contextvars.ContextVar[Optional['Profiler']] = contextvars.ContextVar("active_profiler", default=None)
+_install_lock = threading.Lock()
+_install_count = 0
+_original_methods: Dict[Tuple[type, str], Any] = {}
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    total_time: float = 0.0
+    self_time: float = 0.0
+    # Net memory blocks still allocated when the phase returned, nested phases included
+    allocated_blocks: int = 0
+
+
+@dataclass
+class ProfileReport:
+    wall_time: float
+    phases: Dict[str, PhaseStats]
+    counts_allocations: bool = False
+
+    def to_dataframe(self) -> pd.DataFrame:
+        rows = [
+            {
+                "phase": phase,
+                "calls": stats.calls,
+                "total_ms": stats.total_time * 1e3,
+                "self_ms": stats.self_time * 1e3,
+                "mean_us": stats.total_time / stats.calls * 1e6,
+                "self_share": stats.self_time / self.wall_time if self.wall_time > 0 else 0.0,
+                "allocated_blocks": stats.allocated_blocks,
+            }
+            for phase, stats in self.phases.items()
+            if stats.calls > 0
+        ]
+        df = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+        if not self.counts_allocations:
+            df = df.drop(columns=ALLOCATION_COLUMNS)
+        return df.sort_values("self_ms", ascending=False, ignore_index=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_time": self.wall_time,
+            "phases": {
+                phase: {"calls": stats.calls, "total_time": stats.total_time, "self_time": stats.self_time,
+                        **({"allocated_blocks": stats.allocated_blocks} if self.counts_allocations else {})}
+                for phase, stats in self.phases.items()
+                if stats.calls > 0
+            },
+        }
+
+
+@dataclass
+class Profiler:
+    phases: Dict[str, PhaseStats] = field(default_factory=dict)
+    wall_time: float = 0.0
+    count_allocations: bool = False
+    # Time, blocks and profiler overhead of the nested phases of every open call, to split self from total
+    _stack: List[List[float]] = field(default_factory=list, repr=False)
+    _started_at: Optional[float] = field(default=None, repr=False)
+    _token: Optional[contextvars.Token] = field(default=None, repr=False)
+
+    def __enter__(self) -> 'Profiler':
+        install_phase_hooks()
+        self._token = _active_profiler.set(self)
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_time += time.perf_counter() - self._started_at
+        _active_profiler.reset(self._token)
+        self._token = None
+        uninstall_phase_hooks()
+
+    def call(self, phase: str, function: Callable, args: tuple, kwargs: dict) -> Any:
+        entered = time.perf_counter()
+        stack = self._stack
+        stack.append([0.0, 0, 0.0])
+        start_blocks = sys.getallocatedblocks() if self.count_allocations else 0
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            blocks = sys.getallocatedblocks() - start_blocks if self.count_allocations else 0
+            nested_time, _, nested_overhead = stack.pop()
+
+            stats = self.phases.get(phase)
+            if stats is None:
+                stats = self.phases[phase] = PhaseStats()
+            stats.calls += 1
+            stats.total_time += elapsed - nested_overhead
+            stats.self_time += elapsed - nested_time
+            stats.allocated_blocks += blocks
+
+            if stack:
+                # The caller's time leaves out this call's bookkeeping, read last so it covers all of it
+                outer = time.perf_counter() - entered
+                stack[-1][0] += outer
+                stack[-1][1] += blocks
+                stack[-1][2] += outer - elapsed + nested_overhead
+
+    def get_report(self) -> ProfileReport:
+        return ProfileReport(wall_time=self.wall_time, phases=dict(self.phases), counts_allocations=self.count_allocations)
+
+
+def make_phase_wrapper(function: Callable, phase: str) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profiler = _active_profiler.get()
+        if profiler is None:
+            return function(*args, **kwargs)
+        return profiler.call(phase, function, args, kwargs)
+    return wrapper
+
+
+def install_phase_hooks():
+    # Reference counted, so nested or concurrent profilers share one set of wrappers
+    global _install_count
+    with _install_lock:
+        if _install_count == 0:
+            for owner, name, phase in PROFILED_PHASES:
+                original = vars(owner)[name]
+                _original_methods[(owner, name)] = original
+                if isinstance(original, staticmethod):
+                    setattr(owner, name, staticmethod(make_phase_wrapper(original.__func__, phase)))
+                else:
+                    setattr(owner, name, make_phase_wrapper(original, phase))
+        _install_count += 1
+
+
+def uninstall_phase_hooks():
+    global _install_count
+    with _install_lock:
+        _install_count -= 1
+        if _install_count == 0:
+            for (owner, name), original in _original_methods.items():
+                setattr(owner, name, original)
+            _original_methods.clear()
+
+
+def profile_simulation(model: Model, until_chapter: Optional[int] = None,
+                       count_allocations: bool = False) -> Tuple[Log, ProfileReport]:
+    profiler = Profiler(count_allocations=count_allocations)
+    with profiler:
+        log = model.simulate(until_chapter)
+    return log, profiler.get_report()
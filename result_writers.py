@@ -0,0 +1,298 @@
+import glob
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional, Any, IO, Iterator
+import numpy as np
+import pandas as pd
+from utils import LOG_COLUMNS, LOG_STRING_COLUMNS
+
+
+# Appends result chunks to a file as they arrive, with a fixed column layout so every chunk lines up.
+# String columns are written as text, every other column as a number (whole numbers stay integers in text formats).
+@dataclass
+class ResultWriter(ABC):
+    path: str
+    columns: List[str]
+    string_columns: List[str]
+    rows_written: int = 0
+
+    def normalize(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        chunk = chunk.reindex(columns=self.columns)
+        for column in self.columns:
+            if column in self.string_columns:
+                chunk[column] = chunk[column].map(lambda value: None if is_missing(value) else str(value)).astype(object)
+            else:
+                values = pd.to_numeric(chunk[column], errors="coerce").astype(np.float64)
+                present = values.dropna()
+                if (present == np.floor(present)).all():
+                    chunk[column] = values.astype("Int64")
+                else:
+                    chunk[column] = values
+        return chunk
+
+    def write(self, chunk: pd.DataFrame):
+        if chunk.empty:
+            return
+        normalized = self.normalize(chunk)
+        self.write_normalized(normalized)
+        self.rows_written += len(normalized)
+
+    @abstractmethod
+    def write_normalized(self, chunk: pd.DataFrame):
+        pass
+
+    def close(self):
+        return
+
+
+@dataclass
+class JsonlResultWriter(ResultWriter):
+    file: Optional[IO[str]] = None
+
+    def write_normalized(self, chunk: pd.DataFrame):
+        if self.file is None:
+            self.file = open(self.path, "w", encoding="utf-8")
+        for record in chunk.to_dict(orient="records"):
+            self.file.write(json.dumps({key: value for key, value in record.items() if not is_missing(value)}, ensure_ascii=False))
+            self.file.write("\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            # Leave an empty file behind rather than nothing
+            self.file = open(self.path, "w", encoding="utf-8")
+        self.file.close()
+
+
+# JSONL split in numbered parts of at most max_rows_per_file rows: events.jsonl -> events.00000.jsonl, events.00001.jsonl...
+@dataclass
+class RotatingJsonlResultWriter(ResultWriter):
+    max_rows_per_file: int = 1_000_000
+    file: Optional[IO[str]] = None
+    part: int = 0
+    part_rows: int = 0
+
+    def get_part_path(self, part: int) -> str:
+        return get_part_path(self.path, part)
+
+    def write_normalized(self, chunk: pd.DataFrame):
+        for record in chunk.to_dict(orient="records"):
+            if self.file is None or self.part_rows >= self.max_rows_per_file:
+                self.open_next_part()
+            self.file.write(json.dumps({key: value for key, value in record.items() if not is_missing(value)}, ensure_ascii=False))
+            self.file.write("\n")
+            self.part_rows += 1
+        self.file.flush()
+
+    def open_next_part(self):
+        if self.file is not None:
+            self.file.close()
+            self.part += 1
+        self.file = open(self.get_part_path(self.part), "w", encoding="utf-8")
+        self.part_rows = 0
+
+    def close(self):
+        if self.file is None:
+            self.open_next_part()
+        self.file.close()
+
+
+@dataclass
+class CsvResultWriter(ResultWriter):
+    file: Optional[IO[str]] = None
+
+    def write_normalized(self, chunk: pd.DataFrame):
+        write_header = self.file is None
+        if self.file is None:
+            self.file = open(self.path, "w", encoding="utf-8", newline="")
+        chunk.to_csv(self.file, header=write_header, index=False)
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            self.file = open(self.path, "w", encoding="utf-8", newline="")
+            pd.DataFrame(columns=self.columns).to_csv(self.file, index=False)
+        self.file.close()
+
+
+@dataclass
+class ParquetResultWriter(ResultWriter):
+    writer: Any = None
+
+    def get_schema(self):
+        import pyarrow as pa
+        return pa.schema([
+            (column, pa.string() if column in self.string_columns else pa.float64())
+            for column in self.columns
+        ])
+
+    def write_normalized(self, chunk: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = self.get_schema()
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, schema)
+        # One row group per chunk
+        numeric_columns = {column: np.float64 for column in self.columns if column not in self.string_columns}
+        self.writer.write_table(pa.Table.from_pandas(chunk.astype(numeric_columns), schema=schema, preserve_index=False))
+
+    def close(self):
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, self.get_schema())
+        self.writer.close()
+
+
+# Arrow IPC file, one record batch per chunk, read back memory-mapped
+@dataclass
+class ArrowResultWriter(ParquetResultWriter):
+
+    def write_normalized(self, chunk: pd.DataFrame):
+        import pyarrow as pa
+
+        schema = self.get_schema()
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.path, schema)
+        numeric_columns = {column: np.float64 for column in self.columns if column not in self.string_columns}
+        self.writer.write_table(pa.Table.from_pandas(chunk.astype(numeric_columns), schema=schema, preserve_index=False))
+
+    def close(self):
+        import pyarrow as pa
+
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.path, self.get_schema())
+        self.writer.close()
+
+
+# One SQLite table, one transaction per chunk
+@dataclass
+class SqliteResultWriter(ResultWriter):
+    table: str = "results"
+    connection: Optional[sqlite3.Connection] = None
+
+    def connect(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.connection = sqlite3.connect(self.path)
+        column_types = ", ".join(
+            f'"{column}" {"TEXT" if column in self.string_columns else "REAL"}' for column in self.columns
+        )
+        self.connection.execute(f'CREATE TABLE "{self.table}" ({column_types})')
+
+    def write_normalized(self, chunk: pd.DataFrame):
+        if self.connection is None:
+            self.connect()
+        rows = (
+            tuple(None if is_missing(value) else value if column in self.string_columns else float(value)
+                  for column, value in zip(self.columns, record))
+            for record in chunk.itertuples(index=False, name=None)
+        )
+        placeholders = ", ".join("?" for _ in self.columns)
+        with self.connection:
+            self.connection.executemany(f'INSERT INTO "{self.table}" VALUES ({placeholders})', rows)
+
+    def close(self):
+        if self.connection is None:
+            self.connect()
+        self.connection.close()
+
+
+RESULT_WRITERS = {
+    "jsonl": JsonlResultWriter,
+    "csv": CsvResultWriter,
+    "parquet": ParquetResultWriter,
+    "arrow": ArrowResultWriter,
+    "sqlite": SqliteResultWriter,
+}
+
+ARROW_FORMATS = ["parquet", "arrow"]
+
+
+def get_output_format(path: str, output_format: Optional[str] = None) -> str:
+    if output_format is None:
+        output_format = os.path.splitext(path)[1].lstrip(".").lower()
+    if output_format not in RESULT_WRITERS:
+        raise ValueError(f"Unsupported output format '{output_format}', use one of {sorted(RESULT_WRITERS)}")
+
+    if output_format in ARROW_FORMATS:
+        try:
+            import pyarrow
+        except ImportError as error:
+            raise ImportError(f"{output_format.capitalize()} output needs pyarrow installed (pip install pyarrow)") from error
+
+    return output_format
+
+
+def open_result_writer(path: str, columns: List[str], string_columns: List[str], output_format: Optional[str] = None,
+                       max_rows_per_file: Optional[int] = None) -> ResultWriter:
+    # max_rows_per_file rotates JSONL output over numbered part files
+    output_format = get_output_format(path, output_format)
+
+    if max_rows_per_file is not None:
+        if output_format != "jsonl":
+            raise ValueError("Only jsonl output can be rotated over several files")
+        return RotatingJsonlResultWriter(path=path, columns=columns, string_columns=string_columns, max_rows_per_file=max_rows_per_file)
+
+    return RESULT_WRITERS[output_format](path=path, columns=columns, string_columns=string_columns)
+
+
+def open_log_sink(path: str, output_format: Optional[str] = None, max_rows_per_file: Optional[int] = None,
+                  with_messages: bool = False) -> ResultWriter:
+    # Writer with the Log's columns, for Model.initialize(log_sink=...)
+    columns = [column for column in LOG_COLUMNS if with_messages or column != "message"]
+    return open_result_writer(path, columns, LOG_STRING_COLUMNS, output_format, max_rows_per_file)
+
+
+def get_part_path(path: str, part: int) -> str:
+    root, extension = os.path.splitext(path)
+    return f"{root}.{part:05d}{extension}"
+
+
+def iter_result_chunks(path: str, output_format: Optional[str] = None, chunk_rows: int = 100_000,
+                       table: str = "results") -> Iterator[pd.DataFrame]:
+    # Reads back what a ResultWriter wrote, chunk_rows rows at a time, without loading the whole file.
+    # Rotated JSONL is read part by part when path itself doesn't exist.
+    output_format = get_output_format(path, output_format)
+
+    if output_format == "jsonl":
+        root, extension = os.path.splitext(path)
+        paths = [path] if os.path.exists(path) else sorted(glob.glob(f"{glob.escape(root)}.{'[0-9]' * 5}{glob.escape(extension)}"))
+        for part_path in paths:
+            if os.path.getsize(part_path) == 0:
+                continue
+            yield from pd.read_json(part_path, lines=True, chunksize=chunk_rows)
+    elif output_format == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    elif output_format == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif output_format == "arrow":
+        import pyarrow as pa
+        # Memory-mapped, batches are only paged in when converted
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index).to_pandas()
+    elif output_format == "sqlite":
+        connection = sqlite3.connect(path)
+        try:
+            yield from pd.read_sql_query(f'SELECT * FROM "{table}" ORDER BY rowid', connection, chunksize=chunk_rows)
+        finally:
+            connection.close()
+
+
+def read_results(path: str, output_format: Optional[str] = None, table: str = "results") -> pd.DataFrame:
+    frames = list(iter_result_chunks(path, output_format, table=table))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA
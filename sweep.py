@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Dict, Any, Optional, Sequence
+import itertools
+import numpy as np
+import pandas as pd
+from batch import BatchRun, iter_batch, SUMMARY_COLUMNS, get_first_overridden_chapter
+from config_import import Config, ConfigCell
+
+# Runs every combination of a set of config cell values, e.g.
+#   parameters = [SweepParameter.initialize("PLAYER.atk.stat_meta_cost_exp", low=20, high=40, steps=5),
+#                 SweepParameter.initialize("ENEMIES.boss.enemy_atk", values=[18, 22, 26])]
+#   result = run_sweep(config, parameters, player_types=["casual", "hardcore"])
+#   result.get_variant_metrics()
+
+
+class SweepDesign(Enum):
+    GRID = "grid"
+    LATIN_HYPERCUBE = "latin_hypercube"
+    RANDOM = "random"
+
+
+# One config cell to vary: either an explicit list of values or a [low, high] range
+@dataclass
+class SweepParameter:
+    path: str
+    values: Optional[List[Any]] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    steps: Optional[int] = None
+    integer: bool = False
+
+    @staticmethod
+    def initialize(path: str, values: Optional[Sequence[Any]] = None, low: Optional[float] = None, high: Optional[float] = None,
+                   steps: Optional[int] = None, integer: Optional[bool] = None) -> 'SweepParameter':
+        ConfigCell.parse(path)
+
+        if values is None and (low is None or high is None):
+            raise ValueError(f"Sweep parameter '{path}' needs either values or low and high")
+        if low is not None and high is not None and low > high:
+            raise ValueError(f"Sweep parameter '{path}' has low > high")
+
+        # Integer bounds sample integer values, like the int cells of the sheets
+        if integer is None:
+            integer = values is None and isinstance(low, int) and isinstance(high, int)
+
+        return SweepParameter(
+            path=path,
+            values=list(values) if values is not None else None,
+            low=low,
+            high=high,
+            steps=steps,
+            integer=integer
+        )
+
+    def get_grid_values(self) -> List[Any]:
+        if self.values is not None:
+            return self.values
+        if self.integer and self.steps is None:
+            return list(range(int(self.low), int(self.high) + 1))
+        grid = np.linspace(self.low, self.high, self.steps or 5)
+        return [self.cast(value) for value in grid]
+
+    def get_sample(self, unit_value: float) -> Any:
+        # Maps a value of [0, 1) to the parameter range
+        if self.values is not None:
+            return self.values[min(int(unit_value * len(self.values)), len(self.values) - 1)]
+        if self.integer:
+            return min(int(self.low + unit_value * (self.high - self.low + 1)), int(self.high))
+        return self.cast(self.low + unit_value * (self.high - self.low))
+
+    def cast(self, value: float) -> Any:
+        if self.integer:
+            return int(round(value))
+        return float(value)
+
+
+def make_design(parameters: List[SweepParameter], design: SweepDesign = SweepDesign.GRID,
+                samples: Optional[int] = None, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    # One overrides dict per variant, duplicates (integer collisions of sampled designs) dropped
+    if design == SweepDesign.GRID:
+        combinations = itertools.product(*[parameter.get_grid_values() for parameter in parameters])
+        variants = [dict(zip([parameter.path for parameter in parameters], combination)) for combination in combinations]
+    else:
+        if samples is None:
+            raise ValueError(f"The {design.value} design needs a number of samples")
+        rng = np.random.default_rng(seed)
+        if design == SweepDesign.LATIN_HYPERCUBE:
+            # One sample in each of the `samples` strata of every parameter, strata shuffled per parameter
+            unit_values = np.column_stack([
+                (rng.permutation(samples) + rng.random(samples)) / samples for _ in parameters
+            ])
+        else:
+            unit_values = rng.random((samples, len(parameters)))
+        variants = [
+            {parameter.path: parameter.get_sample(unit_value) for parameter, unit_value in zip(parameters, row)}
+            for row in unit_values
+        ]
+
+    unique_variants: List[Dict[str, Any]] = []
+    seen = set()
+    for variant in variants:
+        key = tuple(repr(value) for value in variant.values())
+        if key not in seen:
+            seen.add(key)
+            unique_variants.append(variant)
+
+    return unique_variants
+
+
+@dataclass
+class SweepResult:
+    # One row per variant with the value of every swept cell
+    variants_df: pd.DataFrame
+    # One row per variant, player type and cleared chapter, like BatchResult.runs_df
+    runs_df: pd.DataFrame
+
+    def get_chapter_metrics(self) -> pd.DataFrame:
+        return self.variants_df.merge(self.runs_df, on="variant_id", how="left")
+
+    def get_variant_metrics(self) -> pd.DataFrame:
+        # Whole-game outcome of every variant and player type
+        grouped = self.runs_df.groupby(["variant_id", "player_type"])
+        metrics = grouped.agg(
+            chapters_cleared=("chapter", "count"),
+            total_days=("clear_day", "max"),
+            total_tries=("run_tries", "sum"),
+            max_days_to_clear=("days_to_clear", "max"),
+            final_gold=("gold", "last"),
+        ).reset_index()
+        return self.variants_df.merge(metrics, on="variant_id", how="left")
+
+
+def run_sweep(config: Config, parameters: List[SweepParameter], design: SweepDesign = SweepDesign.GRID,
+              samples: Optional[int] = None, seed: Optional[int] = None,
+              player_types: Sequence[Optional[str]] = (None,), workers: Optional[int] = None) -> SweepResult:
+    variants = make_design(parameters, design, samples, seed)
+
+    # One seed per variant and player type, spawned from the sweep seed so sweeps with combat randomness replay
+    run_seeds = np.random.SeedSequence(seed).spawn(len(player_types) * len(variants))
+
+    # Variants that only touch later chapters are grouped, so every worker simulates their shared prefix once
+    runs: List[BatchRun] = []
+    for type_index, player_type in enumerate(player_types):
+        order = sorted(range(len(variants)), key=lambda variant_id: get_first_overridden_chapter(variants[variant_id]))
+        for variant_id in order:
+            run_seed = int(run_seeds[type_index * len(variants) + variant_id].generate_state(1)[0])
+            runs.append(BatchRun(run_id=variant_id, player_type=player_type, seed=run_seed, overrides=variants[variant_id]))
+
+    frames = [frame for frame in iter_batch(config, runs, workers) if not frame.empty]
+    runs_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=SUMMARY_COLUMNS)
+    runs_df = runs_df.rename(columns={"run_id": "variant_id"}).drop(columns=["seed"])
+    runs_df = runs_df.sort_values(["variant_id", "player_type", "chapter"], kind="stable").reset_index(drop=True)
+
+    variants_df = pd.DataFrame(variants, columns=[parameter.path for parameter in parameters])
+    variants_df.insert(0, "variant_id", range(len(variants)))
+
+    return SweepResult(variants_df=variants_df, runs_df=runs_df)
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from typing import Dict, List, Any
+import numpy as np
+import pandas as pd
+from config_import import Config, ConfigKeys, ConfigSheets, ConfigTimerActions
+
+# Builds a complete Config without the Google Sheet, for benchmarks and offline experiments, e.g.
+#   config = SyntheticConfigSpec.initialize(chapters=20, days_per_chapter=30, enemy_hp_scale=1.5).build()
+#   config = SYNTHETIC_PRESETS["large"].build()
+
+
+# Player behaviours of every synthetic config: sessions per day and minutes per session
+SYNTHETIC_PLAYER_BEHAVIORS = {
+    "casual": (2, 15.0),
+    "mid": (4, 30.0),
+    "hardcore": (8, 60.0),
+}
+
+# Base stats scaled by the spec: (atk, def, max_hp)
+SYNTHETIC_ENEMIES = {
+    "slime": (8, 1, 40),
+    "skeleton": (14, 4, 90),
+    "boss": (22, 6, 300),
+}
+
+SYNTHETIC_STAT_EVENTS = ["increase_atk", "increase_def", "increase_max_hp", "restore_hp"]
+
+SYNTHETIC_TIME_COSTS = {
+    ConfigTimerActions.EVENT_INCREASE_ATK: 1.5,
+    ConfigTimerActions.EVENT_INCREASE_DEF: 1.5,
+    ConfigTimerActions.EVENT_INCREASE_MAX_HP: 1.5,
+    ConfigTimerActions.EVENT_RESTORE_HP: 1.0,
+    ConfigTimerActions.BATTLE_ENEMY_TURN: 0.25,
+    ConfigTimerActions.BATTLE_PLAYER_TURN: 0.5,
+    ConfigTimerActions.META_PROGRESSION: 2.0,
+}
+
+
+@dataclass(frozen=True)
+class SyntheticConfigSpec:
+    chapters: int
+    days_per_chapter: int
+    # One battle every N days, the last day of every chapter is a boss fight
+    battle_every: int
+    # Multipliers of the base enemy stats
+    enemy_hp_scale: float
+    enemy_atk_scale: float
+    # Daily gold of chapter 1, growing by gold_reward_growth every chapter
+    gold_reward: int
+    gold_reward_growth: int
+    player_type: str
+    seed: int
+
+    @staticmethod
+    def initialize(chapters: int = 5, days_per_chapter: int = 12, battle_every: int = 3, enemy_hp_scale: float = 1.0,
+                   enemy_atk_scale: float = 1.0, gold_reward: int = 10, gold_reward_growth: int = 3,
+                   player_type: str = "mid", seed: int = 0) -> 'SyntheticConfigSpec':
+        if chapters < 1 or days_per_chapter < 1 or battle_every < 1:
+            raise ValueError("Synthetic configs need at least one chapter, one day per chapter and battle_every >= 1")
+        if player_type not in SYNTHETIC_PLAYER_BEHAVIORS:
+            raise ValueError(f"Unknown player type '{player_type}', expected one of {list(SYNTHETIC_PLAYER_BEHAVIORS)}")
+
+        return SyntheticConfigSpec(
+            chapters=chapters,
+            days_per_chapter=days_per_chapter,
+            battle_every=battle_every,
+            enemy_hp_scale=enemy_hp_scale,
+            enemy_atk_scale=enemy_atk_scale,
+            gold_reward=gold_reward,
+            gold_reward_growth=gold_reward_growth,
+            player_type=player_type,
+            seed=seed
+        )
+
+    def get_total_days(self) -> int:
+        return self.chapters * self.days_per_chapter
+
+    def build(self) -> Config:
+        return Config.from_sheets(self.build_sheets())
+
+    def build_sheets(self) -> Dict[str, pd.DataFrame]:
+        return {
+            ConfigSheets.PLAYER_SHEET_NAME.value: self.build_player_sheet(),
+            ConfigSheets.ENEMIES_SHEET_NAME.value: self.build_enemies_sheet(),
+            ConfigSheets.CHAPTERS_SHEET_NAME.value: self.build_chapters_sheet(),
+            ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME.value: self.build_player_behavior_sheet(),
+            ConfigSheets.TIMERS_SHEET_NAME.value: self.build_timers_sheet(),
+        }
+
+    def build_player_sheet(self) -> pd.DataFrame:
+        rows = [
+            (ConfigKeys.STAT_ATK, 10, 2, 50, 30),
+            (ConfigKeys.STAT_DEF, 2, 1, 40, 35),
+            (ConfigKeys.STAT_MAX_HP, 100, 15, 45, 25),
+        ]
+        return pd.DataFrame([
+            {
+                ConfigKeys.STAT_NAME.value: stat.value,
+                ConfigKeys.STAT_INITIAL_VALUE.value: initial_value,
+                ConfigKeys.STAT_META_BONUS_BASE.value: 0,
+                ConfigKeys.STAT_META_BONUS_EXP.value: bonus,
+                ConfigKeys.STAT_META_COST_BASE.value: cost_base,
+                ConfigKeys.STAT_META_COST_EXP.value: cost_exp,
+            }
+            for stat, initial_value, bonus, cost_base, cost_exp in rows
+        ])
+
+    def build_enemies_sheet(self) -> pd.DataFrame:
+        return pd.DataFrame([
+            {
+                ConfigKeys.ENEMY_TYPE.value: enemy_type,
+                ConfigKeys.ENEMY_ATK.value: int(round(enemy_atk * self.enemy_atk_scale)),
+                ConfigKeys.ENEMY_DEF.value: enemy_def,
+                ConfigKeys.ENEMY_MAX_HP.value: int(round(enemy_max_hp * self.enemy_hp_scale)),
+            }
+            for enemy_type, (enemy_atk, enemy_def, enemy_max_hp) in SYNTHETIC_ENEMIES.items()
+        ])
+
+    def build_chapters_sheet(self) -> pd.DataFrame:
+        rng = np.random.default_rng(self.seed)
+        rows: List[Dict[str, Any]] = []
+
+        for chapter_num in range(1, self.chapters + 1):
+            # Later chapters swap more slimes for skeletons
+            skeleton_share = (chapter_num - 1) / max(1, self.chapters - 1)
+            gold_reward = self.gold_reward + self.gold_reward_growth * (chapter_num - 1)
+
+            for day_num in range(1, self.days_per_chapter + 1):
+                if day_num == self.days_per_chapter:
+                    event, event_param = "battle", "boss"
+                elif day_num % self.battle_every == 0:
+                    event, event_param = "battle", "skeleton" if rng.random() < skeleton_share else "slime"
+                else:
+                    event, event_param = SYNTHETIC_STAT_EVENTS[rng.integers(len(SYNTHETIC_STAT_EVENTS))], "1"
+
+                rows.append({
+                    ConfigKeys.CHAPTER_NUM.value: chapter_num,
+                    ConfigKeys.CHAPTER_DAY_NUM.value: day_num,
+                    ConfigKeys.CHAPTER_DAILY_EVENT.value: event,
+                    ConfigKeys.CHAPTER_DAILY_EVENT_PARAM.value: event_param,
+                    ConfigKeys.CHAPTER_DAILY_GOLD_REWARD.value: gold_reward,
+                })
+
+        return pd.DataFrame(rows)
+
+    def build_player_behavior_sheet(self) -> pd.DataFrame:
+        return pd.DataFrame([
+            {
+                ConfigKeys.PLAYER_BEHAVIOR_PLAYER_TYPE.value: player_type,
+                ConfigKeys.PLAYER_BEHAVIOR_SIMULATE.value: "TRUE" if player_type == self.player_type else "FALSE",
+                ConfigKeys.PLAYER_BEHAVIOR_SESSIONS_PER_DAY.value: sessions_per_day,
+                ConfigKeys.PLAYER_BEHAVIOR_SESSION_TIME.value: session_time,
+            }
+            for player_type, (sessions_per_day, session_time) in SYNTHETIC_PLAYER_BEHAVIORS.items()
+        ])
+
+    def build_timers_sheet(self) -> pd.DataFrame:
+        return pd.DataFrame([
+            {ConfigKeys.TIMERS_ACTION_TYPE.value: action.value, ConfigKeys.TIMERS_ACTION_TIME_COST.value: cost}
+            for action, cost in SYNTHETIC_TIME_COSTS.items()
+        ])
+
+
+SYNTHETIC_PRESETS = {
+    "small": SyntheticConfigSpec.initialize(chapters=3, days_per_chapter=10, player_type="casual"),
+    "medium": SyntheticConfigSpec.initialize(chapters=10, days_per_chapter=30, enemy_hp_scale=3.0, enemy_atk_scale=2.0),
+    "large": SyntheticConfigSpec.initialize(chapters=40, days_per_chapter=60, enemy_hp_scale=3.0, enemy_atk_scale=2.5,
+                                            player_type="hardcore"),
+}
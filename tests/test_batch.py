@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+from batch import BatchRun, RunCache, run_batch, simulate_run
+from config_import import Config, ConfigKeys, ConfigSheets
+from model import Model
+from synthetic_config import SyntheticConfigSpec
+from utils import Log
+
+# Batch summaries must not depend on the worker count, and runs resumed from a shared prefix must match
+# runs simulated from the start
+
+
+def build_sheets():
+    return SyntheticConfigSpec.initialize(chapters=4, days_per_chapter=12, enemy_hp_scale=4.0).build_sheets()
+
+
+def build_random_config() -> Config:
+    sheets = build_sheets()
+    sheets[ConfigSheets.PLAYER_SHEET_NAME.value][ConfigKeys.STAT_MISS_CHANCE.value] = 0.1
+    return Config.from_sheets(sheets)
+
+
+def test_worker_count_keeps_results():
+    config = build_random_config()
+    runs = BatchRun.make_runs(seeds=[0, 1, 2], player_types=["casual", "hardcore"])
+
+    serial = run_batch(config, runs, workers=1)
+    pd.testing.assert_frame_equal(run_batch(config, runs, workers=2).runs_df, serial.runs_df)
+    assert set(serial.runs_df["run_id"]) == {run.run_id for run in runs}
+
+
+def test_chapter_stats_match_a_full_run():
+    config = Config.from_sheets(build_sheets())
+    result = run_batch(config, BatchRun.make_runs(seeds=[0, 1, 2], player_types=["mid"]), workers=1)
+
+    # Summary runs fast-forward lost runs, their clear days must be the victories of a run playing every round
+    model = Model.initialize(config.with_player_type("mid"), verbosity=Log.Verbosity.SUMMARY)
+    model.simulate()
+    log_df = model.log.get_logs_as_dataframe()
+    victories = log_df[log_df["action"] == Log.Action.CHAPTER_VICTORY.value]
+
+    stats = result.get_chapter_stats()
+    assert list(stats["chapter"]) == list(victories["chapter"].astype(int))
+    assert list(stats["clear_day_min"]) == list(stats["clear_day_max"]) == list(victories["timer_day"])
+    assert list(stats["run_tries_mean"]) == list(victories["chapter_run_try"].astype(float))
+    assert (stats["runs"] == 3).all()
+    assert (stats["clear_day_std"] == 0).all()
+
+
+@pytest.mark.parametrize("random_combat", [False, True])
+def test_shared_prefix_matches_independent_runs(random_combat):
+    config = build_random_config() if random_combat else Config.from_sheets(build_sheets())
+    runs = [
+        BatchRun(run_id=0, player_type="casual", seed=0, overrides={"CHAPTERS.3.gold_reward": 1}),
+        BatchRun(run_id=1, player_type="casual", seed=1, overrides={"CHAPTERS.3/4.daily_event_param": 9}),
+        BatchRun(run_id=2, player_type="casual", seed=0, overrides={"CHAPTERS.4.gold_reward": 100, "CHAPTERS.3/1.gold_reward": 0}),
+        BatchRun(run_id=3, player_type="hardcore", seed=1, overrides={"CHAPTERS.2.gold_reward": 2}),
+    ]
+
+    cache = RunCache()
+    # Twice, the second pass resumes every run from the cached prefixes, which must not have been modified
+    for _ in range(2):
+        for run in runs:
+            assert simulate_run(config, run, cache) == simulate_run(config, run), run
+    assert cache.prefixes
@@ -0,0 +1,99 @@
+import pytest
+from config_import import Config, ConfigKeys, ConfigSheets, ConfigTimerActions
+from model import Model, ChapterPlan, RunContext, Day, Player_Character, BATTLE_EVENT_CODE
+from population import PopulationModel
+from synthetic_config import SyntheticConfigSpec
+from utils import Log
+
+# Battles resolved in closed form must end in the same state as the round by round simulation,
+# with decimal turn costs whose float sums round differently from their products
+
+# Player (atk, def, max_hp): short wins, long wins crossing several sessions and defeats
+PLAYER_STATS = [(10, 2, 100), (12, 5, 5000), (30, 1, 400), (9, 0, 60)]
+
+
+def build_config(player_turn_cost: float, enemy_turn_cost: float) -> Config:
+    sheets = SyntheticConfigSpec.initialize(chapters=3, days_per_chapter=9, enemy_hp_scale=8.0).build_sheets()
+    timers = sheets[ConfigSheets.TIMERS_SHEET_NAME.value]
+    action_types = timers[ConfigKeys.TIMERS_ACTION_TYPE.value]
+    timers.loc[action_types == ConfigTimerActions.BATTLE_PLAYER_TURN.value, ConfigKeys.TIMERS_ACTION_TIME_COST.value] = player_turn_cost
+    timers.loc[action_types == ConfigTimerActions.BATTLE_ENEMY_TURN.value, ConfigKeys.TIMERS_ACTION_TIME_COST.value] = enemy_turn_cost
+    return Config.from_sheets(sheets)
+
+
+def fight(config: Config, day_plan, player_stats, start_time: float, rounds: bool):
+    model = Model.initialize(config, verbosity=Log.Verbosity.DAY)
+    context = RunContext.initialize(model.log, model.player_behavior, model.action_table)
+    model.player_behavior.time_spent(start_time)
+
+    day = Day.initialize(day_plan)
+    player_character = Player_Character.initialize(*player_stats)
+    if rounds:
+        day.simulate_battle_rounds(context, 1, player_character, day.event_enemy)
+    else:
+        day.simulate_battle(context, 1, player_character, day.event_enemy)
+
+    timer = model.timer
+    return (player_character.stat_hp, day.event_enemy.stat_hp,
+            timer.total_time, timer.session_time, timer.day_session_num, model.log.table.size)
+
+
+@pytest.mark.parametrize("player_turn_cost, enemy_turn_cost", [(0.1, 0.05), (0.3, 0.2), (0.7, 0.1)])
+def test_resolved_battles_match_battle_rounds(player_turn_cost, enemy_turn_cost):
+    config = build_config(player_turn_cost, enemy_turn_cost)
+    battle_plans = [
+        day_plan
+        for plan in ChapterPlan.get_plans(config).values()
+        for day_plan in plan.days
+        if day_plan.event_code == BATTLE_EVENT_CODE
+    ]
+    assert battle_plans
+
+    for day_plan in battle_plans:
+        for player_stats in PLAYER_STATS:
+            for start_time in (0.0, 7.3, 29.95):
+                resolved = fight(config, day_plan, player_stats, start_time, rounds=False)
+                assert resolved == fight(config, day_plan, player_stats, start_time, rounds=True), (day_plan, player_stats, start_time)
+
+
+def fight_outcome(config: Config, day_plan, player_stats, rounds: bool):
+    try:
+        return fight(config, day_plan, player_stats, 7.3, rounds)
+    except AssertionError as error:
+        return str(error)
+
+
+def test_long_battles_hit_the_same_turn_ceiling():
+    # One damage per hit: the 320 HP enemies fall within MAX_BATTLE_TURNS, the 720 and 2400 HP ones don't
+    config = build_config(0.1, 0.05)
+    outcomes = []
+    for plan in ChapterPlan.get_plans(config).values():
+        for day_plan in plan.days:
+            if day_plan.event_code != BATTLE_EVENT_CODE:
+                continue
+            enemy = day_plan.enemy.spawn()
+            for player_stats in ((enemy.stat_def + 1, enemy.stat_atk, 100), (enemy.stat_def + 1, enemy.stat_atk - 1, 450),
+                                 (enemy.stat_def + 1, enemy.stat_atk - 1, 600)):
+                resolved = fight_outcome(config, day_plan, player_stats, rounds=False)
+                assert resolved == fight_outcome(config, day_plan, player_stats, rounds=True), (day_plan, player_stats)
+                outcomes.append(resolved)
+
+    assert any(isinstance(outcome, str) for outcome in outcomes)
+    assert any(not isinstance(outcome, str) for outcome in outcomes)
+
+
+def test_stalemate_fails_at_every_verbosity():
+    sheets = SyntheticConfigSpec.initialize(chapters=2, days_per_chapter=6).build_sheets()
+    enemies = sheets[ConfigSheets.ENEMIES_SHEET_NAME.value]
+    player_atk = sheets[ConfigSheets.PLAYER_SHEET_NAME.value].loc[0, ConfigKeys.STAT_INITIAL_VALUE.value]
+    enemies[ConfigKeys.ENEMY_ATK.value] = 0
+    enemies[ConfigKeys.ENEMY_DEF.value] = player_atk - 1
+    enemies[ConfigKeys.ENEMY_MAX_HP.value] = 5000
+    config = Config.from_sheets(sheets)
+
+    for verbosity in Log.Verbosity:
+        model = Model.initialize(config, verbosity=verbosity)
+        with pytest.raises(AssertionError, match="infinite loop detected in battle"):
+            model.simulate()
+    with pytest.raises(AssertionError, match="infinite loop detected in battle"):
+        PopulationModel.initialize(config, [config.get_index().selected_player_type]).simulate()
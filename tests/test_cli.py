@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+from batch import BatchRun, iter_batch
+from cli import main
+from config_import import Config
+from config_snapshot import ConfigSnapshotStore
+from result_writers import open_result_writer, read_results
+from synthetic_config import SyntheticConfigSpec
+from utils import Log, LOG_COLUMNS, LOG_STRING_COLUMNS
+
+# --events streams every run through a log sink, its output must be the event logs iter_batch returns whole
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_events_match_in_memory_event_logs(tmp_path, workers):
+    snapshot_dir = str(tmp_path / "snapshot")
+    ConfigSnapshotStore.initialize(snapshot_dir, ttl_seconds=None).save(
+        SyntheticConfigSpec.initialize(chapters=2, days_per_chapter=6, enemy_hp_scale=2.0).build_sheets())
+    config = Config.from_snapshot(snapshot_dir)
+    runs = BatchRun.make_runs(seeds=[0, 1], player_types=["casual", "hardcore"])
+
+    expected_path = str(tmp_path / "expected.jsonl")
+    writer = open_result_writer(expected_path, ["run_id", "player_type", "seed"] + LOG_COLUMNS, ["player_type"] + LOG_STRING_COLUMNS)
+    for frame in iter_batch(config, runs, workers=1, events=True, verbosity=Log.Verbosity.DAY):
+        writer.write(frame)
+    writer.close()
+
+    output_path = str(tmp_path / "events.jsonl")
+    assert main(["-o", output_path, "--snapshot", snapshot_dir, "--player-type", "casual", "--player-type", "hardcore",
+                 "--seeds", "0", "1", "--events", "--verbosity", "day", "--workers", workers, "--buffer-rows", "400"]) == 0
+
+    pd.testing.assert_frame_equal(read_results(output_path), read_results(expected_path))
+    # The per-run event files are gone
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["events.jsonl", "expected.jsonl", "snapshot"]
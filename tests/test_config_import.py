@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+from config_import import CONFIG_WORKSHEETS, Config, ConfigSheets, import_worksheets, numericise_cell, values_to_dataframe
+from config_providers import SheetsConfigProvider
+from model import Model
+from synthetic_config import SyntheticConfigSpec
+
+# The batched loader must build the same DataFrames get_all_records did, from the formatted strings
+# the Sheets API returns, with a local fake client standing in for gspread
+
+
+class FakeSpreadsheet:
+    def __init__(self, values):
+        self.values = values
+        self.requests = []
+
+    def values_batch_get(self, ranges):
+        self.requests.append(ranges)
+        return {"valueRanges": [{"range": name, "values": self.values[name.strip("'")]} for name in ranges]}
+
+
+class FakeClient:
+    def __init__(self, spreadsheet: FakeSpreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open(self, name: str) -> FakeSpreadsheet:
+        assert name == ConfigSheets.SPREADSHEET_NAME.value
+        return self.spreadsheet
+
+
+def to_values(sheet_df: pd.DataFrame):
+    # Cells rendered as strings, like the API returns them
+    rows = [[str(value) for value in row] for row in sheet_df.itertuples(index=False)]
+    return [list(sheet_df.columns)] + rows
+
+
+def test_fake_client_loads_every_worksheet():
+    sheets = SyntheticConfigSpec.initialize(chapters=3, days_per_chapter=6).build_sheets()
+    spreadsheet = FakeSpreadsheet({name: to_values(sheet_df) for name, sheet_df in sheets.items()})
+
+    loaded = SheetsConfigProvider(client=FakeClient(spreadsheet)).load_sheets()
+
+    assert len(spreadsheet.requests) == 1
+    assert list(loaded) == [sheet.value for sheet in CONFIG_WORKSHEETS]
+    for name, sheet_df in sheets.items():
+        pd.testing.assert_frame_equal(loaded[name].astype(str), sheet_df.astype(str), check_dtype=False)
+
+    # Numbers parsed back into numbers, the mixed daily_event_param column holds ints and enemy names
+    models = [Model.initialize(Config.from_sheets(config_sheets)) for config_sheets in (loaded, sheets)]
+    for model in models:
+        model.simulate()
+    pd.testing.assert_frame_equal(models[0].log.get_logs_as_dataframe(), models[1].log.get_logs_as_dataframe())
+
+
+def test_get_all_records_cells():
+    values = [
+        ["name", "count", "ratio", "flag", "note"],
+        ["a", "007", "1.50", "TRUE", ""],
+        ["b", "-3", "1e3", "FALSE", "1_000"],
+        ["c", " 5 ", "nan_value"],
+    ]
+    expected = pd.DataFrame([
+        {"name": "a", "count": 7, "ratio": 1.5, "flag": "TRUE", "note": ""},
+        {"name": "b", "count": -3, "ratio": 1000.0, "flag": "FALSE", "note": "1_000"},
+        {"name": "c", "count": 5, "ratio": "nan_value", "flag": "", "note": ""},
+    ])
+    pd.testing.assert_frame_equal(values_to_dataframe(values), expected)
+    assert values_to_dataframe([]).empty
+
+
+def test_missing_worksheet_raises():
+    spreadsheet = FakeSpreadsheet({"PLAYER": [["stat_name"], ["atk"]]})
+    spreadsheet.values_batch_get = lambda ranges: {"valueRanges": [{"values": [["stat_name"], ["atk"]]}]}
+    with pytest.raises(ValueError, match="missing"):
+        import_worksheets(spreadsheet, ["PLAYER", "ENEMIES"])
+
+
+def test_numericise_matches_gspread():
+    gspread_utils = pytest.importorskip("gspread.utils")
+    cells = ["", "0", "007", "-3", " 5 ", "1.50", "1e3", "-0.25", "inf", "nan", "1_000", "1,000", "TRUE", "slime", "3 days"]
+    assert [numericise_cell(cell) for cell in cells] == gspread_utils.numericise_all(cells)
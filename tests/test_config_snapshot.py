@@ -0,0 +1,60 @@
+import pytest
+import config_snapshot
+from config_import import ConfigSheets
+from config_providers import ConfigProvider, SnapshotCachedConfigProvider
+from config_snapshot import ConfigSnapshotStore
+from synthetic_config import SyntheticConfigSpec
+
+
+CHAPTERS = ConfigSheets.CHAPTERS_SHEET_NAME.value
+
+
+class InterruptedSave(Exception):
+    pass
+
+
+class FailingProvider(ConfigProvider):
+    def __init__(self, error: Exception):
+        self.error = error
+
+    def load_sheets(self):
+        raise self.error
+
+
+def build_sheets(chapters: int):
+    return SyntheticConfigSpec.initialize(chapters=chapters, days_per_chapter=4).build_sheets()
+
+
+def test_interrupted_save_keeps_previous_snapshot(tmp_path, monkeypatch):
+    store = ConfigSnapshotStore.initialize(str(tmp_path), ttl_seconds=None)
+    previous_hash = store.save(build_sheets(2))
+
+    write_atomic = config_snapshot.write_atomic
+    def interrupt_manifest(path, payload):
+        if path == store.get_manifest_path():
+            raise InterruptedSave()
+        write_atomic(path, payload)
+
+    monkeypatch.setattr(config_snapshot, "write_atomic", interrupt_manifest)
+    with pytest.raises(InterruptedSave):
+        store.save(build_sheets(3))
+    monkeypatch.undo()
+
+    assert store.get_content_hash() == previous_hash
+    assert len(store.load()[CHAPTERS]) == len(build_sheets(2)[CHAPTERS])
+
+    store.save(build_sheets(3))
+    assert len(store.load()[CHAPTERS]) == len(build_sheets(3)[CHAPTERS])
+    assert len(list(tmp_path.iterdir())) == len(build_sheets(3)) + 1
+
+
+def test_only_unavailable_sources_fall_back_to_snapshot(tmp_path):
+    store = ConfigSnapshotStore.initialize(str(tmp_path), ttl_seconds=None)
+    store.save(build_sheets(2))
+
+    offline = SnapshotCachedConfigProvider(source=FailingProvider(ConnectionError("offline")), store=store, refresh=True)
+    assert set(offline.load_sheets()) == set(build_sheets(2))
+
+    broken = SnapshotCachedConfigProvider(source=FailingProvider(KeyError("daily_event")), store=store, refresh=True)
+    with pytest.raises(KeyError):
+        broken.load_sheets()
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+from config_import import Config
+from model import Model
+from synthetic_config import SyntheticConfigSpec, SYNTHETIC_PLAYER_BEHAVIORS
+from utils import Log
+
+# Fast forwarded runs must end in the same state as playing every lost run, only the rows of the skipped
+# runs are replaced by ROUNDS_FAST_FORWARDED rows
+
+# Rows logged outside the skipped runs, or for the time they took
+KEPT_ACTIONS = [Log.Action.CHAPTER_VICTORY, Log.Action.META_STAT_LEVEL_UP, Log.Action.PLAYER_NEW_SESSION, Log.Action.PLAYER_NEW_DAY]
+
+
+def build_config() -> Config:
+    return Config.from_sheets(SyntheticConfigSpec.initialize(chapters=4, days_per_chapter=12, enemy_hp_scale=4.0).build_sheets())
+
+
+def run(config: Config, fast_forward: bool) -> Model:
+    model = Model.initialize(config, fast_forward=fast_forward)
+    model.simulate()
+    return model
+
+
+def get_state(model: Model):
+    timer = model.timer
+    return (timer.total_time, timer.session_time, timer.day_session_num, model.rounds_done,
+            model.meta_progression.gold, model.meta_progression.chapter_level, model.meta_progression.get_stat_levels())
+
+
+def get_action_rows(log_df: pd.DataFrame, action: Log.Action) -> pd.DataFrame:
+    return log_df[log_df["action"] == action.value].dropna(axis=1, how="all").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("player_type", list(SYNTHETIC_PLAYER_BEHAVIORS))
+def test_fast_forward_matches_every_run(player_type):
+    config = build_config().with_player_type(player_type)
+    expected = run(config, fast_forward=False)
+    model = run(config, fast_forward=True)
+    assert get_state(model) == get_state(expected)
+
+    log_df, expected_df = model.log.get_logs_as_dataframe(), expected.log.get_logs_as_dataframe()
+    for action in KEPT_ACTIONS:
+        pd.testing.assert_frame_equal(get_action_rows(log_df, action), get_action_rows(expected_df, action))
+
+    skipped = get_action_rows(log_df, Log.Action.ROUNDS_FAST_FORWARDED)["rounds_skipped"].sum()
+    assert skipped > 0
+    assert len(get_action_rows(log_df, Log.Action.ROUND_COMPLETED)) + skipped == \
+        len(get_action_rows(expected_df, Log.Action.ROUND_COMPLETED))
+
+
+def test_fast_forward_stops_at_max_rounds():
+    config = build_config()
+    log_df = run(config, fast_forward=True).log.get_logs_as_dataframe()
+    fast_forwarded = get_action_rows(log_df, Log.Action.ROUNDS_FAST_FORWARDED)
+    fast_forwarded = fast_forwarded.iloc[fast_forwarded["rounds_skipped"].idxmax()]
+    assert fast_forwarded["rounds_skipped"] > 1
+    # A ceiling after the first of the skipped runs
+    max_rounds = int(fast_forwarded["rounds_done"] - fast_forwarded["rounds_skipped"] + 1)
+
+    models = []
+    for fast_forward in (False, True):
+        model = Model.initialize(config, fast_forward=fast_forward, max_rounds=max_rounds)
+        with pytest.raises(AssertionError, match="Possible infinite loop detected"):
+            model.simulate()
+        models.append(model)
+
+    assert models[1].rounds_done == max_rounds + 1
+    assert get_state(models[1]) == get_state(models[0])
@@ -0,0 +1,53 @@
+import glob
+import os
+import pandas as pd
+import pytest
+from config_import import Config
+from model import Model
+from result_writers import get_part_path, iter_result_chunks, open_log_sink
+from synthetic_config import SyntheticConfigSpec
+from utils import Log
+
+# Rows flushed to a log sink through a small buffer and read back chunk by chunk must be the rows
+# an in-memory log holds, while the buffer never grows past its size
+
+BUFFER_ROWS = 1024
+CHUNK_ROWS = 2000
+
+
+def build_config() -> Config:
+    return Config.from_sheets(SyntheticConfigSpec.initialize(chapters=2, days_per_chapter=6, enemy_hp_scale=2.0).build_sheets())
+
+
+@pytest.mark.parametrize("output_format, max_rows_per_file", [
+    ("jsonl", None), ("jsonl", 2500), ("csv", None), ("parquet", None), ("arrow", None), ("sqlite", None),
+])
+def test_sink_round_trip(tmp_path, output_format, max_rows_per_file):
+    if output_format in ("parquet", "arrow"):
+        pytest.importorskip("pyarrow")
+    config = build_config()
+    expected = Model.initialize(config, verbosity=Log.Verbosity.COMBAT)
+    expected.simulate()
+    expected_df = expected.log.get_logs_as_dataframe(with_messages=False)
+
+    path = str(tmp_path / f"events.{output_format}")
+    sink = open_log_sink(path, max_rows_per_file=max_rows_per_file)
+    model = Model.initialize(config, verbosity=Log.Verbosity.COMBAT, log_sink=sink, log_buffer_rows=BUFFER_ROWS)
+    model.simulate()
+    model.log.close()
+
+    assert model.log.table.capacity == BUFFER_ROWS
+    assert model.log.rows_flushed == len(expected_df) > 4 * BUFFER_ROWS
+    if max_rows_per_file is not None:
+        assert not os.path.exists(path)
+        assert len(glob.glob(get_part_path(path, 0).replace("00000", "*"))) == -(-len(expected_df) // max_rows_per_file)
+
+    chunks = list(iter_result_chunks(path, chunk_rows=CHUNK_ROWS))
+    assert len(chunks) > 1
+    if output_format not in ("parquet", "arrow"):
+        # The Arrow formats read back one record batch per flush instead
+        assert all(len(chunk) <= CHUNK_ROWS for chunk in chunks)
+
+    # Same columns and value types on both sides before comparing
+    read_df = sink.normalize(pd.concat(chunks, ignore_index=True))
+    pd.testing.assert_frame_equal(read_df, sink.normalize(expected_df))
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+from config_import import Config, ConfigKeys, ConfigSheets
+from model import Model
+from population import PopulationModel
+from synthetic_config import SyntheticConfigSpec
+
+
+def build_sheets():
+    return SyntheticConfigSpec.initialize(chapters=4, days_per_chapter=12, enemy_hp_scale=3.0).build_sheets()
+
+
+def test_extra_player_rows_take_no_upgrades():
+    sheets = build_sheets()
+    player = sheets[ConfigSheets.PLAYER_SHEET_NAME.value]
+    luck = player.iloc[[0]].assign(**{ConfigKeys.STAT_NAME.value: "luck", ConfigKeys.STAT_META_COST_BASE.value: 1})
+    extra_sheets = {**sheets, ConfigSheets.PLAYER_SHEET_NAME.value: pd.concat([player, luck], ignore_index=True)}
+
+    for spend_all_gold in (False, True):
+        base = Model.initialize(Config.from_sheets(sheets), spend_all_gold=spend_all_gold)
+        base.simulate()
+        extra = Model.initialize(Config.from_sheets(extra_sheets), spend_all_gold=spend_all_gold)
+        extra.simulate()
+
+        pd.testing.assert_frame_equal(extra.log.get_logs_as_dataframe(), base.log.get_logs_as_dataframe())
+        assert extra.meta_progression.get_stat_levels() == base.meta_progression.get_stat_levels() + (0,)
+
+
+def test_spend_all_gold_rejects_free_upgrades():
+    sheets = build_sheets()
+    sheets[ConfigSheets.PLAYER_SHEET_NAME.value].loc[0, ConfigKeys.STAT_META_COST_BASE.value] = 0
+    config = Config.from_sheets(sheets)
+
+    with pytest.raises(ValueError, match="positive cost"):
+        Model.initialize(config, spend_all_gold=True)
+    with pytest.raises(ValueError, match="positive cost"):
+        PopulationModel.initialize(config, [config.get_index().selected_player_type], spend_all_gold=True)
@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+from config_import import Config, ConfigKeys, ConfigSheets
+from model import Model, ChapterOutcomeCache
+from synthetic_config import SyntheticConfigSpec, SYNTHETIC_PLAYER_BEHAVIORS
+from utils import Log
+
+# Runs replayed from the chapter outcome cache must end in the same state, and log the same rows,
+# as runs simulating every day, also when the cache is shared by the runs of a batch
+
+
+def build_sheets(enemy_hp_scale: float = 4.0):
+    return SyntheticConfigSpec.initialize(chapters=4, days_per_chapter=12, enemy_hp_scale=enemy_hp_scale).build_sheets()
+
+
+def run(config: Config, use_outcome_cache: bool, verbosity: Log.Verbosity = Log.Verbosity.DAY):
+    model = Model.initialize(config, verbosity=verbosity, use_outcome_cache=use_outcome_cache)
+    model.simulate()
+    return model
+
+
+def assert_same_run(model: Model, expected: Model):
+    assert (model.timer.total_time, model.timer.session_time, model.timer.day_session_num) == \
+        (expected.timer.total_time, expected.timer.session_time, expected.timer.day_session_num)
+    assert model.rounds_done == expected.rounds_done
+    assert model.meta_progression.gold == expected.meta_progression.gold
+    assert model.meta_progression.get_stat_levels() == expected.meta_progression.get_stat_levels()
+    pd.testing.assert_frame_equal(model.log.get_logs_as_dataframe(), expected.log.get_logs_as_dataframe())
+
+
+@pytest.mark.parametrize("verbosity", [Log.Verbosity.SUMMARY, Log.Verbosity.DAY])
+def test_cached_runs_match_uncached_runs(verbosity):
+    config = Config.from_sheets(build_sheets())
+
+    # The runs of one player type share the cache of its config, like the runs of a batch
+    for player_type in SYNTHETIC_PLAYER_BEHAVIORS:
+        player_config = config.with_player_type(player_type)
+        expected = run(player_config, use_outcome_cache=False, verbosity=verbosity)
+        for _ in range(2):
+            assert_same_run(run(player_config, use_outcome_cache=True, verbosity=verbosity), expected)
+        assert ChapterOutcomeCache.get_cache(player_config).hits > 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ChapterOutcomeCache(max_size=2)
+    cache.put("a", "outcome a")
+    cache.put("b", "outcome b")
+    assert cache.get("a") == "outcome a"
+    cache.put("c", "outcome c")
+
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_runs_match_at_the_cache_size_bound():
+    config = Config.from_sheets(build_sheets())
+    expected = run(config, use_outcome_cache=False)
+
+    cache = ChapterOutcomeCache.get_cache(config)
+    cache.max_size = 1
+    assert_same_run(run(config, use_outcome_cache=True), expected)
+    assert len(cache.entries) == 1
+
+
+def build_edited_sheets():
+    sheets = build_sheets()
+    sheets[ConfigSheets.ENEMIES_SHEET_NAME.value][ConfigKeys.ENEMY_ATK.value] += 3
+    return sheets
+
+
+def test_reasign_config_drops_cached_outcomes():
+    config = Config.from_sheets(build_sheets())
+    run(config, use_outcome_cache=True)
+    assert ChapterOutcomeCache.get_cache(config).entries
+
+    edited = build_edited_sheets()
+    config.reasign_config(*(edited[sheet.value] for sheet in (
+        ConfigSheets.PLAYER_SHEET_NAME, ConfigSheets.ENEMIES_SHEET_NAME, ConfigSheets.CHAPTERS_SHEET_NAME,
+        ConfigSheets.PLAYER_BEHAVIOR_SHEET_NAME, ConfigSheets.TIMERS_SHEET_NAME)))
+    assert not ChapterOutcomeCache.get_cache(config).entries
+
+    assert_same_run(run(config, use_outcome_cache=True), run(Config.from_sheets(build_edited_sheets()), use_outcome_cache=False))
@@ -0,0 +1,32 @@
+import pytest
+from config_import import Config, ConfigKeys, ConfigSheets, ConfigTimerActions
+from model import Model
+from population import PopulationModel
+from synthetic_config import SyntheticConfigSpec, SYNTHETIC_PLAYER_BEHAVIORS
+
+# Every simulated player must end with the timer of a Model run of its player type,
+# also with decimal turn costs whose float sums round differently from their products
+
+
+def build_config(player_turn_cost: float, enemy_turn_cost: float) -> Config:
+    sheets = SyntheticConfigSpec.initialize(chapters=4, days_per_chapter=12, enemy_hp_scale=4.0).build_sheets()
+    timers = sheets[ConfigSheets.TIMERS_SHEET_NAME.value]
+    action_types = timers[ConfigKeys.TIMERS_ACTION_TYPE.value]
+    timers.loc[action_types == ConfigTimerActions.BATTLE_PLAYER_TURN.value, ConfigKeys.TIMERS_ACTION_TIME_COST.value] = player_turn_cost
+    timers.loc[action_types == ConfigTimerActions.BATTLE_ENEMY_TURN.value, ConfigKeys.TIMERS_ACTION_TIME_COST.value] = enemy_turn_cost
+    return Config.from_sheets(sheets)
+
+
+@pytest.mark.parametrize("player_turn_cost, enemy_turn_cost", [(0.5, 0.25), (0.1, 0.05), (0.3, 0.2)])
+def test_population_timers_match_model(player_turn_cost, enemy_turn_cost):
+    config = build_config(player_turn_cost, enemy_turn_cost)
+    player_types = list(SYNTHETIC_PLAYER_BEHAVIORS)
+    population = PopulationModel.initialize(config, player_types).simulate()
+    state = population.state
+
+    for player, player_type in enumerate(player_types):
+        model = Model.initialize(config.with_player_type(player_type))
+        model.simulate()
+        assert (state.total_time[player], state.session_time[player], state.day_session_num[player]) == \
+            (model.timer.total_time, model.timer.session_time, model.timer.day_session_num), player_type
+        assert state.rounds_done[player] == model.rounds_done, player_type
@@ -0,0 +1,19 @@
+import pytest
+from config_import import Config, ConfigKeys, ConfigSheets
+from model import Model
+from synthetic_config import SyntheticConfigSpec
+
+
+def test_unwinnable_random_chapter_stops():
+    # A boss on the first day kills the player before any gold is earned, misses alone never win it
+    sheets = SyntheticConfigSpec.initialize(chapters=2, days_per_chapter=6).build_sheets()
+    chapters = sheets[ConfigSheets.CHAPTERS_SHEET_NAME.value]
+    chapters.loc[0, ConfigKeys.CHAPTER_DAILY_EVENT.value] = "battle"
+    chapters.loc[0, ConfigKeys.CHAPTER_DAILY_EVENT_PARAM.value] = "boss"
+    enemies = sheets[ConfigSheets.ENEMIES_SHEET_NAME.value]
+    enemies.loc[enemies[ConfigKeys.ENEMY_TYPE.value] == "boss", ConfigKeys.ENEMY_ATK.value] = 100_000
+    sheets[ConfigSheets.PLAYER_SHEET_NAME.value][ConfigKeys.STAT_MISS_CHANCE.value] = 0.1
+
+    model = Model.initialize(Config.from_sheets(sheets), seed=0)
+    with pytest.raises(AssertionError, match="can't be cleared"):
+        model.simulate()
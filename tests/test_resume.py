@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+from config_diff import ConfigDiff
+from config_import import Config, ConfigKeys, ConfigSheets
+from model import Model
+from synthetic_config import SyntheticConfigSpec
+from utils import Log
+
+# A run resumed from the checkpoints of a previous run must end in the same state, with the same log rows,
+# as a fresh run of the edited config
+
+
+def build_config() -> Config:
+    return Config.from_sheets(SyntheticConfigSpec.initialize(chapters=4, days_per_chapter=12, enemy_hp_scale=4.0).build_sheets())
+
+
+def get_state(model: Model):
+    timer = model.timer
+    return (timer.total_time, timer.session_time, timer.day_session_num, model.rounds_done,
+            model.meta_progression.gold, model.meta_progression.get_stat_levels())
+
+
+def get_first_battle_chapter(config: Config, enemy_type: str) -> int:
+    chapters = config.get_sheets()[ConfigSheets.CHAPTERS_SHEET_NAME.value]
+    battles = chapters[(chapters[ConfigKeys.CHAPTER_DAILY_EVENT.value] == "battle")
+                       & (chapters[ConfigKeys.CHAPTER_DAILY_EVENT_PARAM.value] == enemy_type)]
+    return int(battles[ConfigKeys.CHAPTER_NUM.value].min())
+
+
+@pytest.mark.parametrize("verbosity", [Log.Verbosity.DAY, Log.Verbosity.COMBAT])
+@pytest.mark.parametrize("edit, first_chapter", [
+    ({"CHAPTERS.4.gold_reward": 99}, 4),
+    ({"CHAPTERS.2/1.daily_event_param": 5}, 2),
+    ({"PLAYER_BEHAVIOR.mid.session_time": 12.5}, 1),
+])
+def test_resumed_run_matches_fresh_run(verbosity, edit, first_chapter):
+    config = build_config()
+    previous = Model.initialize(config, verbosity=verbosity)
+    previous.simulate()
+
+    edited = config.with_overrides(edit)
+    resumed = Model.resume(previous, edited, verbosity=verbosity)
+    # Started from the checkpoint on reaching the first edited chapter
+    assert resumed.meta_progression.chapter_level == first_chapter
+    assert (resumed.rounds_done > 0) == (first_chapter > 1)
+    resumed.simulate()
+
+    fresh = Model.initialize(edited, verbosity=verbosity)
+    fresh.simulate()
+    assert get_state(resumed) == get_state(fresh)
+    pd.testing.assert_frame_equal(resumed.log.get_logs_as_dataframe(), fresh.log.get_logs_as_dataframe())
+
+
+def test_resume_after_switching_player_type():
+    config = build_config()
+    previous = Model.initialize(config)
+    previous.simulate()
+
+    # Edits the behavior sheet in place, like the app's player type select
+    config.select_player_type("hardcore")
+    resumed = Model.resume(previous, config)
+    assert resumed.rounds_done == 0
+    resumed.simulate()
+
+    fresh = Model.initialize(config)
+    fresh.simulate()
+    assert get_state(resumed) == get_state(fresh)
+    pd.testing.assert_frame_equal(resumed.log.get_logs_as_dataframe(), fresh.log.get_logs_as_dataframe())
+
+
+def test_unchanged_config_has_no_first_chapter():
+    config = build_config()
+    assert ConfigDiff.between(config.get_sheets(), config.get_sheets()).first_chapter is None
+    assert ConfigDiff.between(config.get_sheets(), build_config().get_sheets()).first_chapter is None
+    # Same value with another type, as edited sheets come back
+    assert ConfigDiff.between(config.get_sheets(), config.with_overrides({"PLAYER.atk.stat_initial_value": 10.0}).get_sheets()).first_chapter is None
+
+
+@pytest.mark.parametrize("edit, first_chapter", [
+    ({"CHAPTERS.3/7.gold_reward": 1}, 3),
+    ({"CHAPTERS.2/2.daily_event_param": 2}, 2),
+    ({"PLAYER.def.stat_meta_cost_exp": 10}, 1),
+    ({"TIMERS.meta_progression.event_time_cost": 7.0}, 1),
+    ({"PLAYER_BEHAVIOR.mid.sessions_per_day": 3}, 1),
+    # Other player types are never simulated
+    ({"PLAYER_BEHAVIOR.casual.session_time": 1.0}, None),
+])
+def test_single_cell_edits_set_first_chapter(edit, first_chapter):
+    config = build_config()
+    assert ConfigDiff.between(config.get_sheets(), config.with_overrides(edit).get_sheets()).first_chapter == first_chapter
+
+
+@pytest.mark.parametrize("enemy_type", ["slime", "skeleton", "boss"])
+def test_enemy_edit_starts_at_its_first_battle(enemy_type):
+    config = build_config()
+    edited = config.with_overrides({f"ENEMIES.{enemy_type}.enemy_atk": 3})
+    assert ConfigDiff.between(config.get_sheets(), edited.get_sheets()).first_chapter == get_first_battle_chapter(config, enemy_type)
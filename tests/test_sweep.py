@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from batch import BatchRun, simulate_run
+from config_import import Config
+from sweep import SweepDesign, SweepParameter, make_design, run_sweep
+from synthetic_config import SyntheticConfigSpec
+
+# Sweep variants resumed from a shared prefix must match variants simulated on their own
+
+
+def build_config() -> Config:
+    return Config.from_sheets(SyntheticConfigSpec.initialize(chapters=4, days_per_chapter=12, enemy_hp_scale=4.0).build_sheets())
+
+
+def test_grid_design_drops_duplicates():
+    parameters = [SweepParameter.initialize("ENEMIES.boss.enemy_atk", low=20, high=22),
+                  SweepParameter.initialize("CHAPTERS.2.gold_reward", values=[5, 5, 8])]
+    design = make_design(parameters)
+    assert [tuple(variant.values()) for variant in design] == [(20, 5), (20, 8), (21, 5), (21, 8), (22, 5), (22, 8)]
+
+
+def test_latin_hypercube_fills_every_stratum():
+    parameters = [SweepParameter.initialize("PLAYER.atk.stat_meta_cost_exp", low=0.0, high=1.0),
+                  SweepParameter.initialize("ENEMIES.boss.enemy_max_hp", low=0.0, high=10.0)]
+    design = make_design(parameters, SweepDesign.LATIN_HYPERCUBE, samples=10, seed=3)
+    assert design == make_design(parameters, SweepDesign.LATIN_HYPERCUBE, samples=10, seed=3)
+
+    for parameter in parameters:
+        units = np.array([variant[parameter.path] for variant in design]) / parameter.high
+        assert sorted(np.floor(units * 10).astype(int)) == list(range(10))
+
+    with pytest.raises(ValueError, match="samples"):
+        make_design(parameters, SweepDesign.RANDOM)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_prefix_sharing_matches_independent_runs(workers):
+    config = build_config()
+    parameters = [SweepParameter.initialize("CHAPTERS.3.gold_reward", values=[1, 20]),
+                  SweepParameter.initialize("CHAPTERS.4/12.daily_event_param", values=["boss", "skeleton"])]
+    result = run_sweep(config, parameters, player_types=["casual", "hardcore"], workers=workers)
+
+    expected = []
+    for variant_id, variant in enumerate(make_design(parameters)):
+        for player_type in ("casual", "hardcore"):
+            expected.extend(simulate_run(config, BatchRun(run_id=variant_id, player_type=player_type, overrides=variant)))
+    expected_df = pd.DataFrame(expected).rename(columns={"run_id": "variant_id"}).drop(columns=["seed"])
+    expected_df = expected_df.sort_values(["variant_id", "player_type", "chapter"], kind="stable").reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(result.runs_df, expected_df, check_dtype=False)
+    assert list(result.variants_df["variant_id"]) == [0, 1, 2, 3]
@@ -0,0 +1,54 @@
+import random
+import pandas as pd
+import pytest
+from model import PlayerBehavior
+from utils import Log, Timer
+
+# Timer.advance and the bulk PlayerBehavior calls must end in the same state, and log the same rows,
+# as spending the time one action at a time
+
+
+def build_player_behavior(session_time: float, sessions_per_day: int, start_time: float) -> PlayerBehavior:
+    timer = Timer(total_time=start_time, session_time=start_time % 1, day_session_num=1)
+    log = Log.initialize(timer, verbosity=Log.Verbosity.DAY)
+    return PlayerBehavior(
+        log=log,
+        timer=timer,
+        timers_config=pd.DataFrame(),
+        player_type="test",
+        player_session_time=session_time,
+        player_sessions_per_day=sessions_per_day,
+    )
+
+
+def get_state(player_behavior: PlayerBehavior):
+    timer = player_behavior.timer
+    return timer.total_time, timer.session_time, timer.day_session_num
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_time_spent_repeated_matches_time_spent(seed):
+    rng = random.Random(seed)
+    for _ in range(30):
+        cost = rng.choice([0.05, 0.1, 0.2, 0.3, 0.7, 1.5, 3.3])
+        count = rng.randint(0, 2000)
+        args = (rng.choice([0.3, 5.0, 7.3, 30.0, 60.0]), rng.randint(1, 5), rng.choice([0.0, 0.1, 1439.9, 2000.3]))
+
+        stepped = build_player_behavior(*args)
+        for _ in range(count):
+            stepped.time_spent(cost)
+        repeated = build_player_behavior(*args)
+        repeated.time_spent_repeated(cost, count)
+
+        assert get_state(repeated) == get_state(stepped), (cost, count, args)
+        pd.testing.assert_frame_equal(repeated.log.get_logs_as_dataframe(), stepped.log.get_logs_as_dataframe())
+
+
+def test_time_spent_repeated_matches_time_spent_across_days():
+    stepped = build_player_behavior(30.0, 3, 0.1)
+    for _ in range(1911):
+        stepped.time_spent(0.2)
+    repeated = build_player_behavior(30.0, 3, 0.1)
+    repeated.time_spent_repeated(0.2, 1911)
+
+    assert get_state(repeated) == get_state(stepped)
@@ -1,10 +1,18 @@
 from enum import Enum
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Callable, Tuple, TYPE_CHECKING
+from string import Formatter
+import numpy as np
 import pandas as pd
 
+if TYPE_CHECKING:
+    from result_writers import ResultWriter
 
-@dataclass
+# Most actions Timer.advance accumulates at once, bounds its memory on long fast-forwards
+MAX_TIMER_CHUNK = 1 << 16
+
+
+@dataclass(slots=True)
 class Timer:
     total_time: float
     session_time: float
@@ -56,6 +64,227 @@ class Timer:
         self.session_time += minutes
         return
 
+    def advance(self, costs: Tuple[float, ...], actions: int, session_time_limit: float, sessions_per_day: int,
+                with_crossings: bool = False) -> 'TimerAdvance':
+        # Same end state as `actions` calls of set_time_increment, with costs repeating as `costs`, each followed by
+        # the session rollover rule of PlayerBehavior.check_session. Float sums depend on their order, so the times
+        # are accumulated one action at a time like those calls would, in NumPy chunks cut at every rollover.
+        # That is O(actions) work, not a closed form: it only saves the per-action Python overhead, which is why
+        # PlayerBehavior.time_spent_cycle still steps through short cycles. The crossings are only built when asked for.
+        result = TimerAdvance.initialize(with_crossings)
+        cycle = np.asarray(costs, dtype=np.float64)
+        cycle_len = len(cycle)
+        mean_cost = float(cycle.mean())
+        offset = 0
+
+        while actions > 0:
+            # Enough actions to usually reach the next rollover in one chunk
+            chunk = actions
+            if mean_cost > 0:
+                chunk = min(chunk, int(max(0.0, session_time_limit - self.session_time) // mean_cost) + cycle_len + 1)
+            chunk = min(chunk, MAX_TIMER_CHUNK)
+
+            # Starting time first, so the cumulative sums add the costs onto it in call order
+            chunk_costs = np.empty(chunk + 1, dtype=np.float64)
+            chunk_costs[1:] = np.resize(np.roll(cycle, -offset), chunk)
+            chunk_costs[0] = self.session_time
+            session_times = np.cumsum(chunk_costs)
+            chunk_costs[0] = self.total_time
+            total_times = np.cumsum(chunk_costs)
+
+            over = np.flatnonzero(session_times[1:] > session_time_limit)
+            step = chunk if len(over) == 0 else int(over[0]) + 1
+            self.session_time = float(session_times[step])
+            self.total_time = float(total_times[step])
+            if len(over) > 0:
+                self.roll_over(session_time_limit, sessions_per_day, result)
+
+            actions -= step
+            offset = (offset + step) % cycle_len
+
+        return result.finish()
+
+    def roll_over(self, session_time_limit: float, sessions_per_day: int, result: 'TimerAdvance'):
+        # PlayerBehavior.check_session, recording the crossing instead of logging it
+        if self.session_time > session_time_limit:
+            if self.day_session_num >= sessions_per_day:
+                self.set_new_day()
+                result.add_day(self.total_time)
+            else:
+                self.set_new_session()
+                result.add_sessions(np.array([self.total_time]), np.array([self.day_session_num]))
+
+
+# Crossings of an advance that crossed nothing
+NO_CROSSINGS = (np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool))
+
+
+# Session and day rollovers crossed by Timer.advance. With crossings, the timer state right after each of them, in order.
+@dataclass
+class TimerAdvance:
+    sessions_started: int
+    days_started: int
+
+    with_crossings: bool
+    parts: List[tuple]
+    total_times: Optional[np.ndarray] = None
+    day_sessions: Optional[np.ndarray] = None
+    new_days: Optional[np.ndarray] = None
+
+    @staticmethod
+    def initialize(with_crossings: bool) -> 'TimerAdvance':
+        return TimerAdvance(sessions_started=0, days_started=0, with_crossings=with_crossings, parts=[])
+
+    def add_sessions(self, total_times: np.ndarray, day_sessions: np.ndarray):
+        self.sessions_started += len(total_times)
+        if self.with_crossings and len(total_times) > 0:
+            self.parts.append((np.asarray(total_times, dtype=np.float64), np.asarray(day_sessions, dtype=np.int64), np.zeros(len(total_times), dtype=bool)))
+
+    def add_day(self, total_time: float):
+        self.days_started += 1
+        if self.with_crossings:
+            self.parts.append((np.array([total_time], dtype=np.float64), np.array([1], dtype=np.int64), np.array([True])))
+
+    def finish(self) -> 'TimerAdvance':
+        if self.with_crossings:
+            # Most advances cross nothing, they share one set of empty arrays
+            parts = self.parts or [NO_CROSSINGS]
+            self.total_times = np.concatenate([part[0] for part in parts])
+            self.day_sessions = np.concatenate([part[1] for part in parts])
+            self.new_days = np.concatenate([part[2] for part in parts])
+        self.parts = []
+        return self
+
+
+# Typed columns of the event log, in DataFrame column order.
+# "f" columns are float64 with NaN for rows that don't carry the field, "o" columns are objects with None.
+LOG_COLUMN_TYPES: Dict[str, str] = {
+    "chapter": "f",
+    "chapter_run_try": "f",
+    "day": "f",
+    "combat_round": "f",
+    "timer_total_time": "f",
+    "rounds_done": "f",
+    "rounds_skipped": "f",
+    "chapter_level": "f",
+    "victory": "f",
+    "gold": "f",
+    "stat_name": "o",
+    "new_level": "f",
+    "event_type": "o",
+    "event_param": "o",
+    "player_hp": "f",
+    "player_max_hp": "f",
+    "player_atk": "f",
+    "player_def": "f",
+    "damage": "f",
+    "enemy_damage": "f",
+    "player_damage": "f",
+    "enemy_type": "o",
+    "enemy_hp": "f",
+    "session_num": "f",
+    "day_num": "f",
+}
+
+
+# Every column get_logs_as_dataframe can produce, in order
+LOG_COLUMNS: List[str] = ["timer_day", "timer_day_session", "timer_session_time", "action", "message"] + list(LOG_COLUMN_TYPES)
+LOG_STRING_COLUMNS: List[str] = ["action", "message"] + [name for name, kind in LOG_COLUMN_TYPES.items() if kind == "o"]
+
+
+@dataclass
+class LogTable:
+    size: int
+    capacity: int
+    action_codes: np.ndarray
+    timer_day: np.ndarray
+    timer_day_session: np.ndarray
+    timer_session_time: np.ndarray
+    columns: Dict[str, np.ndarray]
+    # Called instead of growing when the table is full, it empties the table (see Log.flush)
+    flush_handler: Optional[Callable[[], None]] = None
+
+    @staticmethod
+    def initialize(capacity: int = 1024) -> 'LogTable':
+        return LogTable(
+            size=0,
+            capacity=capacity,
+            action_codes=np.zeros(capacity, dtype=np.int8),
+            timer_day=np.zeros(capacity, dtype=np.int64),
+            timer_day_session=np.zeros(capacity, dtype=np.int64),
+            timer_session_time=np.zeros(capacity, dtype=np.float64),
+            columns={name: LogTable.empty_column(kind, capacity) for name, kind in LOG_COLUMN_TYPES.items()}
+        )
+
+    @staticmethod
+    def empty_column(kind: str, length: int) -> np.ndarray:
+        if kind == "f":
+            return np.full(length, np.nan, dtype=np.float64)
+        return np.full(length, None, dtype=object)
+
+    def grow(self):
+        # Double the capacity, new rows start as missing values
+        extra = self.capacity
+        self.action_codes = np.concatenate([self.action_codes, np.zeros(extra, dtype=np.int8)])
+        self.timer_day = np.concatenate([self.timer_day, np.zeros(extra, dtype=np.int64)])
+        self.timer_day_session = np.concatenate([self.timer_day_session, np.zeros(extra, dtype=np.int64)])
+        self.timer_session_time = np.concatenate([self.timer_session_time, np.zeros(extra, dtype=np.float64)])
+        for name, kind in LOG_COLUMN_TYPES.items():
+            self.columns[name] = np.concatenate([self.columns[name], LogTable.empty_column(kind, extra)])
+        self.capacity += extra
+
+    def make_room(self, rows: int):
+        if self.flush_handler is not None and self.size > 0:
+            self.flush_handler()
+        while self.size + rows > self.capacity:
+            self.grow()
+
+    def clear(self):
+        # Empties the table keeping its capacity, rows are reset to missing values for reuse
+        size = self.size
+        for name, kind in LOG_COLUMN_TYPES.items():
+            self.columns[name][:size] = np.nan if kind == "f" else None
+        self.size = 0
+
+    def add_rows(self, action_codes: np.ndarray, timer_day: np.ndarray, timer_day_session: np.ndarray, timer_session_time: np.ndarray) -> slice:
+        # Bulk version of add_row, returns the slice of the new rows
+        if self.size + len(action_codes) > self.capacity:
+            self.make_room(len(action_codes))
+
+        rows = slice(self.size, self.size + len(action_codes))
+        self.action_codes[rows] = action_codes
+        self.timer_day[rows] = timer_day
+        self.timer_day_session[rows] = timer_day_session
+        self.timer_session_time[rows] = timer_session_time
+        self.size += len(action_codes)
+
+        return rows
+
+    def add_row(self, action_code: int, timer: Timer) -> int:
+        if self.size == self.capacity:
+            self.make_room(1)
+
+        row = self.size
+        self.action_codes[row] = action_code
+        self.timer_day[row] = timer.get_day()
+        self.timer_day_session[row] = timer.get_day_session()
+        self.timer_session_time[row] = timer.get_session_time()
+        self.size += 1
+
+        return row
+
+    def copy_rows(self, rows: int) -> 'LogTable':
+        # New table holding the first rows of this one, e.g. the rows logged before a checkpoint
+        table = LogTable.initialize(max(1024, rows))
+        table.action_codes[:rows] = self.action_codes[:rows]
+        table.timer_day[:rows] = self.timer_day[:rows]
+        table.timer_day_session[:rows] = self.timer_day_session[:rows]
+        table.timer_session_time[:rows] = self.timer_session_time[:rows]
+        for name in LOG_COLUMN_TYPES:
+            table.columns[name][:rows] = self.columns[name][:rows]
+        table.size = rows
+        return table
+
 
 @dataclass
 class Log:
@@ -72,29 +301,199 @@ class Log:
         BATTLE_DEFEAT = "battle_defeat"
         PLAYER_NEW_SESSION = "player_new_session"
         PLAYER_NEW_DAY = "player_new_day"
+        ROUNDS_FAST_FORWARDED = "rounds_fast_forwarded"
+
+    # Messages are only rendered when the log is turned into a DataFrame
+    MESSAGE_TEMPLATES = {
+        Action.ROUND_COMPLETED: "Round {rounds_done} completed: Chapter {chapter_level} ended in {victory}",
+        Action.META_STAT_LEVEL_UP: "Stat {stat_name} leveled up to {new_level}",
+        Action.DAY_COMPLETED: "Day {day} completed for Chapter {chapter} with event {event_type}",
+        Action.CHAPTER_VICTORY: "Chapter {chapter} completed with victory",
+        Action.CHAPTER_DEFEAT: "Chapter {chapter} completed with defeat",
+        Action.PLAYER_ATTACK: "Player attacked {enemy_type} for {damage} damage",
+        Action.ENEMY_ATTACK: "{enemy_type} attacked player for {enemy_damage} damage",
+        Action.BATTLE_VICTORY: "Battle won against {enemy_type}",
+        Action.BATTLE_DEFEAT: "Battle lost against {enemy_type}",
+        Action.PLAYER_NEW_SESSION: "Player started new session {session_num} on day {day_num}",
+        Action.PLAYER_NEW_DAY: "Player started new day {day_num}",
+        Action.ROUNDS_FAST_FORWARDED: "Skipped {rounds_skipped} lost runs of Chapter {chapter_level}, {gold} gold saved",
+    }
+
+    ACTION_CODES = {action: code for code, action in enumerate(Action)}
 
+    # Same codes as plain ints, so hot call sites skip hashing the Enum, e.g. Log.Code.PLAYER_ATTACK
+    Code = type("Code", (), {action.name: code for action, code in ACTION_CODES.items()})
 
-    logs: list
+    class Verbosity(Enum):
+        SUMMARY = "summary"
+        DAY = "day"
+        COMBAT = "combat"
+
+    # Actions recorded at each verbosity level, every level includes the ones above it
+    VERBOSITY_ACTIONS = {
+        Verbosity.SUMMARY: [Action.ROUND_COMPLETED, Action.META_STAT_LEVEL_UP, Action.CHAPTER_VICTORY, Action.CHAPTER_DEFEAT, Action.ROUNDS_FAST_FORWARDED],
+        Verbosity.DAY: [Action.DAY_COMPLETED, Action.BATTLE_VICTORY, Action.BATTLE_DEFEAT, Action.PLAYER_NEW_SESSION, Action.PLAYER_NEW_DAY],
+        Verbosity.COMBAT: [Action.PLAYER_ATTACK, Action.ENEMY_ATTACK],
+    }
+
+    table: LogTable
     timer: Timer
 
+    # 0 disables an action, 1 records every event and N records one event in N
+    sample_rates: Dict[Action, int]
+    # sample_rates and the sampling counters indexed by action code
+    code_rates: List[int]
+    sample_counters: List[int]
+
+    # With a sink, the table only buffers the latest rows and every full buffer is written to it
+    sink: Optional['ResultWriter'] = None
+    rows_flushed: int = 0
+
+
+    @staticmethod
+    def initialize(timer: Timer, verbosity: 'Log.Verbosity' = Verbosity.DAY, sample_rates: Optional[Dict['Log.Action', int]] = None,
+                   sink: Optional['ResultWriter'] = None, buffer_rows: int = 10_000) -> 'Log':
+        rates = {action: 0 for action in Log.Action}
+        for level in Log.Verbosity:
+            for action in Log.VERBOSITY_ACTIONS[level]:
+                rates[action] = 1
+            if level == verbosity:
+                break
+
+        if sample_rates is not None:
+            rates.update(sample_rates)
+
+        log = Log(
+            table=LogTable.initialize(buffer_rows if sink is not None else 1024),
+            timer=timer,
+            sample_rates=rates,
+            code_rates=[rates[action] for action in Log.Action],
+            sample_counters=[0] * len(Log.Action),
+            sink=sink
+        )
+        if sink is not None:
+            log.table.flush_handler = log.flush
+
+        return log
 
     @staticmethod
-    def initialize(timer: Timer) -> 'Log':
-        _logs = []
-        return Log(logs=_logs, timer=timer)
+    def only(*actions: 'Log.Action') -> Dict['Log.Action', int]:
+        # Sample rates that record the given actions and nothing else
+        return {action: 1 if action in actions else 0 for action in Log.Action}
+
+    def is_enabled(self, action: 'Log.Action') -> bool:
+        return self.is_enabled_code(Log.ACTION_CODES[action])
+
+    def is_enabled_code(self, code: int) -> bool:
+        return self.code_rates[code] > 0
+
+    def should_log(self, action: 'Log.Action') -> bool:
+        return self.should_log_code(Log.ACTION_CODES[action])
+
+    def should_log_code(self, code: int) -> bool:
+        # Call sites check this before building the event, so disabled actions cost one lookup
+        rate = self.code_rates[code]
+        if rate <= 1:
+            return rate == 1
+
+        count = self.sample_counters[code]
+        self.sample_counters[code] = count + 1
+        return count % rate == 0
 
-    def get_logs(self):
-        return self.logs
+    def get_logs(self) -> List[Dict[str, Any]]:
+        return [
+            {key: value for key, value in record.items() if not pd.isna(value)}
+            for record in self.get_logs_as_dataframe().to_dict(orient="records")
+        ]
 
     def clear_logs(self):
-        self.logs = []
+        self.table.clear()
+        self.sample_counters = [0] * len(Log.Action)
+        self.rows_flushed = 0
 
-    def get_logs_as_dataframe(self):
-        import pandas as pd
-        return pd.DataFrame(self.logs)
+    def restore_rows(self, previous: 'Log', rows: int, sample_counters: List[int]):
+        # Continues another log as it was after its first rows, which must still be in memory
+        if previous.rows_flushed > 0:
+            raise ValueError("Rows already flushed to the log sink can't be restored")
+        if self.sink is not None:
+            raise ValueError("Restored rows can't be added to a log with a sink")
+        self.table = previous.table.copy_rows(rows)
+        self.sample_counters = list(sample_counters)
+
+    def flush(self):
+        # Writes the buffered rows to the sink and empties the buffer
+        if self.sink is None or self.table.size == 0:
+            return
+        self.sink.write(self.get_logs_as_dataframe(with_messages="message" in self.sink.columns))
+        self.rows_flushed += self.table.size
+        self.table.clear()
+
+    def close(self):
+        # Flushes and closes the sink, read the rows back with result_writers.iter_result_chunks
+        if self.sink is None:
+            return
+        self.flush()
+        self.sink.close()
+
+    def get_row_count(self) -> int:
+        return self.rows_flushed + self.table.size
+
+    def get_logs_as_dataframe(self, with_messages: bool = True) -> pd.DataFrame:
+        # Rows still held in memory: all of them without a sink, the ones not flushed yet with one
+        size = self.table.size
+        actions = list(Log.Action)
+
+        data: Dict[str, Any] = {
+            "timer_day": self.table.timer_day[:size],
+            "timer_day_session": self.table.timer_day_session[:size],
+            "timer_session_time": self.table.timer_session_time[:size],
+            "action": pd.Categorical.from_codes(self.table.action_codes[:size], categories=[action.value for action in actions]),
+        }
+
+        for name, kind in LOG_COLUMN_TYPES.items():
+            column = self.table.columns[name][:size]
+            present = ~np.isnan(column) if kind == "f" else column != None
+            if not present.any():
+                continue
+            if name == "victory":
+                column = pd.array(np.where(present, column == 1, None), dtype="boolean")
+            data[name] = column
+
+        df = pd.DataFrame(data, copy=False)
+
+        if with_messages:
+            df.insert(4, "message", self.render_messages(df))
+
+        return df
+
+    def render_messages(self, df: pd.DataFrame) -> pd.Series:
+        messages = pd.Series("", index=df.index, dtype=object)
+
+        for action, template in Log.MESSAGE_TEMPLATES.items():
+            mask = (df["action"] == action.value).to_numpy()
+            if not mask.any():
+                continue
+
+            rows = df[mask]
+            rendered = pd.Series("", index=rows.index, dtype=object)
+            for literal, field, _, _ in Formatter().parse(template):
+                rendered = rendered + literal
+                if field is not None:
+                    rendered = rendered + rows[field].map(Log.format_message_value)
+            messages[mask] = rendered
+
+        return messages
+
+    @staticmethod
+    def format_message_value(value: Any) -> str:
+        if isinstance(value, (bool, np.bool_)):
+            return "Victory" if value else "Defeat"
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
 
     def has_logs(self):
-        return len(self.logs) > 0
+        return self.get_row_count() > 0
     
     def get_flattened_logs_df(self):
         import pandas as pd
@@ -111,158 +510,154 @@ class Log:
         return flattened_df
     
     ## ------ Action Logs ------
-    def log_round_completed(self,chapter_level: int, victory: bool, rounds_done: int):
-        log_entry = {
-                "timer_day": self.timer.get_day(),
-                "timer_day_session": self.timer.get_day_session(),
-                "timer_session_time": self.timer.get_session_time(),
-                "action": self.Action.ROUND_COMPLETED.value,
-                "message": f"Round {rounds_done} completed: Chapter {chapter_level} ended in {'Victory' if victory else 'Defeat'}",
-                "rounds_done": rounds_done,
-                "chapter_level": chapter_level,
-                "victory": victory,
-            }
-        self.logs.append(log_entry)
+    def log_round_completed(self,chapter_level: int, victory: bool, rounds_done: int, gold: int):
+        row = self.table.add_row(Log.Code.ROUND_COMPLETED, self.timer)
+        columns = self.table.columns
+        columns["rounds_done"][row] = rounds_done
+        columns["chapter_level"][row] = chapter_level
+        columns["victory"][row] = victory
+        columns["gold"][row] = gold
+
 
+    def log_rounds_fast_forwarded(self, chapter_level: int, chapter_run_try: int, rounds_done: int, rounds_skipped: int, gold: int):
+        row = self.table.add_row(Log.Code.ROUNDS_FAST_FORWARDED, self.timer)
+        columns = self.table.columns
+        columns["chapter_level"][row] = chapter_level
+        columns["chapter_run_try"][row] = chapter_run_try
+        columns["rounds_done"][row] = rounds_done
+        columns["rounds_skipped"][row] = rounds_skipped
+        columns["gold"][row] = gold
 
     def log_stat_level_up(self, stat_name: str, new_level: int):
-        log_entry = {
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.META_STAT_LEVEL_UP.value,
-            "message": f"Stat {stat_name} leveled up to {new_level}",
-            "stat_name": stat_name,
-            "new_level": new_level
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.META_STAT_LEVEL_UP, self.timer)
+        columns = self.table.columns
+        columns["stat_name"][row] = stat_name
+        columns["new_level"][row] = new_level
+
+
+    def log_stat_level_ups(self, stat_names: List[str], new_levels: List[int]):
+        # META_STAT_LEVEL_UP rows of every upgrade bought in one meta step, appended in one go
+        code = Log.Code.META_STAT_LEVEL_UP
+        rate = self.code_rates[code]
+        count = len(stat_names)
+        if rate <= 0 or count == 0:
+            return
+        keep = np.arange(count)
+        if rate > 1:
+            keep = keep[(self.sample_counters[code] + keep) % rate == 0]
+            self.sample_counters[code] += count
+            if len(keep) == 0:
+                return
 
+        rows = self.table.add_rows(
+            np.full(len(keep), code, dtype=np.int8),
+            np.full(len(keep), self.timer.get_day(), dtype=np.int64),
+            np.full(len(keep), self.timer.get_day_session(), dtype=np.int64),
+            np.full(len(keep), self.timer.get_session_time(), dtype=np.float64)
+        )
+        columns = self.table.columns
+        columns["stat_name"][rows] = np.array(stat_names, dtype=object)[keep]
+        columns["new_level"][rows] = np.array(new_levels, dtype=np.float64)[keep]
 
     def log_chapter_run_day_completed(self, day_num: int, chapter_num: int, event_type, event_param, 
                           player_hp: int, player_max_hp:int, player_atk: int, player_def: int):
         
-        log_entry = {
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.DAY_COMPLETED.value,
-            "message": f"Day {day_num} completed for Chapter {chapter_num} with event {event_type}",
-            "chapter": chapter_num,
-            "day": day_num,
-            "event_type": event_type,
-            "event_param": event_param,
-            "player_hp": player_hp,
-            "player_max_hp": player_max_hp,
-            "player_atk": player_atk,
-            "player_def": player_def
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.DAY_COMPLETED, self.timer)
+        columns = self.table.columns
+        columns["chapter"][row] = chapter_num
+        columns["day"][row] = day_num
+        columns["event_type"][row] = event_type
+        columns["event_param"][row] = event_param
+        columns["player_hp"][row] = player_hp
+        columns["player_max_hp"][row] = player_max_hp
+        columns["player_atk"][row] = player_atk
+        columns["player_def"][row] = player_def
 
     def log_chapter_victory(self, chapter_num: int, chapter_run_try: int):
-        log_entry = {
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.CHAPTER_VICTORY.value,
-            "message": f"Chapter {chapter_num} completed with victory",
-            "chapter": chapter_num,
-            "chapter_run_try": chapter_run_try
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.CHAPTER_VICTORY, self.timer)
+        columns = self.table.columns
+        columns["chapter"][row] = chapter_num
+        columns["chapter_run_try"][row] = chapter_run_try
 
     def log_chapter_defeat(self, chapter_num: int):
-        log_entry = {
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.CHAPTER_DEFEAT.value,
-            "message": f"Chapter {chapter_num} completed with defeat",
-            "chapter": chapter_num
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.CHAPTER_DEFEAT, self.timer)
+        self.table.columns["chapter"][row] = chapter_num
 
     def log_player_attack(self,chapter:int, chapter_run_try:int, day:int, combat_round: int,damage: int, enemy_type: str, enemy_hp: int):
-        log_entry = {
-            "chapter": chapter,
-            "chapter_run_try": chapter_run_try,
-            "day": day,
-            "combat_round": combat_round,
-            "timer_total_time": self.timer.get_total_time(),
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.PLAYER_ATTACK.value,
-            "message": f"Player attacked {enemy_type} for {damage} damage",
-            "damage": damage,
-            "enemy_type": enemy_type,
-            "enemy_hp": enemy_hp
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.PLAYER_ATTACK, self.timer)
+        columns = self.table.columns
+        columns["chapter"][row] = chapter
+        columns["chapter_run_try"][row] = chapter_run_try
+        columns["day"][row] = day
+        columns["combat_round"][row] = combat_round
+        columns["timer_total_time"][row] = self.timer.get_total_time()
+        columns["damage"][row] = damage
+        columns["enemy_type"][row] = enemy_type
+        columns["enemy_hp"][row] = enemy_hp
 
     def log_enemy_attack(self, chapter:int, chapter_run_try: int, day:int, combat_round: int, damage: int, enemy_type: str, player_hp: int, enemy_hp: int):
-        log_entry = {
-            "chapter": chapter,
-            "chapter_run_try": chapter_run_try,
-            "day": day,
-            "combat_round": combat_round,
-            "timer_total_time": self.timer.get_total_time(),
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.ENEMY_ATTACK.value,
-            "message": f"{enemy_type} attacked player for {damage} damage",
-            "enemy_damage": damage,
-            "player_hp": player_hp,
-            "enemy_hp": enemy_hp,
-            "enemy_type": enemy_type
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.ENEMY_ATTACK, self.timer)
+        columns = self.table.columns
+        columns["chapter"][row] = chapter
+        columns["chapter_run_try"][row] = chapter_run_try
+        columns["day"][row] = day
+        columns["combat_round"][row] = combat_round
+        columns["timer_total_time"][row] = self.timer.get_total_time()
+        columns["enemy_damage"][row] = damage
+        columns["player_hp"][row] = player_hp
+        columns["enemy_hp"][row] = enemy_hp
+        columns["enemy_type"][row] = enemy_type
 
     def log_battle_victory(self, player_damage:int, enemy_type: str, player_hp: int, enemy_hp: int):
-        log_entry = {
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.BATTLE_VICTORY.value,
-            "message": f"Battle won against {enemy_type}",
-            "player_damage": player_damage, 
-            "player_hp": player_hp,
-            "enemy_hp": enemy_hp,
-            "enemy_type": enemy_type
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.BATTLE_VICTORY, self.timer)
+        columns = self.table.columns
+        columns["player_damage"][row] = player_damage
+        columns["player_hp"][row] = player_hp
+        columns["enemy_hp"][row] = enemy_hp
+        columns["enemy_type"][row] = enemy_type
 
     def log_battle_defeat(self, enemy_type: str, enemy_hp: int):
-        log_entry = {
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.BATTLE_DEFEAT.value,
-            "message": f"Battle lost against {enemy_type}",
-            "enemy_type": enemy_type,
-            "enemy_hp": enemy_hp
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.BATTLE_DEFEAT, self.timer)
+        columns = self.table.columns
+        columns["enemy_type"][row] = enemy_type
+        columns["enemy_hp"][row] = enemy_hp
 
     def log_player_new_session(self, session_num: int, day_num: int):
-        log_entry = {
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.PLAYER_NEW_SESSION.value,
-            "message": f"Player started new session {session_num} on day {day_num}",
-            "session_num": session_num,
-            "day_num": day_num
-        }
-        self.logs.append(log_entry)
+        row = self.table.add_row(Log.Code.PLAYER_NEW_SESSION, self.timer)
+        columns = self.table.columns
+        columns["session_num"][row] = session_num
+        columns["day_num"][row] = day_num
+
+    def log_timer_rollovers(self, advance: TimerAdvance):
+        # PLAYER_NEW_SESSION and PLAYER_NEW_DAY rows of every crossing of a Timer.advance, appended in one go
+        if advance.sessions_started == 0 and advance.days_started == 0:
+            return
+        new_days = advance.new_days
+        keep = np.zeros(len(new_days), dtype=bool)
+        for code, crossings in ((Log.Code.PLAYER_NEW_SESSION, ~new_days), (Log.Code.PLAYER_NEW_DAY, new_days)):
+            rate = self.code_rates[code]
+            count = int(crossings.sum())
+            if rate <= 0 or count == 0:
+                continue
+            sampled = (self.sample_counters[code] + np.arange(count)) % rate == 0 if rate > 1 else np.ones(count, dtype=bool)
+            if rate > 1:
+                self.sample_counters[code] += count
+            keep[np.flatnonzero(crossings)[sampled]] = True
+
+        if not keep.any():
+            return
+
+        new_days = new_days[keep]
+        day_sessions = advance.day_sessions[keep]
+        days = (advance.total_times[keep] // 1440).astype(np.int64) + 1
+        codes = np.where(new_days, Log.Code.PLAYER_NEW_DAY, Log.Code.PLAYER_NEW_SESSION).astype(np.int8)
+
+        rows = self.table.add_rows(codes, days, day_sessions, np.zeros(len(codes), dtype=np.float64))
+        columns = self.table.columns
+        columns["session_num"][rows] = np.where(new_days, np.nan, day_sessions)
+        columns["day_num"][rows] = days
 
     def log_player_new_day(self, day_num: int):
-        log_entry = {
-            "timer_day": self.timer.get_day(),
-            "timer_day_session": self.timer.get_day_session(),
-            "timer_session_time": self.timer.get_session_time(),
-            "action": self.Action.PLAYER_NEW_DAY.value,
-            "message": f"Player started new day {day_num}",
-            "day_num": day_num
-        }
-        self.logs.append(log_entry)
\ No newline at end of file
+        row = self.table.add_row(Log.Code.PLAYER_NEW_DAY, self.timer)
+        self.table.columns["day_num"][row] = day_num
+